@@ -1,28 +1,41 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
-from collections import Counter
-from datetime import datetime
-import re
+from datetime import datetime, timedelta, timezone
+import json
+import os
 
-from app.services.arxiv_service import arxiv_service
-from app.services.reddit_service import reddit_service
 from app.services.analysis_service import analysis_service, ProblemCard
+from app.services.arxiv_service import arxiv_service
 from app.services.vector_service import vector_service
-from app.services.hackernews_service import hackernews_service
-from app.services.stackexchange_service import stackexchange_service
-from app.services.sentiment_service import sentiment_service
+from app.services.source_fanout import source_fanout
+from app.services.domain_graph import build_domain_graph
+from app.services.relevance_service import relevance_service
+from app.services.pulse_service import pulse_service
+from app.services.research_analytics import BUCKETS, analyze_velocity
+from app.services.heavy_hitter_service import heavy_hitters
+from app.services.prewarm_service import prewarm_scheduler
 from app.core.database import db
+from app.core.models import FeedbackAction
+from app.core.singleflight import single_flight
+from app.core.background import background_queue
+from app.core.computation_graph import ComputationGraph
 
 router = APIRouter(prefix="/discovery", tags=["discovery"])
 
+# Upper bounds for the /metrics query parameters; METRICS_MAX_PAPERS applies when the local
+# arXiv corpus answers, live searches stay within ARXIV_MAX_LIVE_RESULTS
+METRICS_MAX_PAPERS = int(os.getenv("METRICS_MAX_PAPERS", "2000"))
+METRICS_MAX_PERIODS = 104
+
 
 # ---- Request/Response Models ----
 
 class FeedbackRequest(BaseModel):
     card_gap: str
     domain: str
-    action: str  # bookmarked, dismissed, upvoted, downvoted
+    action: FeedbackAction
 
 
 class SaveCardRequest(BaseModel):
@@ -43,93 +56,125 @@ class GenerateCardRequest(BaseModel):
 # ---- Core Endpoints ----
 
 @router.get("/gaps", response_model=List[ProblemCard])
-async def get_innovation_gaps(domain: str, limit: int = 5):
+async def get_innovation_gaps(domain: str, response: Response, limit: int = 5):
     """
     Main endpoint to discover research gaps in a specific domain.
-    Fetches data from arXiv and Reddit, then analyzes using LLMs.
+    Fetches data from arXiv, Reddit, HackerNews and StackExchange concurrently, then analyzes using LLMs.
     Incorporates user feedback for personalized recommendations.
+    Sources that missed their deadline are listed in the X-Sources-Timed-Out header.
     """
     try:
-        # 1. Fetch from arXiv — get more papers than requested for richer LLM context
-        fetch_count = max(limit * 3, 15)
-        papers = arxiv_service.search_papers(domain, max_results=fetch_count)
+        # Identical concurrent requests share one fetch + LLM pass
+        key = single_flight.make_key("gaps", domain, limit=limit)
+        result = await single_flight.do(key, _discover_gaps, domain, limit)
+        response.headers["X-Sources-Timed-Out"] = ",".join(result["timed_out"])
 
-        # 2. Fetch from Reddit (if configured)
-        discussions = reddit_service.search_discussions(domain, limit=limit)
+        # 7. Save search history after responding (per request, so coalesced searches still count)
+        if result["analyzed"]:
+            await background_queue.submit("save_search", db.save_search, domain, len(result["gaps"]))
 
-        # 3. Fetch from HackerNews and StackExchange (no auth needed)
-        hn_stories = await hackernews_service.search_stories(domain, limit=10)
-        se_questions = await stackexchange_service.search_questions(domain, limit=10)
+        return result["gaps"]
 
-        # Combine all sources — arXiv papers first (highest quality), then others
-        all_sources = papers + discussions + hn_stories + se_questions
-
-        if not all_sources:
-            return []
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        # 3.5 Filter out sources that are clearly irrelevant to the domain
-        all_sources = _filter_relevant_sources(domain, all_sources)
 
-        if not all_sources:
-            return []
+async def _discover_gaps(domain: str, limit: int) -> dict:
+    """
+    Steps 1-6 of /gaps. Returns the extracted gaps, the sources that timed out,
+    and whether the LLM stage ran at all.
+    """
+    # 1-3. Fan out to every source at once
+    fetched = await source_fanout.fetch_all(domain, **_gap_fetch_limits(limit))
+    result = {"gaps": [], "timed_out": fetched["timed_out"], "analyzed": False}
+    papers = fetched["arxiv"]
 
-        # 4. Get user feedback for this domain (if any)
-        feedback = await db.get_feedback_stats(domain)
+    # 3.5 Combine and filter out sources that are clearly irrelevant to the domain
+    all_sources = _combine_sources(domain, fetched)
 
-        # 5. Analyze and extract gaps with feedback context
-        gaps = await analysis_service.extract_gaps(all_sources, domain=domain, feedback=feedback)
+    if not all_sources:
+        return result
 
-        # 6. Upsert documents to vector store (non-blocking best effort)
-        try:
-            await vector_service.upsert_documents(papers)
-        except Exception:
-            pass  # Don't fail the request if vector upsert fails
+    # 4. Get user feedback for this domain (if any)
+    feedback = await db.get_feedback_stats(domain)
 
-        # 7. Save search history
-        await db.save_search(domain, len(gaps))
+    # 5. Analyze and extract gaps with feedback context
+    result["gaps"] = await analysis_service.extract_gaps(all_sources, domain=domain, feedback=feedback)
+    result["analyzed"] = True
 
-        return gaps
+    # 6. Upsert documents to vector store in the background (best effort)
+    await background_queue.submit("vector_upsert", vector_service.upsert_documents, papers)
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return result
 
 
-def _filter_relevant_sources(domain: str, sources: List[dict]) -> List[dict]:
+@router.get("/gaps/stream")
+async def stream_innovation_gaps(domain: str, limit: int = 5):
     """
-    Pre-filter sources to remove items clearly irrelevant to the user's domain.
-    Uses keyword overlap between the domain query and each source's title/content.
+    Streaming variant of /gaps (NDJSON, one event per line).
+    Emits a `source` event as each upstream settles, `sources_ready` once filtering is done,
+    then a `card` event for every ProblemCard as soon as it is parsed, and finally `done`.
     """
-    # Tokenize the domain query into meaningful keywords (3+ chars)
-    domain_lower = domain.lower()
-    domain_keywords = set(
-        w for w in re.split(r'\W+', domain_lower) if len(w) >= 3
-    )
+    return StreamingResponse(_gap_events(domain, limit), media_type="application/x-ndjson")
 
-    if not domain_keywords:
-        return sources
 
-    filtered = []
-    for source in sources:
-        title = (source.get("title") or "").lower()
-        summary = (source.get("summary") or source.get("text") or source.get("body_snippet") or "").lower()
-        combined = title + " " + summary
+async def _gap_events(domain: str, limit: int):
+    def event(payload: dict) -> str:
+        return json.dumps(payload) + "\n"
 
-        # Check if any domain keyword appears in the source title or content
-        match_count = sum(1 for kw in domain_keywords if kw in combined)
+    try:
+        fetched = {"timed_out": [], "failed": []}
+        async for name, items, status in source_fanout.iter_completed(domain, **_gap_fetch_limits(limit)):
+            source_fanout.collect(fetched, name, items, status)
+            yield event({"event": "source", "source": name, "count": len(items), "status": status})
+
+        all_sources = _combine_sources(domain, fetched)
+        yield event({
+            "event": "sources_ready",
+            "relevant": len(all_sources),
+            "timed_out": fetched["timed_out"],
+        })
+
+        count = 0
+        if all_sources:
+            feedback = await db.get_feedback_stats(domain)
+            async for card in analysis_service.stream_gaps(all_sources, domain=domain, feedback=feedback):
+                count += 1
+                yield event({"event": "card", "card": card.model_dump()})
+
+            await background_queue.submit("vector_upsert", vector_service.upsert_documents, fetched["arxiv"])
+            await background_queue.submit("save_search", db.save_search, domain, count)
+
+        yield event({"event": "done", "count": count})
+    except Exception as e:
+        yield event({"event": "error", "detail": str(e)})
 
-        # Also check if the full domain phrase appears
-        full_phrase_match = domain_lower in combined
 
-        # Keep the source if at least one keyword matches OR the full phrase matches
-        if match_count > 0 or full_phrase_match:
-            filtered.append(source)
+def _gap_fetch_limits(limit: int) -> dict:
+    # Get more papers than requested for richer LLM context
+    return {
+        "arxiv_limit": max(limit * 3, 15),
+        "reddit_limit": limit,
+        "hn_limit": 10,
+        "se_limit": 10,
+    }
 
-    # If filtering removed everything, fall back to original list
-    # (better to return some results than none)
-    if not filtered:
-        return sources
 
-    return filtered
+def _combine_sources(domain: str, fetched: dict) -> List[dict]:
+    """arXiv papers first (highest quality), then the community sources, minus irrelevant ones."""
+    all_sources = fetched["arxiv"] + fetched["reddit"] + fetched["hackernews"] + fetched["stackexchange"]
+    if not all_sources:
+        return []
+    return _filter_relevant_sources(domain, all_sources)
+
+
+def _filter_relevant_sources(domain: str, sources: List[dict]) -> List[dict]:
+    """
+    Rank sources against the user's domain with BM25 and drop the ones that don't match.
+    Matching is on whole tokens, so 'attack' no longer matches inside unrelated text, and
+    the result is ordered most relevant first (empty when nothing is relevant).
+    """
+    return relevance_service.rank(domain, sources)
 
 
 @router.get("/sources")
@@ -137,97 +182,105 @@ async def get_raw_sources(domain: str, limit: int = 5):
     """
     Helper endpoint to see the raw data being pulled from all sources.
     """
-    papers = arxiv_service.search_papers(domain, max_results=limit)
-    discussions = reddit_service.search_discussions(domain, limit=limit)
-    hn_stories = await hackernews_service.search_stories(domain, limit=limit)
-    se_questions = await stackexchange_service.search_questions(domain, limit=limit)
+    fetched = await source_fanout.fetch_all(
+        domain,
+        arxiv_limit=limit,
+        reddit_limit=limit,
+        hn_limit=limit,
+        se_limit=limit,
+    )
 
     return {
-        "arxiv": papers,
-        "reddit": discussions,
-        "hackernews": hn_stories,
-        "stackexchange": se_questions,
+        "arxiv": fetched["arxiv"],
+        "reddit": fetched["reddit"],
+        "hackernews": fetched["hackernews"],
+        "stackexchange": fetched["stackexchange"],
+        "timed_out": fetched["timed_out"],
     }
 
 
 @router.get("/metrics")
-async def get_research_metrics(domain: str = "machine learning"):
+async def get_research_metrics(
+    domain: str = "machine learning",
+    bucket: str = "month",
+    periods: int = 6,
+    window: int = 3,
+    papers: int = 30,
+):
     """
     Fetch comprehensive research metrics for a given domain.
     Includes real velocity data, sentiment, and authors.
+    Velocity is bucketed by `bucket` (week, month or quarter) over the last `periods` buckets,
+    with a `window`-bucket moving average (1 to `periods`) and a least-squares growth trend,
+    computed from up to `papers` papers (capped by METRICS_MAX_PAPERS with a local arXiv
+    corpus, otherwise by ARXIV_MAX_LIVE_RESULTS).
     """
+    if bucket not in BUCKETS:
+        raise HTTPException(status_code=400, detail=f"bucket must be one of {', '.join(BUCKETS)}")
+    max_papers = METRICS_MAX_PAPERS if arxiv_service.corpus is not None else arxiv_service.max_live_results
+    paper_limit = min(max(papers, 1), max_papers)
+    periods = min(max(periods, 1), METRICS_MAX_PERIODS)
+    window = min(max(window, 1), periods)
     try:
-        # Fetch recent papers (larger set for better metrics)
-        papers = arxiv_service.search_papers(domain, max_results=30)
-
-        # Calculate velocity data — papers grouped by month
-        velocity_data = []
-        month_counts = Counter()
-        for paper in papers:
-            try:
-                pub_date = datetime.fromisoformat(paper["published"].replace("Z", "+00:00"))
-                month_key = pub_date.strftime("%b %Y").upper()
-                month_counts[month_key] += 1
-            except (ValueError, KeyError):
-                pass
-
-        # Sort months chronologically and take last 6
-        sorted_months = sorted(
-            month_counts.items(),
-            key=lambda x: datetime.strptime(x[0], "%b %Y"),
-        )[-6:]
-        velocity_data = [{"name": m[0], "value": m[1]} for m in sorted_months]
-
-        # If we don't have enough month data, supplement with what we have
-        if len(velocity_data) < 2:
-            velocity_data = [{"name": "RECENT", "value": len(papers)}]
-
-        # Get unique categories
-        all_categories = []
-        for paper in papers:
-            all_categories.extend(paper.get("categories", []))
-        unique_categories = list(set(all_categories))[:10]
-
-        # Get top authors (by frequency)
-        author_counts = {}
-        for paper in papers:
-            for author in paper.get("authors", []):
-                author_counts[author] = author_counts.get(author, 0) + 1
-        top_authors = sorted(author_counts.items(), key=lambda x: x[1], reverse=True)[:10]
-
-        # Compute growth rate
-        if len(velocity_data) >= 2:
-            latest = velocity_data[-1]["value"]
-            previous = velocity_data[-2]["value"]
-            growth = ((latest - previous) / max(previous, 1)) * 100
-        else:
-            growth = 0
-
-        # Get sentiment
-        try:
-            pulse = await sentiment_service.compute_pulse(domain)
-        except Exception:
-            pulse = {"score": 50.0, "label": "GROWING", "sources": {}}
-
-        # Get HN and SE counts
-        hn_signals = await hackernews_service.get_sentiment_signals(domain)
-        se_signals = await stackexchange_service.get_sentiment_signals(domain)
+        return await _build_research_metrics(
+            domain, build_domain_graph(domain, paper_limit=paper_limit),
+            bucket=bucket, periods=periods, window=window,
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        return {
-            "domain": domain,
-            "total_papers_indexed": len(papers),
-            "top_categories": unique_categories,
-            "top_authors": [
-                {"name": a[0], "paper_count": a[1], "field": unique_categories[i % len(unique_categories)] if unique_categories else "GENERAL"}
-                for i, a in enumerate(top_authors)
-            ],
-            "recent_papers": papers[:5],
-            "velocity_data": velocity_data,
-            "growth_rate": round(growth, 1),
-            "sentiment": pulse,
-            "hackernews_mentions": hn_signals.get("total_stories", 0),
-            "stackexchange_questions": se_signals.get("total_questions", 0),
-        }
+
+async def _build_research_metrics(domain: str, graph: ComputationGraph, bucket: str = "month",
+                                  periods: int = 6, window: int = 3) -> dict:
+    """Metrics payload built from the request's computation graph, so callers can share its fetches."""
+    # Fetch recent papers (larger set for better metrics) alongside the HN/SE signals
+    papers, hn_signals, se_signals = await graph.get_many("papers", "hn_signals", "se_signals")
+
+    # Velocity, trend and breakdowns in one vectorized pass over the publication dates
+    analytics = analyze_velocity(papers, bucket=bucket, periods=periods, window=window)
+    velocity_data = [{"name": b["name"], "value": b["value"]} for b in analytics["series"]]
+
+    # If we don't have enough bucket data, supplement with what we have
+    if len(velocity_data) < 2:
+        velocity_data = [{"name": "RECENT", "value": len(papers)}]
+
+    top_categories = [c["name"] for c in analytics["categories"]]
+
+    # Get sentiment (reuses the HN/SE signals fetched above)
+    try:
+        pulse = await graph.get("pulse")
+    except Exception:
+        pulse = {"score": 50.0, "label": "GROWING", "sources": {}}
+
+    return {
+        "domain": domain,
+        "total_papers_indexed": len(papers),
+        "top_categories": top_categories,
+        "top_authors": [
+            {"name": a["name"], "paper_count": a["count"], "field": top_categories[i % len(top_categories)] if top_categories else "GENERAL"}
+            for i, a in enumerate(analytics["authors"])
+        ],
+        "recent_papers": papers[:5],
+        "velocity_data": velocity_data,
+        "growth_rate": analytics["trend"]["growth_rate"],
+        "velocity": analytics,
+        "sentiment": pulse,
+        "hackernews_mentions": hn_signals.get("total_stories", 0),
+        "stackexchange_questions": se_signals.get("total_questions", 0),
+    }
+
+
+@router.get("/trending")
+async def get_trending(domain: str = "machine learning", field: str = "authors", windows: int = 7, limit: int = 10):
+    """
+    Rolling top authors or categories for a domain over the last `windows` sketch windows
+    (days by default), from every paper arXiv searches have returned across all workers.
+    Each item's `count` is an upper bound and `min_count` a lower bound on its true count.
+    """
+    if field not in heavy_hitters.FIELDS:
+        raise HTTPException(status_code=400, detail=f"field must be one of {', '.join(heavy_hitters.FIELDS)}")
+    try:
+        return await heavy_hitters.top(domain, field, windows=windows, limit=min(max(limit, 1), 100))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -239,16 +292,47 @@ async def get_pulse(domain: str = "machine learning"):
     """
     Get real-time community sentiment / pulse for a domain.
     Aggregates Reddit, HackerNews, and StackExchange engagement.
+    Served from the latest stored snapshot when recent enough (refreshed in the background
+    once stale); `snapshot_age_seconds` and `stale` say how old it is.
+    """
+    try:
+        return await pulse_service.get_pulse(domain)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/pulse/history")
+async def get_pulse_history(
+    domain: str = "machine learning",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    resolution: Optional[str] = None,
+):
+    """
+    Pulse over time from the minute/hour/day rollups of the stored snapshots.
+    Defaults to the last 7 days; without `resolution`, the finest one that keeps the
+    response within PULSE_HISTORY_MAX_POINTS buckets (and still retains `start`) is used.
+    An explicit `resolution` needing more buckets than one read returns (2000) is a 400.
     """
+    end = _as_utc(end) if end else datetime.utcnow()
+    start = _as_utc(start) if start else end - timedelta(days=7)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
     try:
-        pulse = await sentiment_service.compute_pulse(domain)
-        # Try to save snapshot to MongoDB
-        await db.save_sentiment(pulse)
-        return pulse
+        return await pulse_service.history(domain, start, end, resolution)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _as_utc(value: datetime) -> datetime:
+    """Naive UTC, the form every stored timestamp uses."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
 # ---- Cards CRUD ----
 
 @router.post("/cards")
@@ -260,20 +344,24 @@ async def save_problem_card(card: SaveCardRequest):
 
 
 @router.get("/cards")
-async def get_saved_cards(domain: str = ""):
-    """Retrieve saved problem cards, optionally filtered by domain."""
-    if domain:
-        cards = await db.get_cards_by_domain(domain)
-    else:
-        if db.db is not None:
-            cursor = db.db["problem_cards"].find().sort("created_at", -1).limit(50)
-            cards = []
-            async for doc in cursor:
-                doc["_id"] = str(doc["_id"])
-                cards.append(doc)
-        else:
-            cards = []
-    return {"cards": cards}
+async def get_saved_cards(domain: str = "", limit: int = 50, cursor: Optional[str] = None,
+                          fields: Optional[str] = None):
+    """
+    Retrieve saved problem cards, newest first, optionally filtered by domain.
+    Pass the returned `next_cursor` back as `cursor` for the next page; `fields` is a
+    comma-separated list to return only those card fields.
+    """
+    try:
+        page = await db.get_cards_page(domain=domain, limit=limit, cursor=cursor, fields=_parse_fields(fields))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"cards": page["items"], "next_cursor": page["next_cursor"]}
+
+
+def _parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    if not fields:
+        return None
+    return [f.strip() for f in fields.split(",") if f.strip()]
 
 
 @router.post("/cards/generate")
@@ -302,7 +390,7 @@ async def post_feedback(feedback: FeedbackRequest):
 
 @router.get("/feedback/stats")
 async def get_feedback_stats(domain: str):
-    """Get feedback statistics for a domain."""
+    """Get feedback statistics for a domain: recent bookmarked/dismissed gaps and counts per action."""
     stats = await db.get_feedback_stats(domain)
     return stats
 
@@ -310,10 +398,14 @@ async def get_feedback_stats(domain: str):
 # ---- Search History ----
 
 @router.get("/history")
-async def get_search_history(limit: int = 20):
-    """Get recent search history."""
-    history = await db.get_search_history(limit)
-    return {"searches": history}
+async def get_search_history(limit: int = 20, cursor: Optional[str] = None, domain: str = "",
+                             fields: Optional[str] = None):
+    """Get recent search history, newest first, paginated like /cards."""
+    try:
+        page = await db.get_search_page(domain=domain, limit=limit, cursor=cursor, fields=_parse_fields(fields))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"searches": page["items"], "next_cursor": page["next_cursor"]}
 
 
 # ---- Export ----
@@ -325,8 +417,10 @@ async def get_export_data(domain: str = "machine learning"):
     Returns metrics, cards, sentiment in a structured format.
     """
     try:
-        metrics = await get_research_metrics(domain)
-        pulse = await sentiment_service.compute_pulse(domain)
+        # One graph for the whole export: metrics and sentiment share every upstream fetch
+        graph = build_domain_graph(domain)
+        metrics = await _build_research_metrics(domain, graph)
+        pulse = await graph.get("pulse")
         saved_cards = await db.get_cards_by_domain(domain)
 
         return {
@@ -339,3 +433,33 @@ async def get_export_data(domain: str = "machine learning"):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+
+
+# ---- Pre-warming ----
+# The scheduler (app/services/prewarm_service.py) runs these for the most searched domains,
+# with the same parameters the frontend requests use, so their cache keys match.
+
+PREWARM_GAP_LIMIT = 5
+
+
+async def _warm_sources(domain: str):
+    await source_fanout.fetch_all(domain, **_gap_fetch_limits(PREWARM_GAP_LIMIT))
+
+
+async def _warm_metrics(domain: str):
+    await _build_research_metrics(domain, build_domain_graph(domain))
+
+
+async def _warm_pulse(domain: str):
+    await pulse_service.warm(domain, ahead=prewarm_scheduler.interval)
+
+
+async def _warm_gaps(domain: str):
+    key = single_flight.make_key("gaps", domain, limit=PREWARM_GAP_LIMIT)
+    await single_flight.do(key, _discover_gaps, domain, PREWARM_GAP_LIMIT)
+
+
+prewarm_scheduler.register("sources", _warm_sources)
+prewarm_scheduler.register("metrics", _warm_metrics)
+prewarm_scheduler.register("pulse", _warm_pulse)
+prewarm_scheduler.register("gaps", _warm_gaps, uses_llm=True)
@@ -0,0 +1,103 @@
+import asyncio
+import os
+import time
+from typing import Dict, List, Optional
+
+
+class BackgroundQueue:
+    """
+    Bounded in-process write-behind queue for side effects the response doesn't depend on
+    (vector upserts, search history, sentiment snapshots).
+    Started and drained in the app lifespan hook; started lazily on first submit otherwise.
+    When the queue is full new jobs are rejected (and counted) rather than slowing requests down.
+    """
+
+    def __init__(self):
+        self.max_size = int(os.getenv("BACKGROUND_QUEUE_SIZE", "1000"))
+        self.n_workers = int(os.getenv("BACKGROUND_WORKERS", "2"))
+        self.drain_timeout = float(os.getenv("BACKGROUND_DRAIN_SECONDS", "10"))
+        self.queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._loop = None
+        self.counters = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "abandoned": 0,
+            "max_depth": 0,
+            "wait_ms_total": 0.0,
+            "run_ms_total": 0.0,
+        }
+        self.by_job: Dict[str, int] = {}
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers) and self._loop is asyncio.get_running_loop()
+
+    async def start(self):
+        """Spawn the worker tasks on the running loop."""
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=self.max_size)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.n_workers)]
+
+    async def _worker(self):
+        while True:
+            name, func, args, kwargs, enqueued_at = await self.queue.get()
+            started = time.perf_counter()
+            self.counters["wait_ms_total"] += (started - enqueued_at) * 1000
+            try:
+                await func(*args, **kwargs)
+                self.counters["completed"] += 1
+            except Exception as e:
+                self.counters["failed"] += 1
+                print(f"Background job '{name}' failed: {e}")
+            finally:
+                self.counters["run_ms_total"] += (time.perf_counter() - started) * 1000
+                self.queue.task_done()
+
+    async def submit(self, name: str, func, *args, **kwargs) -> bool:
+        """Queue `func(*args, **kwargs)` to run after the response. Returns False if rejected."""
+        if not self.running:
+            await self.start()
+        try:
+            self.queue.put_nowait((name, func, args, kwargs, time.perf_counter()))
+        except asyncio.QueueFull:
+            self.counters["rejected"] += 1
+            print(f"Background queue full, dropping '{name}'")
+            return False
+        self.counters["submitted"] += 1
+        self.by_job[name] = self.by_job.get(name, 0) + 1
+        self.counters["max_depth"] = max(self.counters["max_depth"], self.queue.qsize())
+        return True
+
+    async def stop(self):
+        """Flush queued jobs (up to BACKGROUND_DRAIN_SECONDS), then stop the workers."""
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout=self.drain_timeout)
+        except asyncio.TimeoutError:
+            self.counters["abandoned"] += self.queue.qsize()
+            print(f"Background queue drain timed out, abandoning {self.queue.qsize()} jobs")
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def stats(self) -> Dict:
+        done = self.counters["completed"] + self.counters["failed"]
+        return {
+            "depth": self.queue.qsize() if self.queue else 0,
+            "capacity": self.max_size,
+            "workers": len(self._workers),
+            **self.counters,
+            "avg_wait_ms": round(self.counters["wait_ms_total"] / done, 2) if done else 0.0,
+            "avg_run_ms": round(self.counters["run_ms_total"] / done, 2) if done else 0.0,
+            "by_job": dict(self.by_job),
+        }
+
+
+background_queue = BackgroundQueue()
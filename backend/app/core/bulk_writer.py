@@ -0,0 +1,113 @@
+import asyncio
+import os
+import time
+from typing import Dict, List
+
+
+class BulkWriter:
+    """
+    Buffers inserts per collection and writes them with one `sink(collection, docs)` call
+    (an unordered insert_many) once a buffer reaches BULK_WRITE_BATCH_SIZE documents or
+    BULK_WRITE_FLUSH_MS has passed since the last flush, whichever comes first.
+    Documents must already carry their _id so callers get an id back without waiting,
+    which also makes a retried batch safe to write again (stored ids are skipped).
+
+    A failed batch goes back to the front of its buffer and is retried with the next flush,
+    up to BULK_WRITE_MAX_RETRIES times in a row; after that it is dropped and its documents
+    are counted in `dropped_documents`.
+    """
+
+    def __init__(self, sink):
+        self.sink = sink
+        self.batch_size = int(os.getenv("BULK_WRITE_BATCH_SIZE", "100"))
+        self.flush_interval = float(os.getenv("BULK_WRITE_FLUSH_MS", "500")) / 1000
+        self.max_retries = int(os.getenv("BULK_WRITE_MAX_RETRIES", "3"))
+        self.buffers: Dict[str, List[dict]] = {}
+        self._failures: Dict[str, int] = {}  # collection -> failed writes in a row
+        self._flusher = None
+        self._loop = None
+        self.counters = {
+            "documents": 0,
+            "batches": 0,
+            "max_batch": 0,
+            "write_ms_total": 0.0,
+            "max_write_ms": 0.0,
+            "failed_batches": 0,
+            "retried_documents": 0,
+            "dropped_documents": 0,
+        }
+
+    def _ensure_flusher(self):
+        loop = asyncio.get_running_loop()
+        if self._flusher is None or self._loop is not loop or self._flusher.done():
+            self._loop = loop
+            self._flusher = loop.create_task(self._flush_periodically())
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def add(self, collection: str, doc: dict):
+        self._ensure_flusher()
+        buffer = self.buffers.setdefault(collection, [])
+        buffer.append(doc)
+        if len(buffer) >= self.batch_size:
+            await self.flush(collection)
+
+    async def flush(self, collection: str = None):
+        """Write out one collection's buffer, or every buffer."""
+        names = [collection] if collection else list(self.buffers)
+        for name in names:
+            docs = self.buffers.get(name)
+            if not docs:
+                continue
+            # Swap before awaiting so events arriving mid-write go into the next batch
+            self.buffers[name] = []
+            started = time.perf_counter()
+            try:
+                await self.sink(name, docs)
+            except Exception as e:
+                self.counters["failed_batches"] += 1
+                failures = self._failures.get(name, 0) + 1
+                if failures <= self.max_retries:
+                    self._failures[name] = failures
+                    self.buffers[name] = docs + self.buffers[name]
+                    self.counters["retried_documents"] += len(docs)
+                    print(f"Bulk write to '{name}' failed ({len(docs)} documents, attempt {failures}), will retry: {e}")
+                else:
+                    self._failures.pop(name, None)
+                    self.counters["dropped_documents"] += len(docs)
+                    print(f"Bulk write to '{name}' failed {failures} times, dropped {len(docs)} documents: {e}")
+                continue
+            self._failures.pop(name, None)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.counters["documents"] += len(docs)
+            self.counters["batches"] += 1
+            self.counters["max_batch"] = max(self.counters["max_batch"], len(docs))
+            self.counters["write_ms_total"] += elapsed_ms
+            self.counters["max_write_ms"] = max(self.counters["max_write_ms"], elapsed_ms)
+
+    async def stop(self):
+        """Stop the periodic flusher and write out whatever is still buffered."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except (asyncio.CancelledError, RuntimeError):
+                pass  # RuntimeError: the flusher belonged to a loop that is gone
+            self._flusher = None
+        # Failed batches are re-queued, so keep flushing until they are written or dropped
+        for _ in range(self.max_retries + 1):
+            await self.flush()
+            if not any(self.buffers.values()):
+                break
+
+    def stats(self) -> Dict:
+        batches = self.counters["batches"]
+        return {
+            "pending": {name: len(docs) for name, docs in self.buffers.items() if docs},
+            **self.counters,
+            "avg_batch": round(self.counters["documents"] / batches, 2) if batches else 0.0,
+            "avg_write_ms": round(self.counters["write_ms_total"] / batches, 2) if batches else 0.0,
+        }
@@ -0,0 +1,186 @@
+import inspect
+import os
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Dict, Optional
+
+from app.core.database import db
+from app.core.keys import normalize_domain
+from app.core.singleflight import single_flight
+
+# Seconds of remaining TTL below which a hit is treated as a miss (see TieredCache.refresh_ahead)
+_refresh_window: ContextVar[float] = ContextVar("refresh_window", default=0.0)
+
+
+class TieredCache:
+    """
+    Two-level TTL cache.
+    L1 is a bounded in-process LRU; L2 is a MongoDB collection with a TTL index,
+    so warm entries survive restarts and are shared between gunicorn workers.
+    Each namespace (e.g. one per upstream source) has its own TTL.
+    """
+
+    def __init__(self, collection: str, ttls: Dict[str, float], default_ttl: float = 600, max_entries: int = 512):
+        self.collection = collection
+        self.ttls = ttls
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, value)
+        self.counters = {
+            "l1_hits": 0,
+            "l2_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "l2_errors": 0,
+            "fills": 0,
+            "refreshed_early": 0,
+        }
+
+    def ttl_for(self, namespace: str) -> float:
+        return self.ttls.get(namespace, self.default_ttl)
+
+    @staticmethod
+    def make_key(namespace: str, domain: str, **params) -> str:
+        param_str = "&".join(f"{k}={params[k]}" for k in sorted(params))
+        return f"{namespace}:{normalize_domain(domain)}:{param_str}"
+
+    def _l1_get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            self.counters["expirations"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _l1_set(self, key: str, value: Any, expires_at: float):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    @contextmanager
+    def refresh_ahead(self, seconds: float):
+        """
+        Within this block (and tasks started from it), entries expiring in less than
+        `seconds` count as misses, so callers such as the pre-warmer renew them early.
+        """
+        token = _refresh_window.set(seconds)
+        try:
+            yield
+        finally:
+            _refresh_window.reset(token)
+
+    def _expiring(self, expires_at: float) -> bool:
+        window = _refresh_window.get()
+        if window and expires_at - time.time() < window:
+            self.counters["refreshed_early"] += 1
+            return True
+        return False
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Look up a key in L1, then L2. Returns None on a miss."""
+        value = self._l1_get(key)
+        if value is not None and not self._expiring(self._entries[key][0]):
+            self.counters["l1_hits"] += 1
+            return value
+
+        try:
+            doc = await db.get_cache_entry(self.collection, key)
+        except Exception as e:
+            print(f"Cache L2 read error: {e}")
+            self.counters["l2_errors"] += 1
+            doc = None
+        if doc is not None and not self._expiring(doc["expires_at"]):
+            self.counters["l2_hits"] += 1
+            self._l1_set(key, doc["value"], doc["expires_at"])
+            return doc["value"]
+
+        self.counters["misses"] += 1
+        return None
+
+    async def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None, **fields):
+        """
+        Store a value in both tiers under the namespace's TTL.
+        Extra `fields` are persisted alongside the L2 entry so it can be queried later.
+        """
+        ttl = ttl if ttl is not None else self.ttl_for(namespace)
+        self._l1_set(key, value, time.time() + ttl)
+        try:
+            await db.set_cache_entry(self.collection, key, value, ttl, namespace=namespace, **fields)
+        except Exception as e:
+            print(f"Cache L2 write error: {e}")
+            self.counters["l2_errors"] += 1
+
+    def cached(self, namespace: str):
+        """
+        Decorator for async service methods of the form `method(self, query, ...)`.
+        The key combines the namespace, the normalized query and every other bound argument.
+        Concurrent misses for the same key share one upstream call via single-flight.
+        Empty results are not cached so a transient upstream failure isn't pinned for a whole TTL.
+        Cached values are shared between callers and must be treated as read-only.
+        """
+        def decorator(func):
+            signature = inspect.signature(func)
+
+            @wraps(func)
+            async def wrapper(service, query: str, *args, **kwargs):
+                bound = signature.bind(service, query, *args, **kwargs)
+                bound.apply_defaults()
+                params = {k: v for k, v in list(bound.arguments.items())[2:]}
+                key = self.make_key(namespace, query, **params)
+
+                value = await self.get(key)
+                if value is not None:
+                    return value
+
+                async def fill():
+                    self.counters["fills"] += 1
+                    result = await func(service, query, *args, **kwargs)
+                    if result:
+                        await self.set(namespace, key, result)
+                    return result
+
+                return await single_flight.do(("source", key), fill)
+
+            return wrapper
+        return decorator
+
+    def l1_values(self):
+        """Live L1 values, most recently used first."""
+        now = time.time()
+        return [value for expires_at, value in reversed(self._entries.values()) if expires_at > now]
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.counters["l1_hits"] + self.counters["l2_hits"] + self.counters["misses"]
+        hits = self.counters["l1_hits"] + self.counters["l2_hits"]
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hit_ratio": round(hits / lookups, 3) if lookups else 0.0,
+            **self.counters,
+        }
+
+
+# Per-source TTLs in seconds — arXiv moves slowly, community sources faster
+source_cache = TieredCache(
+    collection="source_cache",
+    ttls={
+        "arxiv": float(os.getenv("CACHE_TTL_ARXIV", "3600")),
+        "reddit": float(os.getenv("CACHE_TTL_REDDIT", "600")),
+        "hackernews": float(os.getenv("CACHE_TTL_HACKERNEWS", "600")),
+        "stackexchange": float(os.getenv("CACHE_TTL_STACKEXCHANGE", "900")),
+    },
+    max_entries=int(os.getenv("SOURCE_CACHE_MAX_ENTRIES", "512")),
+)
@@ -0,0 +1,235 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from app.core.rate_governor import RateLimited
+
+
+class CircuitOpen(Exception):
+    """The upstream's breaker is open; the call was not attempted."""
+
+    def __init__(self, upstream: str, retry_in: float):
+        super().__init__(f"{upstream} circuit open: retrying in {retry_in:.0f}s")
+        self.upstream = upstream
+        self.retry_in = retry_in
+
+
+class UpstreamError(Exception):
+    """An upstream answered with a server error or a throttling status."""
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open breaker over the last `window` calls.
+
+    Closed: calls go through; once at least `min_calls` are recorded and the share of failures
+    reaches `failure_rate`, or the share of calls slower than `slow_call_seconds` reaches
+    `slow_rate`, it opens. Open: calls fail immediately for `open_seconds`. Half-open: up to
+    `half_open_calls` trial calls go through; a fast success closes it, anything else reopens it.
+    Safe to use from worker threads.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name: str, window: int = 20, min_calls: int = 5, failure_rate: float = 0.5,
+                 slow_call_seconds: float = 4.0, slow_rate: float = 0.5, open_seconds: float = 30.0,
+                 half_open_calls: int = 1):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self.state = self.CLOSED
+        self._outcomes = deque(maxlen=window)  # (failed, slow)
+        self._latencies = deque(maxlen=200)  # successful calls only, for hedging
+        self._opened_at = 0.0
+        self._trials = 0
+        self._lock = threading.Lock()
+        self.counters = {"calls": 0, "failures": 0, "slow_calls": 0, "rejected": 0, "opened": 0}
+
+    def allow(self):
+        """Claim a call slot or raise CircuitOpen."""
+        with self._lock:
+            if self.state == self.OPEN:
+                retry_in = self._opened_at + self.open_seconds - time.monotonic()
+                if retry_in > 0:
+                    self.counters["rejected"] += 1
+                    raise CircuitOpen(self.name, retry_in)
+                self.state, self._trials = self.HALF_OPEN, 0
+            if self.state == self.HALF_OPEN:
+                if self._trials >= self.half_open_calls:
+                    self.counters["rejected"] += 1
+                    raise CircuitOpen(self.name, 0)
+                self._trials += 1
+            self.counters["calls"] += 1
+
+    def _open(self):
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self.counters["opened"] += 1
+
+    def record(self, failed: bool, latency: float):
+        slow = latency >= self.slow_call_seconds
+        with self._lock:
+            self.counters["failures"] += failed
+            self.counters["slow_calls"] += slow
+            if not failed:
+                self._latencies.append(latency)
+            if self.state == self.HALF_OPEN:
+                self._trials -= 1
+                if failed or slow:
+                    self._open()
+                else:
+                    self.state = self.CLOSED
+                    self._outcomes.clear()
+                return
+            self._outcomes.append((failed, slow))
+            if len(self._outcomes) >= self.min_calls:
+                calls = len(self._outcomes)
+                if (
+                    sum(f for f, _ in self._outcomes) / calls >= self.failure_rate
+                    or sum(s for _, s in self._outcomes) / calls >= self.slow_rate
+                ):
+                    self._open()
+
+    def release(self):
+        """Give back a claimed slot without an outcome (the caller gave up, not the upstream)."""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._trials = max(0, self._trials - 1)
+
+    def latency_quantile(self, q: float, min_samples: int) -> Optional[float]:
+        with self._lock:
+            if len(self._latencies) < min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            calls = len(self._outcomes)
+            return {
+                "state": self.state,
+                "window_calls": calls,
+                "window_failure_rate": round(sum(f for f, _ in self._outcomes) / calls, 2) if calls else 0.0,
+                **self.counters,
+            }
+
+
+class CircuitBreakers:
+    """
+    One CircuitBreaker per upstream (CIRCUIT_* settings), plus optional hedging.
+
+    Upstreams listed in HEDGE_UPSTREAMS get a second, identical request once the first has
+    been outstanding for the upstream's HEDGE_QUANTILE latency (after HEDGE_MIN_SAMPLES
+    successful calls); whichever answers first wins and the other is cancelled.
+    Local RateLimited errors say nothing about the upstream and are not recorded.
+    """
+
+    def __init__(self):
+        self.settings = {
+            "window": int(os.getenv("CIRCUIT_WINDOW_CALLS", "20")),
+            "min_calls": int(os.getenv("CIRCUIT_MIN_CALLS", "5")),
+            "failure_rate": float(os.getenv("CIRCUIT_FAILURE_RATE", "0.5")),
+            "slow_call_seconds": float(os.getenv("CIRCUIT_SLOW_CALL_SECONDS", "4")),
+            "slow_rate": float(os.getenv("CIRCUIT_SLOW_CALL_RATE", "0.5")),
+            "open_seconds": float(os.getenv("CIRCUIT_OPEN_SECONDS", "30")),
+            "half_open_calls": int(os.getenv("CIRCUIT_HALF_OPEN_CALLS", "1")),
+        }
+        self.hedged = {u.strip() for u in os.getenv("HEDGE_UPSTREAMS", "").split(",") if u.strip()}
+        self.hedge_quantile = float(os.getenv("HEDGE_QUANTILE", "0.95"))
+        self.hedge_min_samples = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+        self.hedge_min_delay = float(os.getenv("HEDGE_MIN_DELAY_MS", "50")) / 1000
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.hedge_counters: Dict[str, Dict] = {}
+
+    def get(self, upstream: str) -> CircuitBreaker:
+        breaker = self.breakers.get(upstream)
+        if breaker is None:
+            breaker = self.breakers[upstream] = CircuitBreaker(upstream, **self.settings)
+        return breaker
+
+    async def call(self, upstream: str, func, *args, **kwargs):
+        """Await `func(*args, **kwargs)` through the upstream's breaker (hedged if enabled)."""
+        breaker = self.get(upstream)
+        breaker.allow()
+        started = time.monotonic()
+        try:
+            if upstream in self.hedged:
+                result = await self._hedged(upstream, breaker, func, *args, **kwargs)
+            else:
+                result = await func(*args, **kwargs)
+        except RateLimited:
+            breaker.release()
+            raise
+        except asyncio.CancelledError:
+            # Cancelled by a caller's deadline: only informative if it was already slow
+            elapsed = time.monotonic() - started
+            if elapsed >= breaker.slow_call_seconds:
+                breaker.record(False, elapsed)
+            else:
+                breaker.release()
+            raise
+        except Exception:
+            breaker.record(True, time.monotonic() - started)
+            raise
+        breaker.record(False, time.monotonic() - started)
+        return result
+
+    def call_blocking(self, upstream: str, func, *args, **kwargs):
+        """call() for code running on a worker thread (no hedging)."""
+        breaker = self.get(upstream)
+        breaker.allow()
+        started = time.monotonic()
+        try:
+            result = func(*args, **kwargs)
+        except RateLimited:
+            breaker.release()
+            raise
+        except Exception:
+            breaker.record(True, time.monotonic() - started)
+            raise
+        breaker.record(False, time.monotonic() - started)
+        return result
+
+    async def _hedged(self, upstream: str, breaker: CircuitBreaker, func, *args, **kwargs):
+        counts = self.hedge_counters.setdefault(upstream, {"hedges": 0, "hedge_wins": 0})
+        delay = breaker.latency_quantile(self.hedge_quantile, self.hedge_min_samples)
+        first = asyncio.ensure_future(func(*args, **kwargs))
+        pending = {first}
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(pending, timeout=max(delay, self.hedge_min_delay))
+                if not done:
+                    counts["hedges"] += 1
+                    pending.add(asyncio.ensure_future(func(*args, **kwargs)))
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # Both attempts can finish in the same wake-up: any success wins over a failure
+                winner = next((task for task in done if task.exception() is None), None)
+                if winner is not None:
+                    counts["hedge_wins"] += winner is not first
+                    return winner.result()
+                if not pending:
+                    raise (first if first in done else next(iter(done))).exception()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> Dict:
+        return {
+            "hedged_upstreams": sorted(self.hedged),
+            "upstreams": {
+                name: {**breaker.stats(), **self.hedge_counters.get(name, {})}
+                for name, breaker in sorted(self.breakers.items())
+            },
+        }
+
+
+circuit_breakers = CircuitBreakers()
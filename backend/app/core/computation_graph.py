@@ -0,0 +1,36 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class ComputationGraph:
+    """
+    Request-scoped memo of named async computations.
+    Each node is a factory `async (graph) -> value` that may `await graph.get(...)` its
+    dependencies; every node runs at most once per graph, however many consumers ask for it.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[["ComputationGraph"], Awaitable[Any]]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def node(self, name: str, factory: Callable[["ComputationGraph"], Awaitable[Any]]) -> "ComputationGraph":
+        self._factories[name] = factory
+        return self
+
+    async def get(self, name: str) -> Any:
+        """Resolve a node, starting it on first use and sharing the result afterwards."""
+        task = self._tasks.get(name)
+        if task is None:
+            if name not in self._factories:
+                raise KeyError(f"Unknown computation '{name}'")
+            task = asyncio.ensure_future(self._factories[name](self))
+            self._tasks[name] = task
+        return await asyncio.shield(task)
+
+    async def get_many(self, *names: str) -> list:
+        """Resolve several nodes concurrently."""
+        return list(await asyncio.gather(*(self.get(name) for name in names)))
+
+    @property
+    def resolved(self) -> list:
+        return [name for name, task in self._tasks.items() if task.done()]
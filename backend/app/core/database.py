@@ -1,17 +1,75 @@
+import base64
+import json
 import os
+import time
+from collections import OrderedDict
 from motor.motor_asyncio import AsyncIOMotorClient
+from bson import ObjectId
 from dotenv import load_dotenv
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+
+from app.core.bulk_writer import BulkWriter
+from app.core.keys import normalize_domain
+from app.core.storage import MongoStorage, SQLiteStorage
 
 load_dotenv()
 
 class Database:
     client: AsyncIOMotorClient = None
     db = None
+    # MongoStorage or SQLiteStorage (see app/core/storage.py); None runs without persistence
+    storage = None
+    writer: BulkWriter = None
+
+    # Collections holding expiring entries (TTL-indexed on expires_at),
+    # with any extra lookup indexes they need
+    CACHE_COLLECTIONS = {
+        "source_cache": [],
+        "llm_cache": [[("domain", 1), ("prompt_version", 1), ("expires_at", -1)]],
+        "sketches": [[("domain", 1), ("field", 1), ("window", -1)]],
+        "sentiment_rollups": [[("domain", 1), ("resolution", 1), ("bucket", 1)]],
+    }
+
+    # Indexes backing every sort/filter below; _id is the keyset tie-breaker for equal timestamps
+    INDEXES = {
+        "problem_cards": [
+            [("domain", 1), ("created_at", -1), ("_id", -1)],
+            [("created_at", -1), ("_id", -1)],
+        ],
+        "searches": [
+            [("timestamp", -1), ("_id", -1)],
+            [("domain", 1), ("timestamp", -1), ("_id", -1)],
+        ],
+        "sentiment": [[("domain", 1), ("timestamp", -1)]],
+        "feedback": [[("domain", 1), ("action", 1)], [("domain", 1), ("timestamp", -1)]],
+    }
+
+    MAX_PAGE_SIZE = 200
+    MAX_ROLLUP_POINTS = 2000
+
+    # High-frequency event inserts (searches, feedback, sentiment) go through the bulk writer;
+    # BULK_WRITE_UNACKNOWLEDGED=true sends those batches with w=0
+    UNACKNOWLEDGED_BULK_WRITES = os.getenv("BULK_WRITE_UNACKNOWLEDGED", "false").lower() == "true"
 
     @classmethod
     async def connect_db(cls):
-        """Create database connection."""
+        """
+        Connect the storage backend chosen by STORAGE_BACKEND:
+        mongo, sqlite, none, or auto (MongoDB, falling back to the embedded SQLite file).
+        """
+        backend = os.getenv("STORAGE_BACKEND", "auto").lower()
+        if backend in ("auto", "mongo"):
+            await cls._connect_mongo()
+        if cls.storage is None and backend in ("auto", "sqlite"):
+            cls._connect_sqlite()
+        if cls.storage is None:
+            print("Warning: no storage backend available. Running without persistence.")
+            return
+        await cls.ensure_indexes()
+        await cls.ensure_cache_indexes()
+
+    @classmethod
+    async def _connect_mongo(cls):
         mongodb_url = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
         db_name = os.getenv("DATABASE_NAME", "FrontierMap")
         
@@ -20,103 +78,387 @@ class Database:
             # Test the connection
             await cls.client.admin.command('ping')
             cls.db = cls.client[db_name]
+            cls.storage = MongoStorage(cls.client, cls.db)
             print(f"Connected to MongoDB at {mongodb_url}")
         except Exception as e:
-            print(f"Warning: MongoDB not available ({e}). Running without persistence.")
+            print(f"Warning: MongoDB not available ({e}).")
             cls.client = None
             cls.db = None
 
+    @classmethod
+    def _connect_sqlite(cls):
+        path = os.getenv("SQLITE_PATH", "data/frontiermap.db")
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            cls.storage = SQLiteStorage(path)
+            print(f"Using embedded SQLite storage at {path}")
+        except Exception as e:
+            print(f"Warning: SQLite storage not available ({e}).")
+
     @classmethod
     async def close_db(cls):
         """Close database connection."""
-        if cls.client:
-            cls.client.close()
-            print("MongoDB connection closed")
+        await cls.writer.stop()
+        if cls.storage is not None:
+            await cls.storage.close()
+            print(f"{cls.storage.name} storage closed")
+        cls.storage = None
+        cls.client = None
+        cls.db = None
 
     # ---- Problem Cards CRUD ----
     @classmethod
     async def save_card(cls, card_data: dict):
-        if cls.db is None:
+        if cls.storage is None:
             return None
         card_data["created_at"] = datetime.utcnow().isoformat()
-        result = await cls.db["problem_cards"].insert_one(card_data)
-        return str(result.inserted_id)
+        return await cls.storage.insert_one("problem_cards", card_data)
 
     @classmethod
     async def get_cards_by_domain(cls, domain: str):
-        if cls.db is None:
-            return []
-        cursor = cls.db["problem_cards"].find({"domain": domain}).sort("created_at", -1)
-        cards = []
-        async for doc in cursor:
-            doc["_id"] = str(doc["_id"])
-            cards.append(doc)
-        return cards
+        """Every card for a domain (walks the pages, for exports)."""
+        cards, cursor = [], None
+        while True:
+            page = await cls.get_cards_page(domain=domain, limit=cls.MAX_PAGE_SIZE, cursor=cursor)
+            cards.extend(page["items"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return cards
+
+    @classmethod
+    async def get_cards_page(cls, domain: str = "", limit: int = 50, cursor: str = None, fields=None):
+        """Newest cards first, optionally for one domain. See _keyset_page."""
+        query = {"domain": domain} if domain else {}
+        return await cls._keyset_page("problem_cards", query, "created_at", limit, cursor, fields)
 
     # ---- Feedback CRUD ----
+    # Per-domain rollup kept next to the raw feedback log: counts per action plus the most
+    # recent bookmarked/dismissed gaps (newest first), so reads never scan the log.
+    FEEDBACK_SUMMARY_RECENT = int(os.getenv("FEEDBACK_SUMMARY_RECENT", "20"))
+    FEEDBACK_SUMMARY_LISTS = ("bookmarked", "dismissed")
+    FEEDBACK_ACTIONS = ("bookmarked", "dismissed", "upvoted", "downvoted")
+    # Domains found to have no feedback (no summary is stored for them) aren't rescanned for
+    # FEEDBACK_EMPTY_CACHE_SECONDS; bounded, least recently added dropped first
+    FEEDBACK_EMPTY_CACHE_SECONDS = float(os.getenv("FEEDBACK_EMPTY_CACHE_SECONDS", "300"))
+    FEEDBACK_EMPTY_CACHE_MAX = 10000
+    _no_feedback: "OrderedDict[str, float]" = OrderedDict()  # domain -> expires at (monotonic)
+
     @classmethod
     async def save_feedback(cls, feedback_data: dict):
-        if cls.db is None:
+        if cls.storage is None:
             return None
+        domain, action = feedback_data.get("domain", ""), feedback_data.get("action", "")
+        if action not in cls.FEEDBACK_ACTIONS:
+            # The action becomes a field path in the summary update
+            raise ValueError(f"unknown feedback action: {action!r}")
         feedback_data["timestamp"] = datetime.utcnow().isoformat()
-        result = await cls.db["feedback"].insert_one(feedback_data)
-        return str(result.inserted_id)
+        feedback_id = await cls._buffer_insert("feedback", feedback_data)
+        cls._no_feedback.pop(domain, None)
+
+        push = None
+        if action in cls.FEEDBACK_SUMMARY_LISTS:
+            push = {action: (feedback_data.get("card_gap", ""), cls.FEEDBACK_SUMMARY_RECENT)}
+        matched = await cls.storage.update(
+            "feedback_summary", domain,
+            set_values={"updated_at": feedback_data["timestamp"]},
+            inc={f"counts.{action}": 1},
+            push=push,
+        )
+        if not matched:
+            # First feedback since summaries were introduced: build it from the log (includes this one)
+            await cls.rebuild_feedback_summary(domain)
+        return feedback_id
+
+    @classmethod
+    async def rebuild_feedback_summary(cls, domain: str) -> dict:
+        """Recompute a domain's summary from the raw feedback log (one scan). Domains without feedback are not stored."""
+        await cls.writer.flush("feedback")
+        summary = {"counts": {}, **{action: [] for action in cls.FEEDBACK_SUMMARY_LISTS}}
+        docs = await cls.storage.find(
+            "feedback", {"domain": domain}, sort=[("timestamp", -1)], fields=["action", "card_gap"]
+        )
+        for doc in docs:
+            action = doc.get("action", "")
+            summary["counts"][action] = summary["counts"].get(action, 0) + 1
+            if action in summary and len(summary[action]) < cls.FEEDBACK_SUMMARY_RECENT:
+                summary[action].append(doc.get("card_gap", ""))
+        summary["updated_at"] = datetime.utcnow().isoformat()
+        if docs:
+            await cls.storage.replace("feedback_summary", domain, summary)
+        return summary
 
     @classmethod
     async def get_feedback_stats(cls, domain: str):
-        if cls.db is None:
-            return {"bookmarked": [], "dismissed": []}
-        bookmarked = []
-        dismissed = []
-        cursor = cls.db["feedback"].find({"domain": domain})
-        async for doc in cursor:
-            if doc.get("action") == "bookmarked":
-                bookmarked.append(doc.get("card_gap", ""))
-            elif doc.get("action") == "dismissed":
-                dismissed.append(doc.get("card_gap", ""))
-        return {"bookmarked": bookmarked, "dismissed": dismissed}
+        if cls.storage is None:
+            return {"bookmarked": [], "dismissed": [], "counts": {}}
+        expires = cls._no_feedback.get(domain)
+        if expires is not None and expires > time.monotonic():
+            return {"bookmarked": [], "dismissed": [], "counts": {}}
+        summary = await cls.storage.find_one("feedback_summary", {"_id": domain})
+        if summary is None:
+            summary = await cls.rebuild_feedback_summary(domain)
+            if not summary["counts"]:
+                cls._no_feedback[domain] = time.monotonic() + cls.FEEDBACK_EMPTY_CACHE_SECONDS
+                cls._no_feedback.move_to_end(domain)
+                if len(cls._no_feedback) > cls.FEEDBACK_EMPTY_CACHE_MAX:
+                    cls._no_feedback.popitem(last=False)
+        return {
+            "bookmarked": summary.get("bookmarked", []),
+            "dismissed": summary.get("dismissed", []),
+            "counts": summary.get("counts", {}),
+        }
 
     # ---- Search History ----
     @classmethod
     async def save_search(cls, domain: str, result_count: int):
-        if cls.db is None:
+        if cls.storage is None:
             return None
-        result = await cls.db["searches"].insert_one({
+        return await cls._buffer_insert("searches", {
             "domain": domain,
             "result_count": result_count,
             "timestamp": datetime.utcnow().isoformat()
         })
-        return str(result.inserted_id)
 
     @classmethod
     async def get_search_history(cls, limit: int = 20):
-        if cls.db is None:
+        page = await cls.get_search_page(limit=limit)
+        return page["items"]
+
+    @classmethod
+    async def get_search_page(cls, domain: str = "", limit: int = 20, cursor: str = None, fields=None):
+        """Newest searches first, optionally for one domain. See _keyset_page."""
+        query = {"domain": domain} if domain else {}
+        await cls.writer.flush("searches")
+        return await cls._keyset_page("searches", query, "timestamp", limit, cursor, fields)
+
+    @classmethod
+    async def get_recent_search_domains(cls, window: int = 500):
+        """Domains of the `window` most recent searches, newest first."""
+        if cls.storage is None:
             return []
-        cursor = cls.db["searches"].find().sort("timestamp", -1).limit(limit)
-        searches = []
-        async for doc in cursor:
-            doc["_id"] = str(doc["_id"])
-            searches.append(doc)
-        return searches
+        await cls.writer.flush("searches")
+        docs = await cls.storage.find("searches", sort=[("timestamp", -1)], limit=window, fields=["domain"])
+        return [doc.get("domain", "") for doc in docs]
 
     # ---- Sentiment Snapshots ----
+    # Each snapshot is also folded into minute/hour/day rollups (count, score sum/min/max and
+    # sums of every numeric per-source field), so history reads one document per bucket.
+    # resolution -> (bucket seconds, retention seconds), finest first
+    SENTIMENT_ROLLUPS = {
+        "minute": (60, float(os.getenv("SENTIMENT_ROLLUP_MINUTE_RETENTION_DAYS", "2")) * 86400),
+        "hour": (3600, float(os.getenv("SENTIMENT_ROLLUP_HOUR_RETENTION_DAYS", "90")) * 86400),
+        "day": (86400, float(os.getenv("SENTIMENT_ROLLUP_DAY_RETENTION_DAYS", "1825")) * 86400),
+    }
+
     @classmethod
     async def save_sentiment(cls, sentiment_data: dict):
-        if cls.db is None:
+        if cls.storage is None:
             return None
+        # Stored under the canonical domain so 'NLP' and 'nlp ' read the same snapshots
+        sentiment_data["domain"] = normalize_domain(sentiment_data.get("domain", ""))
         sentiment_data["timestamp"] = datetime.utcnow().isoformat()
-        result = await cls.db["sentiment"].insert_one(sentiment_data)
-        return str(result.inserted_id)
+        snapshot_id = await cls._buffer_insert("sentiment", sentiment_data)
+        await cls._rollup_sentiment(sentiment_data)
+        return snapshot_id
+
+    @classmethod
+    async def _rollup_sentiment(cls, snapshot: dict):
+        score = snapshot.get("score")
+        if not isinstance(score, (int, float)):
+            return
+        components = {
+            f"components.{source}.{field}": value
+            for source, fields in (snapshot.get("sources") or {}).items()
+            for field, value in fields.items()
+            if isinstance(value, (int, float)) and not isinstance(value, bool)
+        }
+        taken_at = datetime.fromisoformat(snapshot["timestamp"]).replace(tzinfo=timezone.utc).timestamp()
+        domain = normalize_domain(snapshot.get("domain", ""))
+        for resolution, (width, retention) in cls.SENTIMENT_ROLLUPS.items():
+            bucket = datetime.fromtimestamp(taken_at // width * width, timezone.utc).replace(tzinfo=None)
+            await cls.storage.update(
+                "sentiment_rollups", f"{resolution}|{domain}|{bucket:%Y-%m-%dT%H:%M}",
+                set_values={
+                    "domain": domain,
+                    "resolution": resolution,
+                    "bucket": bucket,
+                    "expires_at": bucket + timedelta(seconds=width + retention),
+                },
+                inc={"count": 1, "score_sum": score, **components},
+                min_values={"score_min": score},
+                max_values={"score_max": score},
+                upsert=True,
+            )
+
+    @classmethod
+    async def get_sentiment_rollups(cls, domain: str, resolution: str, start: datetime, end: datetime):
+        """Rollup buckets of one resolution starting in [start, end), oldest first (at most MAX_ROLLUP_POINTS)."""
+        if cls.storage is None:
+            return []
+        return await cls.storage.find(
+            "sentiment_rollups",
+            {"domain": normalize_domain(domain), "resolution": resolution, "bucket": {"$gte": start, "$lt": end}},
+            sort=[("bucket", 1)],
+            limit=cls.MAX_ROLLUP_POINTS,
+        )
 
     @classmethod
     async def get_latest_sentiment(cls, domain: str):
-        if cls.db is None:
+        if cls.storage is None:
             return None
-        doc = await cls.db["sentiment"].find_one(
-            {"domain": domain}, sort=[("timestamp", -1)]
+        await cls.writer.flush("sentiment")
+        return await cls.storage.find_one(
+            "sentiment", {"domain": normalize_domain(domain)}, sort=[("timestamp", -1)]
         )
-        if doc:
-            doc["_id"] = str(doc["_id"])
-        return doc
+
+    # ---- Buffered Inserts ----
+    @classmethod
+    async def _buffer_insert(cls, collection: str, doc: dict) -> str:
+        """Queue `doc` for the next bulk insert; the _id is assigned here so it can be returned now."""
+        doc["_id"] = ObjectId()
+        await cls.writer.add(collection, doc)
+        return str(doc["_id"])
+
+    @classmethod
+    async def _insert_many(cls, collection: str, docs: list):
+        if cls.storage is None:
+            return
+        await cls.storage.insert_many(collection, docs, acknowledged=not cls.UNACKNOWLEDGED_BULK_WRITES)
+
+    # ---- Pagination ----
+    @staticmethod
+    def _encode_cursor(sort_value, doc_id) -> str:
+        raw = json.dumps([sort_value, str(doc_id)]).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii")
+
+    @staticmethod
+    def _decode_cursor(cursor: str):
+        """Raises ValueError for anything that isn't a cursor we issued."""
+        try:
+            sort_value, doc_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Invalid cursor: {cursor}") from e
+        if not ObjectId.is_valid(doc_id):
+            raise ValueError(f"Invalid cursor: {cursor}")
+        return sort_value, doc_id
+
+    @classmethod
+    async def _keyset_page(cls, collection: str, query: dict, sort_field: str, limit: int,
+                           cursor: str = None, fields=None):
+        """
+        One page of `collection` ordered by (sort_field, _id) descending.
+        `cursor` is the opaque next_cursor of the previous page; the next page starts strictly
+        after it, so the query is an index seek rather than a skip. `fields` limits the
+        returned fields (_id and the sort field are always included).
+        Returns {"items", "next_cursor"}; next_cursor is None on the last page.
+        """
+        last = cls._decode_cursor(cursor) if cursor else None
+        if cls.storage is None:
+            return {"items": [], "next_cursor": None}
+        limit = max(1, min(limit, cls.MAX_PAGE_SIZE))
+
+        docs = await cls.storage.find(
+            collection, query,
+            sort=[(sort_field, -1), ("_id", -1)],
+            limit=limit + 1,
+            fields=[*fields, sort_field] if fields else None,
+            after=last,
+        )
+
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            next_cursor = cls._encode_cursor(docs[-1].get(sort_field), docs[-1]["_id"])
+        return {"items": docs, "next_cursor": next_cursor}
+
+    @classmethod
+    async def ensure_indexes(cls):
+        if cls.storage is None:
+            return
+        for collection, indexes in cls.INDEXES.items():
+            for keys in indexes:
+                await cls.storage.ensure_index(collection, keys)
+
+    # ---- Cache Entries ----
+    @classmethod
+    async def ensure_cache_indexes(cls):
+        if cls.storage is None:
+            return
+        for collection, indexes in cls.CACHE_COLLECTIONS.items():
+            await cls.storage.ensure_index(collection, [("expires_at", 1)], ttl=True)
+            for keys in indexes:
+                await cls.storage.ensure_index(collection, keys)
+
+    @classmethod
+    async def get_cache_entry(cls, collection: str, key: str):
+        """Returns {"value", "expires_at" (epoch seconds)} for a live entry, else None."""
+        if cls.storage is None:
+            return None
+        # The TTL monitor only sweeps once a minute, so filter out expired docs ourselves
+        doc = await cls.storage.find_one(
+            collection, {"_id": key, "expires_at": {"$gt": datetime.utcnow()}}
+        )
+        if not doc:
+            return None
+        expires_at = doc["expires_at"]
+        if isinstance(expires_at, str):  # SQLite stores datetimes as ISO text
+            expires_at = datetime.fromisoformat(expires_at)
+        expires_at = expires_at.replace(tzinfo=timezone.utc).timestamp()
+        return {"value": doc["value"], "expires_at": expires_at}
+
+    @classmethod
+    async def find_cache_entries(cls, collection: str, limit: int = 50, **fields):
+        """Live entries whose extra fields match, newest expiry first."""
+        if cls.storage is None:
+            return []
+        return await cls.storage.find(
+            collection, {**fields, "expires_at": {"$gt": datetime.utcnow()}},
+            sort=[("expires_at", -1)], limit=limit,
+        )
+
+    @classmethod
+    async def set_cache_entry(cls, collection: str, key: str, value, ttl_seconds: float, **fields):
+        if cls.storage is None:
+            return None
+        await cls.storage.update(
+            collection, key,
+            set_values={
+                "value": value,
+                "expires_at": datetime.utcnow() + timedelta(seconds=ttl_seconds),
+                **fields,
+            },
+            upsert=True,
+        )
+
+    # ---- Heavy-hitter sketches ----
+    @classmethod
+    async def save_sketch(cls, domain: str, field: str, window: int, worker: str, sketch: dict, ttl_seconds: float):
+        """One worker's sketch for a domain, field and window (replaced on every flush)."""
+        if cls.storage is None:
+            return None
+        await cls.storage.update(
+            "sketches", f"{domain}|{field}|{window}|{worker}",
+            set_values={
+                "domain": domain,
+                "field": field,
+                "window": window,
+                "worker": worker,
+                "sketch": sketch,
+                "expires_at": datetime.utcnow() + timedelta(seconds=ttl_seconds),
+            },
+            upsert=True,
+        )
+
+    @classmethod
+    async def get_sketches(cls, domain: str, field: str, since: int):
+        """Every worker's sketches for a domain and field from window `since` on."""
+        if cls.storage is None:
+            return []
+        return await cls.storage.find(
+            "sketches", {"domain": domain, "field": field, "window": {"$gte": since}},
+            fields=["worker", "window", "sketch"],
+        )
+
+Database.writer = BulkWriter(Database._insert_many)
 
 db = Database()
@@ -0,0 +1,17 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+# Bounded pool for the blocking upstream clients (arxiv, praw).
+# Sized so a burst of requests can't spawn unbounded threads.
+blocking_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("BLOCKING_EXECUTOR_WORKERS", "8")),
+    thread_name_prefix="frontiermap-blocking",
+)
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking callable on the shared executor without stalling the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(blocking_executor, partial(func, *args, **kwargs))
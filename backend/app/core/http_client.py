@@ -0,0 +1,114 @@
+import asyncio
+import os
+from typing import Dict, Optional
+
+import aiohttp
+
+try:
+    import brotli  # noqa: F401  (enables aiohttp's br decoding)
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+
+class HttpClient:
+    """
+    Process-wide pooled aiohttp session shared by every HTTP-based upstream service.
+    Opened in the app lifespan hook; lazily created on first use otherwise (scripts, tests).
+    """
+
+    def __init__(self):
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.connector: Optional[aiohttp.TCPConnector] = None
+        self._loop = None
+        self.in_flight = 0
+        self.counters = {
+            "requests": 0,
+            "connections_created": 0,
+            "connections_reused": 0,
+            "dns_cache_hits": 0,
+            "dns_cache_misses": 0,
+        }
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        trace = aiohttp.TraceConfig()
+
+        async def on_request_start(session, ctx, params):
+            self.counters["requests"] += 1
+            self.in_flight += 1
+
+        async def on_request_done(session, ctx, params):
+            self.in_flight -= 1
+
+        async def on_connection_create_end(session, ctx, params):
+            self.counters["connections_created"] += 1
+
+        async def on_connection_reuseconn(session, ctx, params):
+            self.counters["connections_reused"] += 1
+
+        async def on_dns_cache_hit(session, ctx, params):
+            self.counters["dns_cache_hits"] += 1
+
+        async def on_dns_cache_miss(session, ctx, params):
+            self.counters["dns_cache_misses"] += 1
+
+        trace.on_request_start.append(on_request_start)
+        trace.on_request_end.append(on_request_done)
+        trace.on_request_exception.append(on_request_done)
+        trace.on_connection_create_end.append(on_connection_create_end)
+        trace.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace.on_dns_cache_hit.append(on_dns_cache_hit)
+        trace.on_dns_cache_miss.append(on_dns_cache_miss)
+        return trace
+
+    async def start(self):
+        """Open the shared connection pool."""
+        if self.session is not None and not self.session.closed:
+            return
+        self._loop = asyncio.get_running_loop()
+        self.connector = aiohttp.TCPConnector(
+            limit=int(os.getenv("HTTP_POOL_LIMIT", "100")),
+            limit_per_host=int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "10")),
+            ttl_dns_cache=int(os.getenv("HTTP_DNS_CACHE_TTL", "300")),
+            keepalive_timeout=float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "30")),
+            enable_cleanup_closed=True,
+        )
+        self.session = aiohttp.ClientSession(
+            connector=self.connector,
+            timeout=aiohttp.ClientTimeout(total=10),
+            headers={
+                "Accept-Encoding": ACCEPT_ENCODING,
+                "User-Agent": "FrontierMap v0.1.0",
+            },
+            trace_configs=[self._trace_config()],
+        )
+
+    async def close(self):
+        """Close the shared connection pool."""
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+        self.connector = None
+        self._loop = None
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        if self.session is not None and self._loop is not asyncio.get_running_loop():
+            # Pool belongs to a loop that has since gone away (e.g. a new test loop)
+            self.session = None
+        if self.session is None or self.session.closed:
+            await self.start()
+        return self.session
+
+    def stats(self) -> Dict:
+        """Pool limits (public connector attributes) plus in-flight requests and reuse counters kept here."""
+        connector = self.connector if self.connector is not None and not self.connector.closed else None
+        return {
+            "limit": connector.limit if connector else None,
+            "limit_per_host": connector.limit_per_host if connector else None,
+            "in_flight": self.in_flight,
+            "accept_encoding": ACCEPT_ENCODING,
+            **self.counters,
+        }
+
+
+http_client = HttpClient()
@@ -0,0 +1,8 @@
+import re
+import unicodedata
+
+
+def normalize_domain(domain: str) -> str:
+    """Canonical form of a domain query so 'Machine  Learning ' and 'machine learning' share entries."""
+    text = unicodedata.normalize("NFKC", domain or "").lower()
+    return re.sub(r"\s+", " ", text).strip()
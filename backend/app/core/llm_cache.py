@@ -0,0 +1,143 @@
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional
+
+from app.core.cache import TieredCache
+from app.core.database import db
+from app.core.keys import normalize_domain
+
+
+def _sha1(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class LLMResultCache:
+    """
+    Content-addressed cache for parsed LLM results.
+    The key hashes the prompt version, normalized domain, the set of source ids + content
+    hashes and the feedback section, so identical inputs never hit the model twice.
+    Optionally, a near-identical source set (Jaccard overlap above a threshold) can reuse
+    a cached result too.
+    """
+
+    NAMESPACE = "gaps"
+
+    def __init__(self):
+        self.cache = TieredCache(
+            collection="llm_cache",
+            ttls={self.NAMESPACE: float(os.getenv("LLM_CACHE_TTL", "21600"))},
+            max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "128")),
+        )
+        # 0 disables overlap reuse; e.g. 0.8 reuses a result when 80% of the sources match
+        self.jaccard_threshold = float(os.getenv("LLM_CACHE_JACCARD_THRESHOLD", "0"))
+        self.counters = {"exact_hits": 0, "jaccard_hits": 0, "misses": 0, "stores": 0}
+
+    @staticmethod
+    def fingerprint(source: Dict) -> str:
+        """Stable id + content hash for one source."""
+        content = source.get("summary") or source.get("text") or source.get("body_snippet") or ""
+        source_id = source.get("id") or source.get("url") or source.get("link") or ""
+        return f"{source_id}:{_sha1(str(source.get('title', '')) + content)[:16]}"
+
+    def describe(self, prompt_version: str, domain: str, sources: List[Dict], feedback_section: str, **params) -> Dict:
+        """Everything needed to look up or store one extraction request."""
+        fingerprints = sorted(set(self.fingerprint(s) for s in sources))
+        domain = normalize_domain(domain)
+        feedback_hash = _sha1(feedback_section or "")
+        key_material = json.dumps(
+            {
+                "v": prompt_version,
+                "domain": domain,
+                "sources": fingerprints,
+                "feedback": feedback_hash,
+                "params": params,
+            },
+            sort_keys=True,
+        )
+        return {
+            "key": f"{self.NAMESPACE}:{_sha1(key_material)}",
+            "prompt_version": prompt_version,
+            "domain": domain,
+            "feedback_hash": feedback_hash,
+            "fingerprints": fingerprints,
+        }
+
+    @staticmethod
+    def _jaccard(a: List[str], b: List[str]) -> float:
+        set_a, set_b = set(a), set(b)
+        union = set_a | set_b
+        return len(set_a & set_b) / len(union) if union else 0.0
+
+    async def _find_overlapping(self, request: Dict) -> Optional[List[Dict]]:
+        def matches(entry: Dict) -> bool:
+            return (
+                entry.get("prompt_version") == request["prompt_version"]
+                and entry.get("domain") == request["domain"]
+                and entry.get("feedback_hash") == request["feedback_hash"]
+            )
+
+        candidates = [v for v in self.cache.l1_values() if matches(v)]
+        try:
+            docs = await db.find_cache_entries(
+                self.cache.collection,
+                domain=request["domain"],
+                prompt_version=request["prompt_version"],
+                feedback_hash=request["feedback_hash"],
+            )
+            candidates.extend(doc["value"] for doc in docs)
+        except Exception as e:
+            print(f"LLM cache overlap lookup error: {e}")
+
+        best, best_score = None, 0.0
+        for entry in candidates:
+            score = self._jaccard(request["fingerprints"], entry.get("fingerprints", []))
+            if score > best_score:
+                best, best_score = entry, score
+        if best is not None and best_score >= self.jaccard_threshold:
+            return best["cards"]
+        return None
+
+    async def get(self, request: Dict) -> Optional[List[Dict]]:
+        """Cached card dicts for the request, or None."""
+        entry = await self.cache.get(request["key"])
+        if entry is not None:
+            self.counters["exact_hits"] += 1
+            return entry["cards"]
+
+        if self.jaccard_threshold > 0:
+            cards = await self._find_overlapping(request)
+            if cards is not None:
+                self.counters["jaccard_hits"] += 1
+                return cards
+
+        self.counters["misses"] += 1
+        return None
+
+    async def set(self, request: Dict, cards: List[Dict]):
+        entry = {
+            "cards": cards,
+            "domain": request["domain"],
+            "prompt_version": request["prompt_version"],
+            "feedback_hash": request["feedback_hash"],
+            "fingerprints": request["fingerprints"],
+        }
+        self.counters["stores"] += 1
+        await self.cache.set(
+            self.NAMESPACE,
+            request["key"],
+            entry,
+            domain=request["domain"],
+            prompt_version=request["prompt_version"],
+            feedback_hash=request["feedback_hash"],
+        )
+
+    def stats(self) -> Dict:
+        return {
+            "jaccard_threshold": self.jaccard_threshold,
+            **self.counters,
+            "tiers": self.cache.stats(),
+        }
+
+
+llm_cache = LLMResultCache()
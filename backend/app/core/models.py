@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import List, Literal, Optional
 from datetime import datetime
 
 
@@ -20,10 +20,13 @@ class SearchHistory(BaseModel):
     result_count: int = 0
 
 
+FeedbackAction = Literal["bookmarked", "dismissed", "upvoted", "downvoted"]
+
+
 class FeedbackEntry(BaseModel):
     card_gap: str
     domain: str
-    action: str  # bookmarked, dismissed, upvoted, downvoted
+    action: FeedbackAction
     timestamp: str = Field(default_factory=lambda: datetime.utcnow().isoformat())
 
 
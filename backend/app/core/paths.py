@@ -0,0 +1,10 @@
+import os
+
+# Directory for the files the backend writes itself (local vector index, rate-limit buckets).
+# DATA_DIR overrides it; the default is backend/data whatever the working directory is.
+DATA_DIR = os.path.abspath(os.getenv("DATA_DIR") or os.path.join(os.path.dirname(__file__), "..", "..", "data"))
+
+
+def data_path(*parts: str) -> str:
+    """A path under DATA_DIR; absolute `parts` are returned unchanged."""
+    return os.path.join(DATA_DIR, *parts)
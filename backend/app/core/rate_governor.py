@@ -0,0 +1,306 @@
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+from app.core.paths import data_path
+
+try:
+    import fcntl  # POSIX only; without it buckets are per process
+except ImportError:
+    fcntl = None
+
+
+class RateLimited(Exception):
+    """The upstream's bucket could not grant a request within the allowed wait."""
+
+    def __init__(self, upstream: str, wait: float):
+        super().__init__(f"{upstream} rate limit: next request allowed in {wait:.1f}s")
+        self.upstream = upstream
+        self.wait = wait
+
+
+class TokenBucket:
+    """
+    In-process token bucket: `rate` tokens per second up to `burst`, plus a
+    `blocked_until` time set when the upstream asks us to back off.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._state = {"tokens": burst, "updated": time.time(), "blocked_until": 0.0}
+
+    def _refill(self, state: Dict, now: float) -> Dict:
+        elapsed = max(0.0, now - state["updated"])
+        state["tokens"] = min(self.burst, state["tokens"] + elapsed * self.rate)
+        state["updated"] = now
+        return state
+
+    def _take(self, state: Dict, now: float) -> float:
+        """Take one token from `state`; returns 0, or the seconds to wait before retrying."""
+        state = self._refill(state, now)
+        if now < state["blocked_until"]:
+            return state["blocked_until"] - now
+        if state["tokens"] >= 1:
+            state["tokens"] -= 1
+            return 0.0
+        return (1 - state["tokens"]) / self.rate
+
+    def take(self) -> float:
+        with self._lock:
+            return self._take(self._state, time.time())
+
+    def try_take(self) -> Optional[float]:
+        """take() without waiting on a lock held elsewhere; None when it is busy."""
+        return self.take()
+
+    def block(self, until: float):
+        with self._lock:
+            self._state["blocked_until"] = max(self._state["blocked_until"], until)
+
+    def try_block(self, until: float) -> bool:
+        """block() without waiting on a lock held elsewhere; False when it is busy."""
+        self.block(until)
+        return True
+
+
+class FileTokenBucket(TokenBucket):
+    """
+    Token bucket whose state lives in a small JSON file guarded by flock, so every
+    gunicorn worker on the host draws from the same bucket. The lock is only held
+    for the read-modify-write of a few bytes, but the event loop still never waits on it:
+    try_take() gives up at once when another thread or worker holds it.
+    """
+
+    def __init__(self, rate: float, burst: float, path: str):
+        super().__init__(rate, burst)
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def _update(self, change, blocking: bool = True):
+        """Apply `change` to the shared state under both locks; returns (True, result), or (False, None) if busy."""
+        if not self._lock.acquire(blocking=blocking):
+            return False, None
+        try:
+            with open(self.path, "a+", encoding="utf-8") as f:
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return False, None
+                try:
+                    f.seek(0)
+                    raw = f.read()
+                    state = json.loads(raw) if raw else dict(self._state)
+                    result = change(state)
+                    f.seek(0)
+                    f.truncate()
+                    f.write(json.dumps(state))
+                    f.flush()
+                    return True, result
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+        finally:
+            self._lock.release()
+
+    def take(self) -> float:
+        return self._update(lambda state: self._take(state, time.time()))[1]
+
+    def try_take(self) -> Optional[float]:
+        done, wait = self._update(lambda state: self._take(state, time.time()), blocking=False)
+        return wait if done else None
+
+    @staticmethod
+    def _blocker(until: float):
+        def change(state):
+            state["blocked_until"] = max(state.get("blocked_until", 0.0), until)
+        return change
+
+    def block(self, until: float):
+        self._update(self._blocker(until))
+
+    def try_block(self, until: float) -> bool:
+        return self._update(self._blocker(until), blocking=False)[0]
+
+
+class RateGovernor:
+    """
+    Central pacing for every upstream API, keyed by upstream name.
+
+    Each upstream has a token bucket ({NAME}_RATE_PER_SECOND, {NAME}_RATE_BURST) shared by all
+    workers on the host through a lock file under RATE_LIMIT_DIR, relative to DATA_DIR
+    (RATE_LIMIT_SHARED=false keeps it per process). Callers wait for a token for at most
+    RATE_LIMIT_MAX_WAIT_SECONDS (or {NAME}_RATE_MAX_WAIT_SECONDS) and get RateLimited beyond
+    that; async callers retry every RATE_LIMIT_LOCK_RETRY_MS while another worker holds the
+    bucket's lock. Callers on a blocking-executor thread wait at most
+    RATE_LIMIT_BLOCKING_MAX_WAIT_SECONDS, since the thread is held meanwhile. Retry-After headers and StackExchange `backoff` fields block the bucket
+    until the upstream allows requests again.
+    """
+
+    # (requests per second, burst): Algolia allows ~10k/hour per IP, StackExchange 30/s per IP
+    # (and a small daily quota without a key), arXiv asks for one request every 3 seconds,
+    # Reddit OAuth allows 100 per minute
+    DEFAULT_LIMITS = {
+        "arxiv": (1 / 3, 1),
+        "reddit": (1.5, 10),
+        "hackernews": (2.0, 10),
+        "stackexchange": (1.0, 5),
+    }
+
+    def __init__(self):
+        self.max_wait = float(os.getenv("RATE_LIMIT_MAX_WAIT_SECONDS", "5"))
+        self.shared = os.getenv("RATE_LIMIT_SHARED", "true").lower() == "true" and fcntl is not None
+        self.directory = data_path(os.getenv("RATE_LIMIT_DIR", "rate_limits"))
+        self.lock_retry = float(os.getenv("RATE_LIMIT_LOCK_RETRY_MS", "2")) / 1000
+        self.blocking_max_wait = float(os.getenv("RATE_LIMIT_BLOCKING_MAX_WAIT_SECONDS", "1"))
+        self._pending_blocks = set()
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.counters: Dict[str, Dict] = {}
+        self.quota_remaining: Dict[str, int] = {}
+
+    def _limits(self, upstream: str) -> tuple:
+        rate, burst = self.DEFAULT_LIMITS.get(upstream, (1.0, 5))
+        return (
+            float(os.getenv(f"{upstream.upper()}_RATE_PER_SECOND", rate)),
+            float(os.getenv(f"{upstream.upper()}_RATE_BURST", burst)),
+        )
+
+    def _max_wait(self, upstream: str) -> float:
+        return float(os.getenv(f"{upstream.upper()}_RATE_MAX_WAIT_SECONDS", self.max_wait))
+
+    def bucket(self, upstream: str) -> TokenBucket:
+        bucket = self.buckets.get(upstream)
+        if bucket is None:
+            rate, burst = self._limits(upstream)
+            bucket = TokenBucket(rate, burst)
+            if self.shared:
+                try:
+                    bucket = FileTokenBucket(rate, burst, os.path.join(self.directory, f"{upstream}.json"))
+                except OSError as e:
+                    print(f"Warning: shared rate limit for '{upstream}' unavailable, limiting per process. (Error: {e})")
+            self.buckets[upstream] = bucket
+        return bucket
+
+    def _count(self, upstream: str, counter: str, amount: float = 1):
+        counts = self.counters.setdefault(upstream, {
+            "granted": 0, "waited": 0, "wait_seconds": 0.0, "rejected": 0, "backoffs": 0, "throttled_responses": 0,
+            "lock_retries": 0,
+        })
+        counts[counter] += amount
+
+    def _next_wait(self, upstream: str, deadline: float, waited: bool, blocking: bool = True) -> float:
+        """0 once a token is granted, else the seconds to sleep before asking again."""
+        bucket = self.bucket(upstream)
+        wait = bucket.take() if blocking else bucket.try_take()
+        if wait is None:
+            if time.monotonic() + self.lock_retry > deadline:
+                self._count(upstream, "rejected")
+                raise RateLimited(upstream, self.lock_retry)
+            self._count(upstream, "lock_retries")
+            return self.lock_retry
+        if wait <= 0:
+            self._count(upstream, "granted")
+            return 0.0
+        if time.monotonic() + wait > deadline:
+            self._count(upstream, "rejected")
+            raise RateLimited(upstream, wait)
+        if not waited:
+            self._count(upstream, "waited")
+        self._count(upstream, "wait_seconds", wait)
+        return wait
+
+    async def acquire(self, upstream: str):
+        """Wait for a request slot (queued behind the bucket), or raise RateLimited."""
+        deadline, waited = time.monotonic() + self._max_wait(upstream), False
+        while (wait := self._next_wait(upstream, deadline, waited, blocking=False)) > 0:
+            waited = True
+            await asyncio.sleep(wait)
+
+    def acquire_blocking(self, upstream: str):
+        """acquire() for code already running on a worker thread (the arxiv and praw clients)."""
+        max_wait = min(self._max_wait(upstream), self.blocking_max_wait)
+        deadline, waited = time.monotonic() + max_wait, False
+        while (wait := self._next_wait(upstream, deadline, waited)) > 0:
+            waited = True
+            time.sleep(wait)
+
+    def backoff(self, upstream: str, seconds: float):
+        """Hold every request to this upstream for `seconds` (across workers when shared)."""
+        if not seconds or seconds <= 0:
+            return
+        self._count(upstream, "backoffs")
+        bucket, until = self.bucket(upstream), time.time() + float(seconds)
+        if bucket.try_block(until):
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            bucket.block(until)  # on a worker thread: waiting for the lock is fine
+            return
+        # On the event loop: wait for the lock on a thread instead
+        task = loop.create_task(asyncio.to_thread(bucket.block, until))
+        self._pending_blocks.add(task)
+        task.add_done_callback(self._pending_blocks.discard)
+
+    @staticmethod
+    def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+        """Retry-After as seconds; it may be a number of seconds or an HTTP date."""
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            return None
+
+    def observe(self, upstream: str, status: int, headers=None):
+        """Back off when a response says we are being throttled (429/503 with Retry-After)."""
+        if status not in (429, 503):
+            return
+        self._count(upstream, "throttled_responses")
+        retry_after = self.retry_after_seconds((headers or {}).get("Retry-After"))
+        self.backoff(upstream, retry_after if retry_after is not None else self.max_wait)
+
+    def observe_stackexchange(self, data: Dict):
+        """StackExchange signals throttling in the body: `backoff`, `quota_remaining` and throttle_violation errors."""
+        upstream = "stackexchange"
+        if "backoff" in data:
+            self.backoff(upstream, data["backoff"])
+        if "quota_remaining" in data:
+            self.quota_remaining[upstream] = data["quota_remaining"]
+            if data["quota_remaining"] <= 0:
+                # The daily quota resets at midnight UTC
+                now = datetime.now(timezone.utc)
+                midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+                self.backoff(upstream, (midnight - now).total_seconds())
+        if data.get("error_name") == "throttle_violation":
+            self._count(upstream, "throttled_responses")
+            match = re.search(r"(\d+) seconds", data.get("error_message", ""))
+            self.backoff(upstream, float(match.group(1)) if match else self.max_wait)
+
+    def stats(self) -> Dict:
+        stats = {}
+        for upstream in sorted(set(self.buckets) | set(self.counters)):
+            rate, burst = self._limits(upstream)
+            entry = {
+                "rate_per_second": round(rate, 3),
+                "burst": burst,
+                "max_wait_seconds": self._max_wait(upstream),
+                **self.counters.get(upstream, {}),
+            }
+            if upstream in self.quota_remaining:
+                entry["quota_remaining"] = self.quota_remaining[upstream]
+            stats[upstream] = entry
+        return {"shared": self.shared, "upstreams": stats}
+
+
+rate_governor = RateGovernor()
@@ -0,0 +1,55 @@
+import asyncio
+from typing import Dict
+
+from app.core.keys import normalize_domain
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent computations.
+    The first caller for a key starts the work; callers arriving while it is in flight
+    await the same task and get the same result (or the same exception).
+    """
+
+    def __init__(self):
+        self._inflight: Dict[tuple, asyncio.Task] = {}
+        self.counters = {
+            "calls": 0,
+            "executions": 0,
+            "collapsed": 0,
+            "errors": 0,
+        }
+
+    @staticmethod
+    def make_key(stage: str, domain: str, **params) -> tuple:
+        return (stage, normalize_domain(domain), tuple(sorted(params.items())))
+
+    def _forget(self, key: tuple, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved even if every waiter was cancelled
+        if not task.cancelled() and task.exception() is not None:
+            self.counters["errors"] += 1
+
+    async def do(self, key: tuple, func, *args, **kwargs):
+        """Run `func(*args, **kwargs)` once per key among concurrent callers."""
+        self.counters["calls"] += 1
+        task = self._inflight.get(key)
+        if task is None:
+            self.counters["executions"] += 1
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            self.counters["collapsed"] += 1
+        # Shield so one caller disconnecting doesn't cancel the work for everyone else
+        return await asyncio.shield(task)
+
+    def in_flight(self, key: tuple) -> bool:
+        return key in self._inflight
+
+    def stats(self) -> Dict:
+        return {"in_flight": len(self._inflight), **self.counters}
+
+
+single_flight = SingleFlight()
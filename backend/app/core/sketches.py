@@ -0,0 +1,158 @@
+import base64
+import hashlib
+from typing import Dict, List
+
+import numpy as np
+
+
+class CountMinSketch:
+    """
+    Count-Min sketch: `depth` rows of `width` counters. Estimates never undercount and
+    overcount by at most ~e/width of the total with probability 1 - e^-depth.
+    Hashing is keyed blake2b rather than hash(), so every worker maps an item to the
+    same cells and sketches of equal shape merge by adding their tables.
+    """
+
+    def __init__(self, width: int = 2048, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self._rows = np.arange(depth)
+
+    def _cells(self, item: str) -> np.ndarray:
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        # Kirsch–Mitzenmacher double hashing: row i uses h1 + i*h2
+        return np.array([(h1 + i * h2) % self.width for i in range(self.depth)])
+
+    def add(self, item: str, count: int = 1):
+        self.table[self._rows, self._cells(item)] += count
+
+    def estimate(self, item: str) -> int:
+        return int(self.table[self._rows, self._cells(item)].min())
+
+    def merge(self, other: "CountMinSketch"):
+        if (self.width, self.depth) != (other.width, other.depth):
+            raise ValueError("cannot merge Count-Min sketches of different shapes")
+        self.table += other.table
+
+    def to_dict(self) -> Dict:
+        return {
+            "width": self.width,
+            "depth": self.depth,
+            "table": base64.b64encode(self.table.astype("<i8").tobytes()).decode("ascii"),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "CountMinSketch":
+        sketch = cls(data["width"], data["depth"])
+        table = np.frombuffer(base64.b64decode(data["table"]), dtype="<i8")
+        sketch.table = table.reshape(sketch.depth, sketch.width).astype(np.int64)
+        return sketch
+
+
+class SpaceSaving:
+    """
+    Space-Saving top-k summary (Metwally et al.) tracking at most `capacity` items.
+    A new item evicts the smallest counter and inherits its count as error, so every
+    item with true frequency above total/capacity is guaranteed to be present and
+    count - error <= true count <= count.
+    """
+
+    def __init__(self, capacity: int = 200):
+        self.capacity = capacity
+        self.counts: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+
+    def add(self, item: str, count: int = 1):
+        if item in self.counts:
+            self.counts[item] += count
+            return
+        error = 0
+        if len(self.counts) >= self.capacity:
+            victim = min(self.counts, key=self.counts.get)
+            error = self.counts.pop(victim)
+            del self.errors[victim]
+        self.counts[item] = error + count
+        self.errors[item] = error
+
+    def floor(self) -> int:
+        """Upper bound on the count of any item not tracked."""
+        return min(self.counts.values()) if len(self.counts) >= self.capacity else 0
+
+    def merge(self, other: "SpaceSaving"):
+        """Mergeable summaries (Agarwal et al.): untracked items count as the other side's floor."""
+        floor_self, floor_other = self.floor(), other.floor()
+        combined = {}
+        for item in self.counts.keys() | other.counts.keys():
+            combined[item] = (
+                self.counts.get(item, floor_self) + other.counts.get(item, floor_other),
+                self.errors.get(item, floor_self) + other.errors.get(item, floor_other),
+            )
+        kept = sorted(combined.items(), key=lambda kv: (-kv[1][0], kv[0]))[:self.capacity]
+        self.counts = {item: count for item, (count, _) in kept}
+        self.errors = {item: error for item, (_, error) in kept}
+
+    def top(self, n: int) -> List[tuple]:
+        """(item, count, error) for the n largest counters."""
+        best = sorted(self.counts.items(), key=lambda kv: (-kv[1], kv[0]))[:n]
+        return [(item, count, self.errors[item]) for item, count in best]
+
+    def to_dict(self) -> Dict:
+        # A list rather than a mapping: author names and category codes contain dots,
+        # which MongoDB would read as nested field paths
+        return {"capacity": self.capacity, "items": [[i, c, self.errors[i]] for i, c in self.counts.items()]}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "SpaceSaving":
+        summary = cls(data["capacity"])
+        summary.counts = {item: count for item, count, _ in data["items"]}
+        summary.errors = {item: error for item, _, error in data["items"]}
+        return summary
+
+
+class HeavyHitters:
+    """
+    Space-Saving for the candidate top items plus Count-Min for a second, independent
+    upper bound; reported counts are the smaller of the two.
+    """
+
+    def __init__(self, capacity: int = 200, width: int = 2048, depth: int = 4):
+        self.summary = SpaceSaving(capacity)
+        self.sketch = CountMinSketch(width, depth)
+        self.total = 0
+
+    def add(self, item: str, count: int = 1):
+        self.summary.add(item, count)
+        self.sketch.add(item, count)
+        self.total += count
+
+    def estimate(self, item: str) -> int:
+        estimate = self.sketch.estimate(item)
+        if item in self.summary.counts:
+            estimate = min(estimate, self.summary.counts[item])
+        return estimate
+
+    def merge(self, other: "HeavyHitters"):
+        self.summary.merge(other.summary)
+        self.sketch.merge(other.sketch)
+        self.total += other.total
+
+    def top(self, n: int = 10) -> List[Dict]:
+        results = []
+        for item, count, error in self.summary.top(n):
+            upper = min(count, self.sketch.estimate(item))
+            results.append({"name": item, "count": upper, "min_count": max(count - error, 0)})
+        return results
+
+    def to_dict(self) -> Dict:
+        return {"summary": self.summary.to_dict(), "sketch": self.sketch.to_dict(), "total": self.total}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "HeavyHitters":
+        hitters = cls.__new__(cls)
+        hitters.summary = SpaceSaving.from_dict(data["summary"])
+        hitters.sketch = CountMinSketch.from_dict(data["sketch"])
+        hitters.total = data["total"]
+        return hitters
@@ -0,0 +1,360 @@
+"""
+Storage backends behind `Database`.
+
+Both implement the same small document-store interface; `Database` keeps all the
+collection-specific logic and only ever talks to these primitives:
+
+  ensure_index(collection, keys, ttl=False)
+  insert_one(collection, doc) -> id          insert_many(collection, docs, acknowledged=True)
+  find(collection, where, sort, limit, fields, after) -> [doc]
+  find_one(collection, where, sort) -> doc | None
+  update(collection, doc_id, set_values, inc, push, min_values, max_values, upsert) -> matched
+  replace(collection, doc_id, doc)
+
+`where` maps fields to a value (equality) or to {"$gt" | "$gte" | "$lt" | "$lte": value}.
+`after=(value, _id)` continues a keyset scan sorted by (sort[0] field, _id) descending.
+`push` maps a list field to (value, cap): the value is prepended and the list cut to cap.
+`min_values` / `max_values` set a field only if the value is lower / higher (or the field is missing).
+Returned documents carry `_id` as a string.
+"""
+
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+from typing import Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import WriteConcern
+from pymongo.errors import BulkWriteError
+
+RANGE_OPS = {"$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+
+
+class MongoStorage:
+    """MongoDB through Motor; a thin translation of the primitives to native queries."""
+
+    name = "mongo"
+
+    def __init__(self, client, db):
+        self.client = client
+        self.db = db
+
+    @staticmethod
+    def _native_id(doc_id):
+        return ObjectId(doc_id) if isinstance(doc_id, str) and ObjectId.is_valid(doc_id) else doc_id
+
+    @staticmethod
+    def _out(doc: Optional[dict]) -> Optional[dict]:
+        if doc is not None and "_id" in doc:
+            doc["_id"] = str(doc["_id"])
+        return doc
+
+    async def ensure_index(self, collection: str, keys: List[Tuple[str, int]], ttl: bool = False):
+        if ttl:
+            await self.db[collection].create_index(keys, expireAfterSeconds=0)
+        else:
+            await self.db[collection].create_index(keys)
+
+    async def insert_one(self, collection: str, doc: dict) -> str:
+        # Insert a copy: the driver would otherwise add an ObjectId to the caller's dict
+        result = await self.db[collection].insert_one(dict(doc))
+        return str(result.inserted_id)
+
+    async def insert_many(self, collection: str, docs: List[dict], acknowledged: bool = True):
+        target = self.db[collection]
+        if not acknowledged:
+            target = target.with_options(write_concern=WriteConcern(w=0))
+        try:
+            await target.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            # Documents carry their _id, so duplicate keys are documents a retried batch already
+            # stored; skip them like SQLite's INSERT OR IGNORE and only raise for real failures
+            details = e.details or {}
+            if details.get("writeConcernErrors") or any(
+                error.get("code") != 11000 for error in details.get("writeErrors", [])
+            ):
+                raise
+
+    async def find(self, collection: str, where: Optional[Dict] = None, sort: Optional[List] = None,
+                   limit: Optional[int] = None, fields: Optional[List[str]] = None,
+                   after: Optional[Tuple] = None) -> List[dict]:
+        query = dict(where or {})
+        if after is not None:
+            sort_field, (value, last_id) = sort[0][0], after
+            query["$or"] = [
+                {sort_field: {"$lt": value}},
+                {sort_field: value, "_id": {"$lt": self._native_id(last_id)}},
+            ]
+        projection = {f: 1 for f in fields} if fields else None
+        cursor = self.db[collection].find(query, projection)
+        if sort:
+            cursor = cursor.sort(sort)
+        if limit:
+            cursor = cursor.limit(limit)
+        return [self._out(doc) async for doc in cursor]
+
+    async def find_one(self, collection: str, where: Dict, sort: Optional[List] = None) -> Optional[dict]:
+        docs = await self.find(collection, where, sort=sort, limit=1)
+        return docs[0] if docs else None
+
+    async def update(self, collection: str, doc_id, set_values: Optional[Dict] = None, inc: Optional[Dict] = None,
+                     push: Optional[Dict] = None, min_values: Optional[Dict] = None,
+                     max_values: Optional[Dict] = None, upsert: bool = False) -> bool:
+        update = {}
+        if set_values:
+            update["$set"] = set_values
+        if inc:
+            update["$inc"] = inc
+        if push:
+            update["$push"] = {
+                field: {"$each": [value], "$position": 0, "$slice": cap}
+                for field, (value, cap) in push.items()
+            }
+        if min_values:
+            update["$min"] = min_values
+        if max_values:
+            update["$max"] = max_values
+        result = await self.db[collection].update_one({"_id": doc_id}, update, upsert=upsert)
+        return result.matched_count > 0
+
+    async def replace(self, collection: str, doc_id, doc: dict):
+        await self.db[collection].replace_one({"_id": doc_id}, doc, upsert=True)
+
+    async def close(self):
+        self.client.close()
+
+
+class SQLiteStorage:
+    """
+    Embedded single-node backend: one SQLite table per collection holding JSON documents,
+    with expression indexes on the queried fields. Runs in WAL mode with synchronous=NORMAL,
+    so commits don't fsync and readers never block the writer.
+    Several worker processes can share the file (writes serialize on SQLite's lock). Waiting
+    for that lock (up to SQLITE_BUSY_TIMEOUT_MS) can take a while under contention, so every
+    statement runs on a dedicated thread that owns the connection, never on the event loop.
+    """
+
+    name = "sqlite"
+
+    NAME_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_.]*$")
+    PURGE_INTERVAL = 60.0
+
+    def __init__(self, path: str):
+        self.path = path
+        # One thread: statements on the shared connection run in order, without a lock
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="frontiermap-sqlite")
+        self.conn = self._executor.submit(self._connect).result()
+        self._tables = set()
+        self._ttl_fields: Dict[str, str] = {}
+        self._last_purge = 0.0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))}")
+        return conn
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    # ---- Encoding ----
+    @staticmethod
+    def _encode_value(value):
+        # Fixed-width timestamps so stored datetimes compare correctly as text
+        if isinstance(value, datetime):
+            return value.strftime("%Y-%m-%dT%H:%M:%S.%f")
+        if isinstance(value, ObjectId):
+            return str(value)
+        raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+    def _dumps(self, doc: dict) -> str:
+        return json.dumps(doc, default=self._encode_value)
+
+    def _param(self, value):
+        if isinstance(value, (datetime, ObjectId)):
+            return self._encode_value(value)
+        return value
+
+    def _name(self, name: str) -> str:
+        if not self.NAME_RE.match(name):
+            raise ValueError(f"Invalid collection or field name: {name}")
+        return name
+
+    def _field(self, field: str) -> str:
+        if field == "_id":
+            return "_id"
+        return f"json_extract(doc, '$.{self._name(field)}')"
+
+    def _table(self, collection: str) -> str:
+        name = self._name(collection).replace(".", "_")
+        if name not in self._tables:
+            self.conn.execute(f'CREATE TABLE IF NOT EXISTS "{name}" (_id TEXT PRIMARY KEY, doc TEXT NOT NULL)')
+            self._tables.add(name)
+        return f'"{name}"'
+
+    def _row(self, row) -> dict:
+        doc = json.loads(row[1])
+        doc["_id"] = row[0]
+        return doc
+
+    # ---- Primitives (sync bodies run on the storage thread) ----
+    def _ensure_index(self, collection: str, keys: List[Tuple[str, int]], ttl: bool):
+        table = self._table(collection)
+        columns = ", ".join(f"{self._field(f)} {'DESC' if d < 0 else 'ASC'}" for f, d in keys)
+        index = "ix_" + "_".join([table.strip('"')] + [f.replace(".", "_") for f, _ in keys])
+        self.conn.execute(f'CREATE INDEX IF NOT EXISTS "{index}" ON {table} ({columns})')
+        if ttl:
+            self._ttl_fields[collection] = keys[0][0]
+            self._purge_expired(force=True)
+
+    async def ensure_index(self, collection: str, keys: List[Tuple[str, int]], ttl: bool = False):
+        await self._run(self._ensure_index, collection, keys, ttl)
+
+    def _purge_expired(self, force: bool = False):
+        """TTL emulation: delete expired documents, at most once per PURGE_INTERVAL."""
+        now = time.monotonic()
+        if not force and now - self._last_purge < self.PURGE_INTERVAL:
+            return
+        self._last_purge = now
+        cutoff = self._encode_value(datetime.utcnow())
+        for collection, field in self._ttl_fields.items():
+            self.conn.execute(f"DELETE FROM {self._table(collection)} WHERE {self._field(field)} <= ?", (cutoff,))
+
+    def _insert_one(self, collection: str, doc: dict) -> str:
+        doc_id = str(doc.get("_id") or ObjectId())
+        body = {k: v for k, v in doc.items() if k != "_id"}
+        self.conn.execute(f"INSERT INTO {self._table(collection)} VALUES (?, ?)", (doc_id, self._dumps(body)))
+        return doc_id
+
+    async def insert_one(self, collection: str, doc: dict) -> str:
+        return await self._run(self._insert_one, collection, doc)
+
+    def _insert_many(self, collection: str, docs: List[dict]):
+        # Like an unordered insert_many: duplicates are skipped, the rest still go in
+        rows = []
+        for doc in docs:
+            rows.append((str(doc.get("_id") or ObjectId()), self._dumps({k: v for k, v in doc.items() if k != "_id"})))
+        table = self._table(collection)
+        self.conn.execute("BEGIN")
+        try:
+            self.conn.executemany(f"INSERT OR IGNORE INTO {table} VALUES (?, ?)", rows)
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    async def insert_many(self, collection: str, docs: List[dict], acknowledged: bool = True):
+        await self._run(self._insert_many, collection, docs)
+
+    def _where(self, where: Optional[Dict]) -> Tuple[List[str], List]:
+        clauses, params = [], []
+        for field, condition in (where or {}).items():
+            column = self._field(field)
+            if isinstance(condition, dict):
+                for op, value in condition.items():
+                    clauses.append(f"{column} {RANGE_OPS[op]} ?")
+                    params.append(self._param(value))
+            else:
+                clauses.append(f"{column} = ?")
+                params.append(self._param(condition))
+        return clauses, params
+
+    def _find(self, collection: str, where: Optional[Dict], sort: Optional[List], limit: Optional[int],
+              fields: Optional[List[str]], after: Optional[Tuple]) -> List[dict]:
+        clauses, params = self._where(where)
+        if after is not None:
+            column, (value, last_id) = self._field(sort[0][0]), after
+            clauses.append(f"({column} < ? OR ({column} = ? AND _id < ?))")
+            params += [self._param(value), self._param(value), str(last_id)]
+
+        sql = f"SELECT _id, doc FROM {self._table(collection)}"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        if sort:
+            sql += " ORDER BY " + ", ".join(f"{self._field(f)} {'DESC' if d < 0 else 'ASC'}" for f, d in sort)
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        rows = self.conn.execute(sql, params).fetchall()
+
+        docs = [self._row(row) for row in rows]
+        if fields:
+            docs = [{k: v for k, v in doc.items() if k == "_id" or k in fields} for doc in docs]
+        return docs
+
+    async def find(self, collection: str, where: Optional[Dict] = None, sort: Optional[List] = None,
+                   limit: Optional[int] = None, fields: Optional[List[str]] = None,
+                   after: Optional[Tuple] = None) -> List[dict]:
+        return await self._run(self._find, collection, where, sort, limit, fields, after)
+
+    async def find_one(self, collection: str, where: Dict, sort: Optional[List] = None) -> Optional[dict]:
+        docs = await self.find(collection, where, sort=sort, limit=1)
+        return docs[0] if docs else None
+
+    @staticmethod
+    def _path(doc: dict, dotted: str) -> Tuple[dict, str]:
+        *parents, leaf = dotted.split(".")
+        for part in parents:
+            doc = doc.setdefault(part, {})
+        return doc, leaf
+
+    def _update(self, collection: str, doc_id: str, set_values: Optional[Dict], inc: Optional[Dict],
+                push: Optional[Dict], min_values: Optional[Dict], max_values: Optional[Dict], upsert: bool) -> bool:
+        table = self._table(collection)
+        # IMMEDIATE takes the write lock up front so read-modify-write is atomic across processes
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.conn.execute(f"SELECT _id, doc FROM {table} WHERE _id = ?", (doc_id,)).fetchone()
+            if row is None and not upsert:
+                self.conn.execute("ROLLBACK")
+                return False
+            doc = json.loads(row[1]) if row else {}
+            for field, value in (set_values or {}).items():
+                parent, leaf = self._path(doc, field)
+                parent[leaf] = value
+            for field, amount in (inc or {}).items():
+                parent, leaf = self._path(doc, field)
+                parent[leaf] = parent.get(leaf, 0) + amount
+            for field, (value, cap) in (push or {}).items():
+                parent, leaf = self._path(doc, field)
+                parent[leaf] = ([value] + parent.get(leaf, []))[:cap]
+            for field, value in (min_values or {}).items():
+                parent, leaf = self._path(doc, field)
+                parent[leaf] = value if parent.get(leaf) is None else min(parent[leaf], value)
+            for field, value in (max_values or {}).items():
+                parent, leaf = self._path(doc, field)
+                parent[leaf] = value if parent.get(leaf) is None else max(parent[leaf], value)
+            self.conn.execute(f"INSERT OR REPLACE INTO {table} VALUES (?, ?)", (doc_id, self._dumps(doc)))
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        self._purge_expired()
+        return row is not None
+
+    async def update(self, collection: str, doc_id, set_values: Optional[Dict] = None, inc: Optional[Dict] = None,
+                     push: Optional[Dict] = None, min_values: Optional[Dict] = None,
+                     max_values: Optional[Dict] = None, upsert: bool = False) -> bool:
+        return await self._run(
+            self._update, collection, str(doc_id), set_values, inc, push, min_values, max_values, upsert
+        )
+
+    def _replace(self, collection: str, doc_id: str, doc: dict):
+        body = {k: v for k, v in doc.items() if k != "_id"}
+        self.conn.execute(
+            f"INSERT OR REPLACE INTO {self._table(collection)} VALUES (?, ?)", (doc_id, self._dumps(body))
+        )
+
+    async def replace(self, collection: str, doc_id, doc: dict):
+        await self._run(self._replace, collection, str(doc_id), doc)
+
+    async def close(self):
+        await self._run(self.conn.close)
+        self._executor.shutdown(wait=False)
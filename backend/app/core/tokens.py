@@ -0,0 +1,31 @@
+import os
+
+# Resolved lazily: tiktoken downloads its BPE file on first use, which fails offline
+_encoding = None
+_encoding_unavailable = False
+
+
+def _get_encoding():
+    global _encoding, _encoding_unavailable
+    if _encoding is None and not _encoding_unavailable:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding(os.getenv("TOKEN_ENCODING", "cl100k_base"))
+        except Exception as e:
+            print(f"Info: tiktoken unavailable, estimating token counts. (Error: {e})")
+            _encoding_unavailable = True
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """
+    Token count for budgeting prompts.
+    Uses tiktoken when available (close enough to Llama's tokenizer for budgeting),
+    otherwise the usual ~4 characters per token estimate.
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return max(1, len(text) // 4)
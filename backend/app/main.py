@@ -4,12 +4,33 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from .api.discovery import router as discovery_router
 from .core.database import db
+from .core.http_client import http_client
+from .core.background import background_queue
+from .core.cache import source_cache
+from .core.singleflight import single_flight
+from .core.llm_cache import llm_cache
+from .core.rate_governor import rate_governor
+from .core.circuit_breaker import circuit_breakers
+from .services.context_packer import context_packer
+from .services.vector_service import vector_service
+from .services.pulse_service import pulse_service
+from .services.prewarm_service import prewarm_scheduler
+from .services.heavy_hitter_service import heavy_hitters
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await db.connect_db()
+    await http_client.start()
+    await background_queue.start()
+    await heavy_hitters.start()
+    await prewarm_scheduler.start()
     yield
+    await prewarm_scheduler.stop()
+    await heavy_hitters.stop()
+    # Flush pending writes while the DB and HTTP pool are still open
+    await background_queue.stop()
+    await http_client.close()
     await db.close_db()
 
 app = FastAPI(title="FrontierMap API", version="0.1.0", lifespan=lifespan)
@@ -21,6 +42,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Sources-Timed-Out"],
 )
 
 app.include_router(discovery_router)
@@ -32,3 +54,23 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+@app.get("/stats")
+async def runtime_stats():
+    """Internal counters for tuning connection reuse, caching, request coalescing and background writes."""
+    return {
+        "storage": db.storage.name if db.storage else None,
+        "http_pool": http_client.stats(),
+        "rate_limits": rate_governor.stats(),
+        "circuit_breakers": circuit_breakers.stats(),
+        "source_cache": source_cache.stats(),
+        "single_flight": single_flight.stats(),
+        "llm_cache": llm_cache.stats(),
+        "prompt_packing": context_packer.stats(),
+        "vector_upserts": vector_service.stats(),
+        "pulse": pulse_service.stats(),
+        "prewarm": prewarm_scheduler.stats(),
+        "heavy_hitters": heavy_hitters.stats(),
+        "background_queue": background_queue.stats(),
+        "bulk_writes": db.writer.stats(),
+    }
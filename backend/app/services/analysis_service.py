@@ -1,4 +1,7 @@
+import asyncio
+import logging
 import os
+import re
 from typing import List, Dict, Optional
 from langchain_groq import ChatGroq
 from langchain_core.prompts import ChatPromptTemplate
@@ -6,8 +9,43 @@ from langchain_core.output_parsers import PydanticOutputParser
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
+from app.core.llm_cache import llm_cache
+from app.services.context_packer import context_packer
+from app.services.card_stream_parser import CardStreamParser
+
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Bump whenever the gap-extraction prompt changes so cached results are not reused
+GAP_PROMPT_VERSION = "gaps-v1"
+
+GAP_PROMPT = ChatPromptTemplate.from_template(
+    "You are a Senior Research Analyst. The user is researching the domain: '{domain}'.\n"
+    "You are given REAL research papers and technical discussions below.\n"
+    "Your job is to identify UNSOLVED PROBLEMS, LIMITATIONS, or OPEN QUESTIONS explicitly mentioned in these sources\n"
+    "that are DIRECTLY RELEVANT to '{domain}'.\n"
+    "\n"
+    "CRITICAL RULES:\n"
+    "1. ONLY extract gaps that are EXPLICITLY mentioned in the provided sources (e.g. in 'future work', 'limitations', or open questions).\n"
+    "2. Every gap MUST be directly related to '{domain}'. Discard any source or gap that is not clearly about this domain.\n"
+    "   For example, if the domain is 'heart attacks', ignore sources about cybersecurity attacks, DDoS, or software issues.\n"
+    "3. The 'source_citation' field MUST be the EXACT title of one of the sources below — do NOT invent or hallucinate paper titles.\n"
+    "4. The 'source_url' field MUST be the EXACT URL from the source below — do NOT make up URLs.\n"
+    "5. The 'context' field must reference specific findings or statements from that source.\n"
+    "6. Do NOT generate generic gaps. Every gap must be traceable to a specific source below.\n"
+    "7. If a source has no clear gap or limitation, OR is not relevant to '{domain}', skip it entirely.\n"
+    "8. If none of the sources are relevant to '{domain}', return an EMPTY list of cards.\n"
+    "\n"
+    "Format the output as a list of Problem Cards.\n"
+    "\n"
+    "{format_instructions}\n"
+    "{feedback}"
+    "\n"
+    "SOURCES:\n"
+    "{sources}\n"
+)
+
 class ProblemCard(BaseModel):
     gap: str = Field(description="The specific research or implementation gap identified from the provided sources.")
     context: str = Field(description="Background information and why this gap is important, referencing specific findings from the provided papers/discussions.")
@@ -26,15 +64,114 @@ class AnalysisService:
             api_key=os.getenv("GROQ_API_KEY")
         )
         self.parser = PydanticOutputParser(pydantic_object=ProblemCardList)
+        # Large source sets are split into shards extracted concurrently
+        self.shard_size = int(os.getenv("GAP_SHARD_SIZE", "8"))
+        self.dedupe_threshold = float(os.getenv("GAP_DEDUPE_THRESHOLD", "0.7"))
+        self.llm_semaphore = asyncio.Semaphore(int(os.getenv("LLM_MAX_CONCURRENCY", "4")))
 
     async def extract_gaps(self, content_list: List[Dict], domain: str = "", feedback: Optional[Dict] = None) -> List[ProblemCard]:
         """
         Processes a list of documents (papers/threads) and extracts actionable gaps.
         Optionally uses user feedback to prioritize relevant directions.
+        Large source sets are split into shards that are extracted concurrently, then merged.
         """
         if not content_list:
             return []
 
+        feedback_section = self._feedback_section(feedback)
+
+        # Identical (or, if enabled, heavily overlapping) source sets reuse an earlier parse
+        cache_request = self._cache_request(content_list, domain, feedback_section)
+        cached_cards = await llm_cache.get(cache_request)
+        if cached_cards is not None:
+            return [ProblemCard(**card) for card in cached_cards]
+
+        shards = self._shards(content_list, domain)
+        if not shards:
+            return []
+
+        # Map: one extraction call per shard, all in flight at once (bounded by the global semaphore)
+        results = await asyncio.gather(
+            *(self._extract_shard(shard, domain, feedback_section) for shard in shards),
+            return_exceptions=True,
+        )
+
+        # Reduce: merge shard outputs, dropping duplicate gaps
+        card_lists, failed = [], 0
+        for result in results:
+            if isinstance(result, Exception):
+                failed += 1
+                logger.warning("Gap extraction shard failed: %s", result)
+            else:
+                card_lists.append(result)
+        cards = self._merge_cards(card_lists)
+
+        # A partial merge is served but not cached, so one transient failure isn't reused for the TTL
+        if cards and not failed:
+            await llm_cache.set(cache_request, [card.model_dump() for card in cards])
+        return cards
+
+    async def stream_gaps(self, content_list: List[Dict], domain: str = "", feedback: Optional[Dict] = None):
+        """
+        Streaming variant of extract_gaps: yields each ProblemCard as soon as its JSON object
+        is complete in any shard's streamed completion. Duplicates across shards are skipped.
+        """
+        if not content_list:
+            return
+
+        feedback_section = self._feedback_section(feedback)
+        cache_request = self._cache_request(content_list, domain, feedback_section)
+        cached_cards = await llm_cache.get(cache_request)
+        if cached_cards is not None:
+            for card in cached_cards:
+                yield ProblemCard(**card)
+            return
+
+        shards = self._shards(content_list, domain)
+        if not shards:
+            return
+
+        queue: asyncio.Queue = asyncio.Queue()
+        done_marker = object()
+        failures = []
+
+        async def run_shard(shard):
+            try:
+                async for card in self._stream_shard(shard, domain, feedback_section):
+                    await queue.put(card)
+            except Exception as e:
+                failures.append(e)
+                logger.warning("Streamed gap extraction shard failed: %s", e)
+            finally:
+                await queue.put(done_marker)
+
+        tasks = [asyncio.ensure_future(run_shard(shard)) for shard in shards]
+        cards: List[ProblemCard] = []
+        seen_words: List[set] = []
+        try:
+            remaining = len(tasks)
+            while remaining:
+                item = await queue.get()
+                if item is done_marker:
+                    remaining -= 1
+                    continue
+                words = self._gap_words(item)
+                if self._find_duplicate(words, seen_words) is not None:
+                    continue
+                seen_words.append(words)
+                cards.append(item)
+                yield item
+        finally:
+            # Client went away mid-stream: stop the remaining completions
+            for task in tasks:
+                task.cancel()
+
+        # As in extract_gaps, only complete results are cached
+        if cards and not failures:
+            await llm_cache.set(cache_request, [card.model_dump() for card in cards])
+
+    @staticmethod
+    def _feedback_section(feedback: Optional[Dict]) -> str:
         feedback_section = ""
         if feedback:
             bookmarked = feedback.get("bookmarked", [])
@@ -46,62 +183,73 @@ class AnalysisService:
                 if dismissed:
                     feedback_section += f"Topics the user dismissed: {', '.join(dismissed[:5])}\n"
                 feedback_section += "Prioritize gaps similar to the user's interests and avoid directions they've dismissed.\n"
+        return feedback_section
 
-        prompt = ChatPromptTemplate.from_template(
-            "You are a Senior Research Analyst. The user is researching the domain: '{domain}'.\n"
-            "You are given REAL research papers and technical discussions below.\n"
-            "Your job is to identify UNSOLVED PROBLEMS, LIMITATIONS, or OPEN QUESTIONS explicitly mentioned in these sources\n"
-            "that are DIRECTLY RELEVANT to '{domain}'.\n"
-            "\n"
-            "CRITICAL RULES:\n"
-            "1. ONLY extract gaps that are EXPLICITLY mentioned in the provided sources (e.g. in 'future work', 'limitations', or open questions).\n"
-            "2. Every gap MUST be directly related to '{domain}'. Discard any source or gap that is not clearly about this domain.\n"
-            "   For example, if the domain is 'heart attacks', ignore sources about cybersecurity attacks, DDoS, or software issues.\n"
-            "3. The 'source_citation' field MUST be the EXACT title of one of the sources below — do NOT invent or hallucinate paper titles.\n"
-            "4. The 'source_url' field MUST be the EXACT URL from the source below — do NOT make up URLs.\n"
-            "5. The 'context' field must reference specific findings or statements from that source.\n"
-            "6. Do NOT generate generic gaps. Every gap must be traceable to a specific source below.\n"
-            "7. If a source has no clear gap or limitation, OR is not relevant to '{domain}', skip it entirely.\n"
-            "8. If none of the sources are relevant to '{domain}', return an EMPTY list of cards.\n"
-            "\n"
-            "Format the output as a list of Problem Cards.\n"
-            "\n"
-            "{format_instructions}\n"
-            "{feedback}"
-            "\n"
-            "SOURCES:\n"
-            "{sources}\n"
+    def _cache_request(self, content_list: List[Dict], domain: str, feedback_section: str) -> Dict:
+        return llm_cache.describe(
+            GAP_PROMPT_VERSION, domain, content_list, feedback_section,
+            token_budget=context_packer.budget, shard_size=self.shard_size,
         )
 
-        sources_text = ""
-        for i, source in enumerate(content_list):
-            sources_text += f"\n--- Source {i+1} ---\n"
-            sources_text += f"Title: {source.get('title')}\n"
-            source_url = source.get('url') or source.get('link') or ''
-            if source_url:
-                sources_text += f"URL: {source_url}\n"
-            source_id = source.get('id', '')
-            if source_id and 'arxiv' in str(source_id):
-                sources_text += f"arXiv ID: {source_id}\n"
-            authors = source.get('authors', [])
-            if authors:
-                sources_text += f"Authors: {', '.join(authors[:5])}\n"
-            sources_text += f"Content: {source.get('summary') or source.get('text') or source.get('body_snippet', '')}\n"
+    def _shards(self, content_list: List[Dict], domain: str) -> List[List[Dict]]:
+        """Rank, trim and fit the sources into the prompt's token budget, then split into shards."""
+        packed = context_packer.pack(content_list, domain)["sources"]
+        return [packed[i:i + self.shard_size] for i in range(0, len(packed), self.shard_size)]
 
-        try:
-            messages = prompt.format_messages(
-                domain=domain or "general",
-                format_instructions=self.parser.get_format_instructions(),
-                sources=sources_text,
-                feedback=feedback_section,
-            )
-            
-            response = self.llm.invoke(messages)
-            parsed_result = self.parser.parse(response.content)
-            return parsed_result.cards
-        except Exception as e:
-            print(f"Error in LLM analysis: {e}")
-            return []
+    def _shard_messages(self, shard: List[Dict], domain: str, feedback_section: str):
+        return GAP_PROMPT.format_messages(
+            domain=domain or "general",
+            format_instructions=self.parser.get_format_instructions(),
+            sources=context_packer.render_packed(shard),
+            feedback=feedback_section,
+        )
+
+    async def _ainvoke(self, messages):
+        """Async model call, bounded across every request in this worker."""
+        async with self.llm_semaphore:
+            return await self.llm.ainvoke(messages)
+
+    async def _extract_shard(self, shard: List[Dict], domain: str, feedback_section: str) -> List[ProblemCard]:
+        response = await self._ainvoke(self._shard_messages(shard, domain, feedback_section))
+        return self.parser.parse(response.content).cards
+
+    async def _stream_shard(self, shard: List[Dict], domain: str, feedback_section: str):
+        """Yield cards from one shard's streamed completion as each object closes."""
+        parser = CardStreamParser(ProblemCard)
+        async with self.llm_semaphore:
+            async for chunk in self.llm.astream(self._shard_messages(shard, domain, feedback_section)):
+                for card in parser.feed(chunk.content or ""):
+                    yield card
+
+    @staticmethod
+    def _gap_words(card: ProblemCard) -> set:
+        return set(w for w in re.split(r"\W+", card.gap.lower()) if len(w) >= 3)
+
+    def _find_duplicate(self, words: set, seen: List[set]) -> Optional[int]:
+        """Index of the first earlier gap whose word overlap passes the dedupe threshold."""
+        for i, existing in enumerate(seen):
+            union = words | existing
+            if union and len(words & existing) / len(union) >= self.dedupe_threshold:
+                return i
+        return None
+
+    def _merge_cards(self, card_lists: List[List[ProblemCard]]) -> List[ProblemCard]:
+        """
+        Concatenate shard results in shard order (shards follow relevance rank),
+        collapsing near-duplicate gaps and keeping the higher-novelty version.
+        """
+        merged: List[ProblemCard] = []
+        merged_words: List[set] = []
+        for cards in card_lists:
+            for card in cards:
+                words = self._gap_words(card)
+                duplicate_of = self._find_duplicate(words, merged_words)
+                if duplicate_of is None:
+                    merged.append(card)
+                    merged_words.append(words)
+                elif card.novelty_score > merged[duplicate_of].novelty_score:
+                    merged[duplicate_of] = card
+        return merged
 
     async def generate_single_card(self, domain: str, sub_topic: str) -> Optional[ProblemCard]:
         """
@@ -129,7 +277,7 @@ class AnalysisService:
                 sub_topic=sub_topic,
                 format_instructions=single_parser.get_format_instructions(),
             )
-            response = self.llm.invoke(messages)
+            response = await self._ainvoke(messages)
             parsed_result = single_parser.parse(response.content)
             if parsed_result.cards:
                 return parsed_result.cards[0]
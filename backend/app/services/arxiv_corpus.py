@@ -0,0 +1,238 @@
+import argparse
+import gzip
+import json
+import os
+import re
+from array import array
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from app.services.relevance_service import bm25_term_scores, tokenize
+
+WHITESPACE_RE = re.compile(r"\s+")
+VERSION_RE = re.compile(r"v\d+$")
+
+
+def _clean(text: str) -> str:
+    return WHITESPACE_RE.sub(" ", text or "").strip()
+
+
+def base_id(paper_id: str) -> str:
+    """arXiv id without URL prefix or version, e.g. 2101.00001 or hep-th/9901001."""
+    return VERSION_RE.sub("", paper_id.split("/abs/")[-1])
+
+
+def parse_record(raw: Dict) -> Optional[Dict]:
+    """
+    One line of the arXiv metadata snapshot (the OAI-PMH harvest published as JSON lines:
+    id, title, abstract, authors/authors_parsed, categories, versions, update_date)
+    in the same shape ArxivService returns for live results.
+    """
+    paper_id = raw.get("id")
+    if not paper_id:
+        return None
+    versions = raw.get("versions") or []
+    version = versions[-1].get("version", "v1") if versions else "v1"
+    try:
+        published = parsedate_to_datetime(versions[0]["created"]).astimezone(timezone.utc)
+    except (IndexError, KeyError, TypeError, ValueError):
+        published = datetime.fromisoformat(raw.get("update_date") or "1991-01-01").replace(tzinfo=timezone.utc)
+
+    if raw.get("authors_parsed"):
+        authors = [_clean(" ".join(p for p in (parts[1:2] + parts[:1]) if p)) for parts in raw["authors_parsed"]]
+    else:
+        authors = [_clean(a) for a in re.split(r",| and ", raw.get("authors", "")) if a.strip()]
+
+    return {
+        "id": f"http://arxiv.org/abs/{paper_id}{version}",
+        "title": _clean(raw.get("title")),
+        "summary": _clean(raw.get("abstract")),
+        "authors": authors,
+        "published": published.isoformat(),
+        "url": f"http://arxiv.org/pdf/{paper_id}{version}",
+        "categories": (raw.get("categories") or "").split(),
+    }
+
+
+def document_terms(record: Dict) -> List[str]:
+    """Index terms: title twice (as in RelevanceService), abstract, and whole category codes."""
+    return (
+        tokenize(record["title"]) * 2
+        + tokenize(record["summary"])
+        + [f"cat:{c.lower()}" for c in record["categories"]]
+    )
+
+
+class ArxivCorpus:
+    """
+    Read-only local arXiv corpus with a BM25 inverted index.
+
+    On disk (under `path`), everything except the vocabulary is a flat array opened with
+    np.memmap, so opening is instant and only the postings a query touches are paged in:
+      header.json          n_docs, avg_len, latest_published
+      vocab.json           term -> [offset, df] into the postings arrays
+      postings_docs.u32    doc ids, grouped by term
+      postings_tf.u16      term frequencies, parallel to postings_docs
+      doc_len.f32          index terms per document
+      published.i64        publication time (epoch seconds) per document
+      records.bin / .idx   JSON records and their byte offsets
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "header.json"), "r", encoding="utf-8") as f:
+            self.header = json.load(f)
+        with open(os.path.join(path, "vocab.json"), "r", encoding="utf-8") as f:
+            self.vocab: Dict[str, List[int]] = json.load(f)
+        self.n_docs = self.header["n_docs"]
+        self.avg_len = self.header["avg_len"]
+        self.latest_published = datetime.fromisoformat(self.header["latest_published"])
+        self.postings_docs = self._map("postings_docs.u32", np.uint32)
+        self.postings_tf = self._map("postings_tf.u16", np.uint16)
+        self.doc_len = self._map("doc_len.f32", np.float32)
+        self.published = self._map("published.i64", np.int64)
+        self.records = self._map("records.bin", np.uint8)
+        self.record_offsets = self._map("records.idx", np.uint64)
+
+    def _map(self, name: str, dtype) -> np.ndarray:
+        file_path = os.path.join(self.path, name)
+        if os.path.getsize(file_path) == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(file_path, dtype=dtype, mode="r")
+
+    def __len__(self) -> int:
+        return self.n_docs
+
+    def record(self, doc: int) -> Dict:
+        start, end = int(self.record_offsets[doc]), int(self.record_offsets[doc + 1])
+        return json.loads(self.records[start:end].tobytes())
+
+    def query_terms(self, query: str) -> List[str]:
+        terms = tokenize(query)
+        # Words that are category codes (cs.LG, hep-th) also match the category itself
+        terms += [f"cat:{w}" for w in query.lower().split() if f"cat:{w}" in self.vocab]
+        return list(dict.fromkeys(terms))
+
+    def search(self, query: str, max_results: int = 10) -> List[Dict]:
+        """
+        Top papers for a query: documents containing more of the query terms rank first,
+        then by BM25, then newest first. Only the postings of the query terms are read.
+        """
+        terms = [t for t in self.query_terms(query) if t in self.vocab]
+        if not terms or max_results <= 0:
+            return []
+
+        doc_chunks, score_chunks = [], []
+        for term in terms:
+            offset, df = self.vocab[term]
+            docs = np.asarray(self.postings_docs[offset:offset + df])
+            tf = np.asarray(self.postings_tf[offset:offset + df], dtype=np.float64)
+            doc_chunks.append(docs)
+            score_chunks.append(bm25_term_scores(tf, self.doc_len[docs], self.avg_len, df, self.n_docs))
+
+        all_docs = np.concatenate(doc_chunks)
+        all_scores = np.concatenate(score_chunks)
+        order = np.argsort(all_docs, kind="stable")
+        docs, starts = np.unique(all_docs[order], return_index=True)
+        scores = np.add.reduceat(all_scores[order], starts)
+        matched = np.diff(np.append(starts, len(order)))
+
+        best = np.lexsort((-self.published[docs], -scores, -matched))[:max_results]
+        return [self.record(int(docs[i])) for i in best]
+
+    # ---- Building ----
+    @staticmethod
+    def read_dump(paths: Iterable[str]) -> Iterable[Dict]:
+        """Raw records from JSON-lines dump files (optionally .gz)."""
+        for dump_path in paths:
+            opener = gzip.open if dump_path.endswith(".gz") else open
+            with opener(dump_path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+
+    @classmethod
+    def build(cls, dump_paths: List[str], path: str, category_prefixes: Optional[List[str]] = None) -> "ArxivCorpus":
+        """
+        Ingest dump files into a corpus at `path` (replacing any previous build).
+        `category_prefixes` keeps only papers with a matching category (e.g. ["cs.", "stat.ML"]).
+        Later records for the same paper id replace earlier ones.
+        """
+        os.makedirs(path, exist_ok=True)
+        seen: Dict[str, int] = {}
+        postings: Dict[str, array] = {}
+        doc_len, published = array("f"), array("q")
+        offsets = array("Q", [0])
+        records: List[Optional[bytes]] = []
+
+        for raw in cls.read_dump(dump_paths):
+            record = parse_record(raw)
+            if record is None:
+                continue
+            if category_prefixes and not any(
+                c.startswith(p) for c in record["categories"] for p in category_prefixes
+            ):
+                continue
+            key = base_id(record["id"])
+            if key in seen:
+                records[seen[key]] = None  # superseded; dropped when renumbering below
+            seen[key] = len(records)
+            records.append(json.dumps(record).encode("utf-8"))
+
+        live = [r for r in records if r is not None]
+        with open(os.path.join(path, "records.bin"), "wb") as out:
+            for doc, blob in enumerate(live):
+                record = json.loads(blob)
+                terms = document_terms(record)
+                counts: Dict[str, int] = {}
+                for term in terms:
+                    counts[term] = counts.get(term, 0) + 1
+                for term, tf in counts.items():
+                    postings.setdefault(term, array("I")).extend((doc, min(tf, 65535)))
+                doc_len.append(len(terms))
+                published.append(int(datetime.fromisoformat(record["published"]).timestamp()))
+                out.write(blob)
+                offsets.append(offsets[-1] + len(blob))
+
+        vocab, docs_out, tf_out = {}, array("I"), array("H")
+        for term, pairs in postings.items():
+            vocab[term] = [len(docs_out), len(pairs) // 2]
+            docs_out.extend(pairs[0::2])
+            tf_out.extend(array("H", pairs[1::2]))
+
+        for name, values in (
+            ("postings_docs.u32", docs_out), ("postings_tf.u16", tf_out), ("doc_len.f32", doc_len),
+            ("published.i64", published), ("records.idx", offsets),
+        ):
+            with open(os.path.join(path, name), "wb") as out:
+                values.tofile(out)
+        with open(os.path.join(path, "vocab.json"), "w", encoding="utf-8") as out:
+            json.dump(vocab, out)
+
+        latest = max(published) if published else 0
+        with open(os.path.join(path, "header.json"), "w", encoding="utf-8") as out:
+            json.dump({
+                "n_docs": len(live),
+                "avg_len": (sum(doc_len) / len(doc_len)) if doc_len else 0.0,
+                "latest_published": datetime.fromtimestamp(latest, tz=timezone.utc).isoformat(),
+                "built_at": datetime.now(timezone.utc).isoformat(),
+            }, out)
+        return cls(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the local arXiv corpus from metadata dump files.")
+    parser.add_argument("dumps", nargs="+", help="JSON-lines arXiv metadata files (.json or .json.gz)")
+    parser.add_argument("--out", default=os.getenv("ARXIV_CORPUS_PATH") or "data/arxiv_corpus")
+    parser.add_argument("--category", action="append", dest="categories",
+                        help="keep only papers with a category starting with this (repeatable)")
+    args = parser.parse_args()
+    corpus = ArxivCorpus.build(args.dumps, args.out, args.categories)
+    print(f"Built {len(corpus)} papers ({len(corpus.vocab)} terms) into {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,69 @@
 import arxiv
-from typing import List, Dict
+import os
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional
+
+from app.core.cache import source_cache
+from app.core.circuit_breaker import circuit_breakers
+from app.core.executor import run_blocking
+from app.core.rate_governor import RateLimited, rate_governor
+from app.services.arxiv_corpus import ArxivCorpus, base_id
+from app.services.heavy_hitter_service import heavy_hitters
 
 class ArxivService:
     def __init__(self):
         self.client = arxiv.Client()
+        # Local corpus mode: ARXIV_CORPUS_PATH points at a build of app/services/arxiv_corpus.py
+        self.corpus: Optional[ArxivCorpus] = None
+        # Off by default: with it every corpus search also costs a paced live API call
+        self.live_fallback = os.getenv("ARXIV_CORPUS_LIVE_FALLBACK", "false").lower() == "true"
+        # The live client pages every 3 seconds on a blocking-executor thread, so live searches stay small
+        self.max_live_results = int(os.getenv("ARXIV_MAX_LIVE_RESULTS", "30"))
+        corpus_path = os.getenv("ARXIV_CORPUS_PATH")
+        if corpus_path:
+            try:
+                self.corpus = ArxivCorpus(corpus_path)
+                print(f"Using local arXiv corpus at {corpus_path} ({len(self.corpus)} papers)")
+            except Exception as e:
+                print(f"Info: local arXiv corpus unavailable, using the live API. (Error: {e})")
 
     def search_papers(self, query: str, max_results: int = 10) -> List[Dict]:
         """
         Search for papers on arXiv based on a query.
         Filters for recent papers to ensure "bleeding-edge" relevant.
+        With a local corpus, answers from its index; papers submitted after the corpus was
+        harvested come from the live API when ARXIV_CORPUS_LIVE_FALLBACK is enabled, and take
+        up to half the results.
         """
+        if self.corpus is None:
+            return circuit_breakers.call_blocking(
+                "arxiv", self._search_live, query, min(max_results, self.max_live_results)
+            )
+
+        results = self.corpus.search(query, max_results)
+        if not self.live_fallback:
+            return results
+        try:
+            newer = circuit_breakers.call_blocking(
+                "arxiv", self._search_live, query, max(1, min(max_results // 2, self.max_live_results)),
+                submitted_after=self.corpus.latest_published,
+            )
+        except Exception as e:
+            print(f"arXiv live fallback error: {e}")
+            return results
+
+        merged, seen = [], set()
+        for paper in newer + results:
+            if base_id(paper["id"]) not in seen:
+                seen.add(base_id(paper["id"]))
+                merged.append(paper)
+        return merged[:max_results]
+
+    def _search_live(self, query: str, max_results: int, submitted_after: Optional[datetime] = None) -> List[Dict]:
+        if submitted_after is not None:
+            # Only papers the corpus can't have: submitted after its newest entry
+            until = datetime.utcnow() + timedelta(days=1)
+            query = f"({query}) AND submittedDate:[{submitted_after:%Y%m%d%H%M} TO {until:%Y%m%d%H%M}]"
         search = arxiv.Search(
             query=query,
             max_results=max_results,
@@ -17,6 +71,8 @@ class ArxivService:
             sort_order=arxiv.SortOrder.Descending
         )
 
+        # arxiv.Client spaces out its own page requests; the governor also paces the other workers
+        rate_governor.acquire_blocking("arxiv")
         results = []
         for result in self.client.results(search):
             results.append({
@@ -31,4 +87,23 @@ class ArxivService:
         
         return results
 
+    @source_cache.cached("arxiv")
+    async def asearch_papers(self, query: str, max_results: int = 10) -> List[Dict]:
+        """
+        Async wrapper that runs the blocking arXiv client on the shared executor.
+        Fresh results (not cache hits) also feed the rolling top author/category sketches.
+        A search the rate governor can't fit in, an open circuit breaker or an upstream failure
+        returns [] (never cached) like the other sources.
+        """
+        try:
+            papers = await run_blocking(self.search_papers, query, max_results=max_results)
+        except RateLimited as e:
+            print(f"arXiv search skipped: {e}")
+            return []
+        except Exception as e:
+            print(f"arXiv search error: {e}")
+            return []
+        heavy_hitters.observe(query, papers)
+        return papers
+
 arxiv_service = ArxivService()
@@ -0,0 +1,82 @@
+import json
+from typing import List
+
+from pydantic import ValidationError
+
+
+class CardStreamParser:
+    """
+    Incrementally pulls complete card objects out of a streamed `{"cards": [...]}` completion.
+    Feed it chunks as they arrive; each call returns the cards whose closing brace has been
+    seen so far, without waiting for the rest of the JSON document.
+    """
+
+    def __init__(self, card_model):
+        self.card_model = card_model
+        self.buffer = ""
+        self.pos = 0             # next character to scan
+        self.in_array = False    # inside the "cards" array
+        self.depth = 0           # brace depth relative to the array
+        self.in_string = False
+        self.escaped = False
+        self.object_start = None
+        self.finished = False    # the array has closed
+        self.emitted = 0
+
+    def _find_array_start(self) -> bool:
+        key_at = self.buffer.find('"cards"')
+        if key_at == -1:
+            return False
+        bracket_at = self.buffer.find("[", key_at)
+        if bracket_at == -1:
+            return False
+        self.pos = bracket_at + 1
+        self.in_array = True
+        return True
+
+    def feed(self, chunk: str) -> List:
+        self.buffer += chunk
+        if self.finished:
+            return []
+        if not self.in_array and not self._find_array_start():
+            return []
+
+        cards = []
+        while self.pos < len(self.buffer):
+            char = self.buffer[self.pos]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char == "{":
+                if self.depth == 0:
+                    self.object_start = self.pos
+                self.depth += 1
+            elif char == "}":
+                self.depth -= 1
+                if self.depth == 0 and self.object_start is not None:
+                    card = self._parse(self.buffer[self.object_start:self.pos + 1])
+                    if card is not None:
+                        cards.append(card)
+                    self.object_start = None
+            elif char == "]" and self.depth == 0:
+                self.in_array = False
+                self.finished = True
+                self.pos += 1
+                break
+            self.pos += 1
+        return cards
+
+    def _parse(self, text: str):
+        try:
+            card = self.card_model(**json.loads(text))
+        except (json.JSONDecodeError, ValidationError, TypeError) as e:
+            print(f"Skipping malformed streamed card: {e}")
+            return None
+        self.emitted += 1
+        return card
@@ -0,0 +1,153 @@
+import os
+import re
+from typing import Dict, List
+
+from app.core.tokens import count_tokens
+from app.services.relevance_service import relevance_service, tokenize
+
+
+class ContextPacker:
+    """
+    Builds the SOURCES section of the gap-extraction prompt under a token budget.
+    Sources are ranked by relevance to the domain, each one is trimmed to its most
+    informative sentences (limitations, future work, open questions), and blocks are
+    added in rank order until the budget is full.
+    """
+
+    # Phrasing that usually marks a gap worth extracting
+    GAP_CUES = [
+        "limitation", "future work", "future research", "further research", "open question",
+        "open problem", "remains", "remain ", "challenge", "unclear", "unknown", "unsolved",
+        "lack", "fail", "however", "not yet", "we leave", "drawback", "bottleneck",
+        "gap", "difficult", "costly", "expensive", "struggle", "insufficient", "need for",
+    ]
+
+    def __init__(self):
+        self.budget = int(os.getenv("PROMPT_TOKEN_BUDGET", "6000"))
+        self.max_source_tokens = int(os.getenv("PROMPT_MAX_SOURCE_TOKENS", "180"))
+        self.counters = {
+            "requests": 0,
+            "tokens_original": 0,
+            "tokens_used": 0,
+            "tokens_saved": 0,
+            "sources_dropped": 0,
+        }
+        self.last_request: Dict = {}
+
+    @staticmethod
+    def _content(source: Dict) -> str:
+        return source.get("summary") or source.get("text") or source.get("body_snippet", "") or ""
+
+    def rank(self, sources: List[Dict], domain: str) -> List[Dict]:
+        """Highest BM25 score first; ties keep the incoming order (arXiv before community sources)."""
+        if not sources:
+            return []
+        scores = relevance_service.score(domain, sources)["scores"]
+        order = sorted(range(len(sources)), key=lambda i: (-scores[i], i))
+        return [sources[i] for i in order]
+
+    def trim(self, content: str, domain: str) -> str:
+        """
+        Keep the opening sentence for context plus the sentences most likely to describe a gap,
+        in their original order, within the per-source token cap.
+        """
+        if count_tokens(content) <= self.max_source_tokens:
+            return content
+        sentences = [s.strip() for s in re.split(r"(?<=[.!?])\s+", content) if s.strip()]
+        if not sentences:
+            return content
+
+        keywords = set(tokenize(domain))
+
+        def score(index: int) -> float:
+            lowered = sentences[index].lower()
+            cue_hits = sum(1 for cue in self.GAP_CUES if cue in lowered)
+            keyword_hits = len(keywords & set(tokenize(lowered)))
+            return 3.0 * cue_hits + keyword_hits
+
+        chosen = {0}
+        used = count_tokens(sentences[0])
+        for index in sorted(range(1, len(sentences)), key=lambda i: (-score(i), i)):
+            if score(index) <= 0:
+                break
+            cost = count_tokens(sentences[index])
+            if used + cost > self.max_source_tokens:
+                continue
+            chosen.add(index)
+            used += cost
+        trimmed = " ".join(sentences[i] for i in sorted(chosen))
+        if count_tokens(trimmed) > self.max_source_tokens:
+            # A single run-on sentence (e.g. unpunctuated forum text): hard cut at ~4 chars/token
+            trimmed = trimmed[: self.max_source_tokens * 4].rsplit(" ", 1)[0] + "..."
+        return trimmed
+
+    @staticmethod
+    def render(index: int, source: Dict, content: str) -> str:
+        """One source block in the prompt's SOURCES format."""
+        block = f"\n--- Source {index} ---\n"
+        block += f"Title: {source.get('title')}\n"
+        source_url = source.get('url') or source.get('link') or ''
+        if source_url:
+            block += f"URL: {source_url}\n"
+        source_id = source.get('id', '')
+        if source_id and 'arxiv' in str(source_id):
+            block += f"arXiv ID: {source_id}\n"
+        authors = source.get('authors', [])
+        if authors:
+            block += f"Authors: {', '.join(authors[:5])}\n"
+        block += f"Content: {content}\n"
+        return block
+
+    def render_packed(self, packed: List[Dict]) -> str:
+        """Render already-packed sources, numbered from 1."""
+        return "".join(self.render(i + 1, s, s["packed_content"]) for i, s in enumerate(packed))
+
+    def pack(self, sources: List[Dict], domain: str) -> Dict:
+        """
+        Returns the packed sources (each with its trimmed `packed_content`), the rendered
+        prompt text, and token accounting for this request.
+        """
+        tokens_original = sum(
+            count_tokens(self.render(i + 1, s, self._content(s))) for i, s in enumerate(sources)
+        )
+
+        packed = []
+        tokens_used = 0
+        for source in self.rank(sources, domain):
+            content = self.trim(self._content(source), domain)
+            cost = count_tokens(self.render(len(packed) + 1, source, content))
+            if tokens_used + cost > self.budget:
+                continue
+            packed.append({**source, "packed_content": content})
+            tokens_used += cost
+
+        text = self.render_packed(packed)
+        report = {
+            "tokens_original": tokens_original,
+            "tokens_used": tokens_used,
+            "tokens_saved": max(0, tokens_original - tokens_used),
+            "sources_in": len(sources),
+            "sources_packed": len(packed),
+        }
+
+        self.counters["requests"] += 1
+        self.counters["tokens_original"] += report["tokens_original"]
+        self.counters["tokens_used"] += report["tokens_used"]
+        self.counters["tokens_saved"] += report["tokens_saved"]
+        self.counters["sources_dropped"] += len(sources) - len(packed)
+        self.last_request = {"domain": domain, **report}
+
+        return {"sources": packed, "text": text, **report}
+
+    def stats(self) -> Dict:
+        requests = self.counters["requests"]
+        return {
+            "budget": self.budget,
+            "max_source_tokens": self.max_source_tokens,
+            **self.counters,
+            "avg_tokens_saved": round(self.counters["tokens_saved"] / requests, 1) if requests else 0.0,
+            "last_request": self.last_request,
+        }
+
+
+context_packer = ContextPacker()
@@ -0,0 +1,39 @@
+from app.core.computation_graph import ComputationGraph
+from app.services.arxiv_service import arxiv_service
+from app.services.reddit_service import reddit_service
+from app.services.hackernews_service import hackernews_service
+from app.services.stackexchange_service import stackexchange_service
+from app.services.sentiment_service import sentiment_service
+
+
+def build_domain_graph(domain: str, paper_limit: int = 30) -> ComputationGraph:
+    """
+    Per-request graph of the upstream computations shared by /metrics, /pulse and /export.
+    Each fetch runs at most once per request no matter how many consumers need it.
+    """
+    graph = ComputationGraph()
+
+    async def papers(g):
+        return await arxiv_service.asearch_papers(domain, max_results=paper_limit)
+
+    async def hn_signals(g):
+        return await hackernews_service.get_sentiment_signals(domain)
+
+    async def se_signals(g):
+        return await stackexchange_service.get_sentiment_signals(domain)
+
+    async def reddit_discussions(g):
+        return await reddit_service.asearch_discussions(domain, limit=15)
+
+    async def pulse(g):
+        hn, se, reddit = await g.get_many("hn_signals", "se_signals", "reddit_discussions")
+        return sentiment_service.score_pulse(domain, hn, se, reddit)
+
+    return (
+        graph
+        .node("papers", papers)
+        .node("hn_signals", hn_signals)
+        .node("se_signals", se_signals)
+        .node("reddit_discussions", reddit_discussions)
+        .node("pulse", pulse)
+    )
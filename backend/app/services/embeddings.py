@@ -0,0 +1,100 @@
+import hashlib
+import os
+from typing import List
+
+import numpy as np
+from dotenv import load_dotenv
+
+from app.core.executor import run_blocking
+from app.services.relevance_service import tokenize
+
+load_dotenv()
+
+
+class HashingEmbedder:
+    """
+    Deterministic, network-free embedder: unigrams and bigrams are hashed into a fixed
+    number of signed buckets and L2-normalized. Good enough for near-duplicate and novelty
+    checks in air-gapped deployments; not a substitute for a semantic model.
+    """
+
+    name = "hashing"
+
+    def __init__(self, dimension: int = 768):
+        self.dimension = dimension
+
+    def _embed(self, text: str) -> List[float]:
+        tokens = tokenize(text)
+        features = tokens + [f"{a}_{b}" for a, b in zip(tokens, tokens[1:])]
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            vector[value % self.dimension] += 1.0 if (value >> 63) & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector.tolist()
+
+    async def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+    async def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(t) for t in texts]
+
+
+class OpenAIEmbedder:
+    """text-embedding-3-small via LangChain (requires OPENAI_API_KEY and network access)."""
+
+    name = "openai"
+    dimension = 1536
+
+    def __init__(self):
+        from langchain_openai import OpenAIEmbeddings
+        self.client = OpenAIEmbeddings(model="text-embedding-3-small")
+
+    async def embed_query(self, text: str) -> List[float]:
+        return await self.client.aembed_query(text)
+
+    async def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.client.aembed_documents(texts)
+
+
+class LocalModelEmbedder:
+    """A sentence-transformers model loaded from disk (optional dependency)."""
+
+    name = "local"
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name)
+        self.dimension = self.model.get_sentence_embedding_dimension()
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        return self.model.encode(texts, normalize_embeddings=True).tolist()
+
+    async def embed_query(self, text: str) -> List[float]:
+        return (await run_blocking(self._encode, [text]))[0]
+
+    async def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await run_blocking(self._encode, texts)
+
+
+def get_embedder():
+    """
+    Pick the embedder from EMBEDDING_PROVIDER (openai, local, hashing).
+    Unset means OpenAI when a key is configured, otherwise the hashing embedder.
+    """
+    provider = os.getenv("EMBEDDING_PROVIDER", "").lower()
+    openai_key = os.getenv("OPENAI_API_KEY")
+    if not provider:
+        provider = "openai" if openai_key and "your_" not in openai_key else "hashing"
+
+    try:
+        if provider == "openai":
+            return OpenAIEmbedder()
+        if provider == "local":
+            return LocalModelEmbedder(os.getenv("LOCAL_EMBEDDING_MODEL", "all-MiniLM-L6-v2"))
+    except Exception as e:
+        print(f"Info: {provider} embeddings unavailable, using hashing embedder. (Error: {e})")
+    return HashingEmbedder(int(os.getenv("HASHING_EMBEDDING_DIM", "768")))
@@ -1,43 +1,56 @@
 import aiohttp
 from typing import List, Dict
 
+from app.core.cache import source_cache
+from app.core.circuit_breaker import UpstreamError, circuit_breakers
+from app.core.http_client import http_client
+from app.core.rate_governor import rate_governor
+
 
 class HackerNewsService:
     """Client for the HackerNews Algolia Search API (no auth required)."""
 
     BASE_URL = "http://hn.algolia.com/api/v1"
 
+    @source_cache.cached("hackernews")
     async def search_stories(self, query: str, limit: int = 20) -> List[Dict]:
         """Search HackerNews stories matching a query."""
         try:
-            url = f"{self.BASE_URL}/search"
-            params = {
-                "query": query,
-                "tags": "story",
-                "hitsPerPage": limit,
-            }
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=10)) as resp:
-                    if resp.status != 200:
-                        return []
-                    data = await resp.json()
-
-            results = []
-            for hit in data.get("hits", []):
-                results.append({
-                    "id": hit.get("objectID", ""),
-                    "title": hit.get("title", ""),
-                    "url": hit.get("url", "") or f"https://news.ycombinator.com/item?id={hit.get('objectID', '')}",
-                    "points": hit.get("points", 0) or 0,
-                    "num_comments": hit.get("num_comments", 0) or 0,
-                    "created_at": hit.get("created_at", ""),
-                    "author": hit.get("author", ""),
-                })
-            return results
+            return await circuit_breakers.call("hackernews", self._search_stories, query, limit)
         except Exception as e:
             print(f"HackerNews search error: {e}")
             return []
 
+    async def _search_stories(self, query: str, limit: int) -> List[Dict]:
+        url = f"{self.BASE_URL}/search"
+        params = {
+            "query": query,
+            "tags": "story",
+            "hitsPerPage": limit,
+        }
+        await rate_governor.acquire("hackernews")
+        session = await http_client.get_session()
+        async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=10)) as resp:
+            rate_governor.observe("hackernews", resp.status, resp.headers)
+            if resp.status == 429 or resp.status >= 500:
+                raise UpstreamError(f"HackerNews returned HTTP {resp.status}")
+            if resp.status != 200:
+                return []
+            data = await resp.json()
+
+        results = []
+        for hit in data.get("hits", []):
+            results.append({
+                "id": hit.get("objectID", ""),
+                "title": hit.get("title", ""),
+                "url": hit.get("url", "") or f"https://news.ycombinator.com/item?id={hit.get('objectID', '')}",
+                "points": hit.get("points", 0) or 0,
+                "num_comments": hit.get("num_comments", 0) or 0,
+                "created_at": hit.get("created_at", ""),
+                "author": hit.get("author", ""),
+            })
+        return results
+
     async def get_sentiment_signals(self, query: str) -> Dict:
         """Get aggregated engagement metrics as sentiment proxy."""
         stories = await self.search_stories(query, limit=30)
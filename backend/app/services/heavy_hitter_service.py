@@ -0,0 +1,241 @@
+import asyncio
+import os
+import socket
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from app.core.database import db
+from app.core.keys import normalize_domain
+from app.core.sketches import HeavyHitters
+from app.services.arxiv_corpus import base_id
+
+
+class HeavyHitterService:
+    """
+    Rolling top authors and categories per domain from the papers arXiv searches return.
+
+    Papers go per domain and window (SKETCH_WINDOW_SECONDS, a day by default) into bounded
+    HeavyHitters sketches. A worker counts a paper once per domain and window (it remembers
+    the last SKETCH_SEEN_MAX ids), but workers don't share that memory: a paper fetched by
+    several workers is counted by each, so merged counts are weighted by fetches rather
+    than distinct papers. Every SKETCH_FLUSH_SECONDS each worker saves its sketches under
+    its own id, then refreshes the views queried so far: for each (domain, field, windows)
+    the stored sketches of every other worker merged with this worker's live ones, with
+    the whole top-k already ranked. `top` only slices a view, so answers lag observations
+    by up to one flush; the first query for a view merges it on the spot. At most
+    SKETCH_MAX_VIEWS views are kept, least recently queried dropped first.
+
+    At most SKETCH_MAX_DOMAINS domains keep sketches in memory; the least recently observed
+    domain whose sketches are already saved is dropped beyond that, and its stored
+    sketches are read back (on query and on the next flush) instead. Windows older than
+    SKETCH_RETENTION_WINDOWS are dropped from memory and expire from storage.
+    """
+
+    FIELDS = ("authors", "categories")
+
+    def __init__(self):
+        self.window_seconds = int(os.getenv("SKETCH_WINDOW_SECONDS", "86400"))
+        self.retention_windows = int(os.getenv("SKETCH_RETENTION_WINDOWS", "30"))
+        self.capacity = int(os.getenv("SKETCH_CAPACITY", "200"))
+        self.cms_width = int(os.getenv("SKETCH_CMS_WIDTH", "2048"))
+        self.cms_depth = int(os.getenv("SKETCH_CMS_DEPTH", "4"))
+        self.flush_interval = float(os.getenv("SKETCH_FLUSH_SECONDS", "60"))
+        self.max_views = int(os.getenv("SKETCH_MAX_VIEWS", "256"))
+        self.seen_max = int(os.getenv("SKETCH_SEEN_MAX", "100000"))
+        self.max_domains = int(os.getenv("SKETCH_MAX_DOMAINS", "64"))
+        self.sketches: Dict[tuple, HeavyHitters] = {}  # (domain, field, window) -> sketch
+        self._domains: "OrderedDict[str, None]" = OrderedDict()  # domains in memory, least recent first
+        self._evicted = set()  # keys whose saved sketch holds counts no longer in memory
+        self._dirty = set()
+        self._seen: "OrderedDict[tuple, None]" = OrderedDict()  # (domain, window, paper id)
+        self._views: "OrderedDict[tuple, Dict]" = OrderedDict()  # (domain, field, windows) -> ranked view
+        self._task = None
+        self.counters = {
+            "papers_observed": 0,
+            "duplicates_skipped": 0,
+            "flushes": 0,
+            "flush_errors": 0,
+            "domains_evicted": 0,
+            "queries": 0,
+            "view_hits": 0,
+            "view_refreshes": 0,
+            "view_refresh_errors": 0,
+        }
+
+    @property
+    def worker_id(self) -> str:
+        # Read per call: gunicorn forks workers after this module is imported
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    def window_of(self, timestamp: float) -> int:
+        return int(timestamp // self.window_seconds) * self.window_seconds
+
+    def _sketch(self, key: tuple) -> HeavyHitters:
+        sketch = self.sketches.get(key)
+        if sketch is None:
+            sketch = self.sketches[key] = HeavyHitters(self.capacity, self.cms_width, self.cms_depth)
+        return sketch
+
+    def observe(self, domain: str, papers: List[Dict], now: Optional[float] = None):
+        """Count the authors and categories of papers not yet seen for this domain and window."""
+        domain_key = normalize_domain(domain)
+        window = self.window_of(now if now is not None else time.time())
+        for paper in papers:
+            seen_key = (domain_key, window, base_id(paper.get("id", "")))
+            if seen_key in self._seen:
+                self.counters["duplicates_skipped"] += 1
+                continue
+            self._seen[seen_key] = None
+            if len(self._seen) > self.seen_max:
+                self._seen.popitem(last=False)
+            self.counters["papers_observed"] += 1
+            for field in self.FIELDS:
+                values = dict.fromkeys(paper.get(field) or [])
+                if not values:
+                    continue
+                key = (domain_key, field, window)
+                sketch = self._sketch(key)
+                for value in values:
+                    sketch.add(value)
+                self._dirty.add(key)
+                self._domains[domain_key] = None
+                self._domains.move_to_end(domain_key)
+        self._expire(window)
+        self._evict()
+
+    def _evict(self):
+        """Drop the least recently observed domains beyond max_domains, once their sketches are saved."""
+        while len(self._domains) > self.max_domains:
+            domain = next((d for d in self._domains if not any(k[0] == d for k in self._dirty)), None)
+            if domain is None:
+                return  # everything is waiting for a flush
+            for key in [k for k in self.sketches if k[0] == domain]:
+                del self.sketches[key]
+                self._evicted.add(key)
+            del self._domains[domain]
+            self.counters["domains_evicted"] += 1
+
+    def _expire(self, current_window: int):
+        oldest = current_window - (self.retention_windows - 1) * self.window_seconds
+        expired = [k for k in self.sketches if k[2] < oldest]
+        for key in expired:
+            del self.sketches[key]
+            self._dirty.discard(key)
+        self._evicted = {k for k in self._evicted if k[2] >= oldest}
+        if expired:
+            live = {k[0] for k in self.sketches}
+            for domain in [d for d in self._domains if d not in live]:
+                del self._domains[domain]
+
+    async def flush(self):
+        """Save this worker's changed sketches, then refresh the views."""
+        dirty, self._dirty = self._dirty, set()
+        worker = self.worker_id
+        for key in dirty:
+            sketch = self.sketches.get(key)
+            if sketch is None:
+                continue
+            domain, field, window = key
+            # Kept until the window falls out of retention
+            ttl = window + self.retention_windows * self.window_seconds - time.time()
+            try:
+                if key in self._evicted:
+                    # Observed again after eviction: fold the saved counts back in before replacing them
+                    for doc in await db.get_sketches(domain, field, window):
+                        if doc["worker"] == worker and doc["window"] == window:
+                            sketch.merge(HeavyHitters.from_dict(doc["sketch"]))
+                    self._evicted.discard(key)
+                await db.save_sketch(domain, field, window, worker, sketch.to_dict(), max(ttl, 0))
+            except Exception as e:
+                self._dirty.add(key)
+                self.counters["flush_errors"] += 1
+                print(f"Sketch flush error: {e}")
+        self.counters["flushes"] += 1
+        self._evict()
+        await self._refresh_views()
+
+    async def top(self, domain: str, field: str, windows: int = 7, limit: int = 10) -> Dict:
+        """Heavy hitters of `field` over the last `windows` windows, merged across workers."""
+        if field not in self.FIELDS:
+            raise ValueError(f"field must be one of {', '.join(self.FIELDS)}")
+        windows = min(max(windows, 1), self.retention_windows)
+        self.counters["queries"] += 1
+
+        key = (normalize_domain(domain), field, windows)
+        view = self._views.get(key)
+        if view is None:
+            # First query for this view: merge now; from then on the flush keeps it current
+            view = await self._build_view(*key)
+            self._views[key] = view
+            if len(self._views) > self.max_views:
+                self._views.popitem(last=False)
+        else:
+            self.counters["view_hits"] += 1
+            self._views.move_to_end(key)
+        return {**view, "domain": domain, "items": view["items"][:limit]}
+
+    async def _build_view(self, domain_key: str, field: str, windows: int) -> Dict:
+        """Merge every worker's sketches for the view and rank its whole top-k once."""
+        since = self.window_of(time.time()) - (windows - 1) * self.window_seconds
+        merged = HeavyHitters(self.capacity, self.cms_width, self.cms_depth)
+        worker, workers = self.worker_id, {self.worker_id}
+        for doc in await db.get_sketches(domain_key, field, since):
+            key = (domain_key, field, doc["window"])
+            if doc["worker"] == worker and key in self.sketches and key not in self._evicted:
+                continue  # our own state is merged from memory below
+            merged.merge(HeavyHitters.from_dict(doc["sketch"]))
+            workers.add(doc["worker"])
+        for (d, f, window), sketch in self.sketches.items():
+            if d == domain_key and f == field and window >= since:
+                merged.merge(sketch)
+        return {
+            "field": field,
+            "window_seconds": self.window_seconds,
+            "windows": windows,
+            "since": since,
+            "total": merged.total,
+            "workers": len(workers),
+            "items": merged.top(self.capacity),
+        }
+
+    async def _refresh_views(self):
+        for key in list(self._views):
+            try:
+                view = await self._build_view(*key)
+            except Exception as e:
+                self.counters["view_refresh_errors"] += 1
+                print(f"Sketch view refresh error: {e}")
+                continue
+            if key in self._views:  # not dropped meanwhile
+                self._views[key] = view
+                self.counters["view_refreshes"] += 1
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_periodically())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> Dict:
+        return {
+            "sketches": len(self.sketches),
+            "domains": len(self._domains),
+            "views": len(self._views),
+            "dirty": len(self._dirty),
+            "seen_ids": len(self._seen),
+            **self.counters,
+        }
+
+
+heavy_hitters = HeavyHitterService()
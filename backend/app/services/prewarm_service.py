@@ -0,0 +1,133 @@
+import asyncio
+import os
+import time
+from collections import Counter
+from typing import Dict, List
+
+from app.core.cache import source_cache
+from app.core.database import db
+from app.core.keys import normalize_domain
+
+
+class PrewarmScheduler:
+    """
+    Keeps the hottest domains warm.
+
+    Every PREWARM_INTERVAL_SECONDS it takes the PREWARM_TOP_N most searched domains over the
+    last PREWARM_HISTORY_WINDOW searches and runs the registered warmers for each, spreading
+    the domains evenly over the interval instead of bursting upstream.
+
+    Warmers are `async func(domain)` registered by the modules that own the computation
+    (see app/api/discovery.py). Upstream calls made during a cycle are capped by
+    PREWARM_UPSTREAM_BUDGET (counted as source cache fills); warmers flagged `uses_llm`
+    also draw from PREWARM_LLM_BUDGET, which is 0 (off) by default.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("PREWARM_ENABLED", "false").lower() == "true"
+        self.top_n = int(os.getenv("PREWARM_TOP_N", "20"))
+        self.history_window = int(os.getenv("PREWARM_HISTORY_WINDOW", "500"))
+        self.interval = float(os.getenv("PREWARM_INTERVAL_SECONDS", "540"))
+        self.initial_delay = float(os.getenv("PREWARM_INITIAL_DELAY_SECONDS", "30"))
+        self.upstream_budget = int(os.getenv("PREWARM_UPSTREAM_BUDGET", "120"))
+        self.llm_budget = int(os.getenv("PREWARM_LLM_BUDGET", "0"))
+        # Renew cached upstream results that would expire before the next cycle
+        self.refresh_window = float(os.getenv("PREWARM_REFRESH_AHEAD_SECONDS", str(self.interval)))
+        self.warmers: List[tuple] = []
+        self._task = None
+        self.counters = {
+            "cycles": 0,
+            "domains_warmed": 0,
+            "upstream_calls": 0,
+            "llm_runs": 0,
+            "skipped_upstream_budget": 0,
+            "skipped_llm_budget": 0,
+            "errors": 0,
+        }
+        self.last_cycle: Dict = {}
+
+    def register(self, name: str, func, uses_llm: bool = False):
+        self.warmers.append((name, func, uses_llm))
+
+    async def hot_domains(self) -> List[str]:
+        """Top domains by recent search count, grouped by normalized form (most used spelling wins)."""
+        recent = await db.get_recent_search_domains(self.history_window)
+        counts, spellings = Counter(), {}
+        for domain in recent:
+            if not domain or not domain.strip():
+                continue
+            key = normalize_domain(domain)
+            counts[key] += 1
+            spellings.setdefault(key, Counter())[domain] += 1
+        return [spellings[key].most_common(1)[0][0] for key, _ in counts.most_common(self.top_n)]
+
+    async def run_cycle(self):
+        """Warm every hot domain once, staggered over the interval and within the budgets."""
+        domains = await self.hot_domains()
+        started = time.time()
+        upstream_start = source_cache.counters["fills"]
+        llm_runs = 0
+        warmed = []
+        gap = self.interval / (len(domains) + 1) if domains else 0
+
+        for domain in domains:
+            for name, func, uses_llm in self.warmers:
+                if source_cache.counters["fills"] - upstream_start >= self.upstream_budget:
+                    self.counters["skipped_upstream_budget"] += 1
+                    continue
+                if uses_llm and llm_runs >= self.llm_budget:
+                    self.counters["skipped_llm_budget"] += 1
+                    continue
+                try:
+                    with source_cache.refresh_ahead(self.refresh_window):
+                        await func(domain)
+                    llm_runs += uses_llm
+                except Exception as e:
+                    self.counters["errors"] += 1
+                    print(f"Prewarm '{name}' for '{domain}' failed: {e}")
+            warmed.append(domain)
+            await asyncio.sleep(gap)
+
+        upstream_calls = source_cache.counters["fills"] - upstream_start
+        self.counters["cycles"] += 1
+        self.counters["domains_warmed"] += len(warmed)
+        self.counters["upstream_calls"] += upstream_calls
+        self.counters["llm_runs"] += llm_runs
+        self.last_cycle = {
+            "domains": warmed,
+            "upstream_calls": upstream_calls,
+            "llm_runs": llm_runs,
+            "seconds": round(time.time() - started, 1),
+        }
+
+    async def _loop(self):
+        await asyncio.sleep(self.initial_delay)
+        while True:
+            cycle_started = time.monotonic()
+            try:
+                await self.run_cycle()
+            except Exception as e:
+                self.counters["errors"] += 1
+                print(f"Prewarm cycle failed: {e}")
+            await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - cycle_started)))
+
+    async def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "warmers": [name for name, _, _ in self.warmers],
+            **self.counters,
+            "last_cycle": self.last_cycle,
+        }
+
+
+prewarm_scheduler = PrewarmScheduler()
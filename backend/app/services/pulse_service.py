@@ -0,0 +1,153 @@
+import asyncio
+import os
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from app.core.background import background_queue
+from app.core.database import db
+from app.core.singleflight import single_flight
+from app.services.domain_graph import build_domain_graph
+
+
+class PulseService:
+    """
+    Stale-while-revalidate pulse over the stored sentiment snapshots.
+
+    - snapshot younger than PULSE_FRESH_SECONDS: served as is
+    - older, but within PULSE_MAX_STALE_SECONDS: served as is, and a refresh starts in the background
+    - no usable snapshot: computed before responding (the snapshot is saved after)
+
+    Every response carries `snapshot_age_seconds` and `stale`.
+    """
+
+    def __init__(self):
+        self.fresh_seconds = float(os.getenv("PULSE_FRESH_SECONDS", "900"))
+        self.max_stale_seconds = float(os.getenv("PULSE_MAX_STALE_SECONDS", "86400"))
+        self.history_max_points = int(os.getenv("PULSE_HISTORY_MAX_POINTS", "500"))
+        self._refreshes = set()
+        self.counters = {
+            "fresh_hits": 0,
+            "stale_hits": 0,
+            "computed": 0,
+            "refreshes_started": 0,
+            "refresh_errors": 0,
+        }
+
+    @staticmethod
+    def _age_seconds(snapshot: Dict) -> Optional[float]:
+        try:
+            taken_at = datetime.fromisoformat(snapshot["timestamp"])
+        except (KeyError, TypeError, ValueError):
+            return None
+        return max(0.0, (datetime.utcnow() - taken_at).total_seconds())
+
+    @staticmethod
+    def _response(pulse: Dict, age: float, stale: bool) -> Dict:
+        body = {k: v for k, v in pulse.items() if k != "_id"}
+        return {**body, "snapshot_age_seconds": round(age, 1), "stale": stale}
+
+    async def get_pulse(self, domain: str) -> Dict:
+        snapshot = await db.get_latest_sentiment(domain)
+        age = self._age_seconds(snapshot) if snapshot else None
+
+        if age is not None and age <= self.fresh_seconds:
+            self.counters["fresh_hits"] += 1
+            return self._response(snapshot, age, stale=False)
+
+        if age is not None and age <= self.max_stale_seconds:
+            self.counters["stale_hits"] += 1
+            self._start_refresh(domain)
+            return self._response(snapshot, age, stale=True)
+
+        self.counters["computed"] += 1
+        key = single_flight.make_key("pulse", domain)
+        pulse = await single_flight.do(key, self._compute_and_save, domain)
+        return self._response(pulse, 0.0, stale=False)
+
+    async def _compute_and_save(self, domain: str) -> Dict:
+        pulse = await build_domain_graph(domain).get("pulse")
+        # Save the snapshot after responding (a copy, so the insert's _id doesn't leak into the shared response)
+        await background_queue.submit("save_sentiment", db.save_sentiment, dict(pulse))
+        return pulse
+
+    async def _refresh(self, domain: str):
+        try:
+            pulse = await build_domain_graph(domain).get("pulse")
+            # Already off the request path, so save directly instead of via the background queue
+            await db.save_sentiment(dict(pulse))
+        except Exception as e:
+            self.counters["refresh_errors"] += 1
+            print(f"Pulse refresh for '{domain}' failed: {e}")
+
+    async def warm(self, domain: str, ahead: float = 0.0):
+        """Refresh the snapshot now if it would no longer be fresh `ahead` seconds from now."""
+        snapshot = await db.get_latest_sentiment(domain)
+        age = self._age_seconds(snapshot) if snapshot else None
+        if age is None or age + ahead > self.fresh_seconds:
+            await single_flight.do(single_flight.make_key("pulse_refresh", domain), self._refresh, domain)
+
+    def _start_refresh(self, domain: str):
+        key = single_flight.make_key("pulse_refresh", domain)
+        if single_flight.in_flight(key):
+            return
+        self.counters["refreshes_started"] += 1
+        task = asyncio.ensure_future(single_flight.do(key, self._refresh, domain))
+        # Hold a reference until done so the refresh isn't garbage-collected mid-flight
+        self._refreshes.add(task)
+        task.add_done_callback(self._refreshes.discard)
+
+    # ---- History ----
+    def pick_resolution(self, start: datetime, end: datetime) -> str:
+        """Finest rollup that still retains `start` and covers the span in at most PULSE_HISTORY_MAX_POINTS buckets."""
+        span = (end - start).total_seconds()
+        reach = (datetime.utcnow() - start).total_seconds()
+        for resolution, (width, retention) in db.SENTIMENT_ROLLUPS.items():
+            if span / width <= self.history_max_points and reach <= retention:
+                return resolution
+        return list(db.SENTIMENT_ROLLUPS)[-1]
+
+    @staticmethod
+    def _point(rollup: Dict) -> Dict:
+        count = rollup["count"]
+        bucket = rollup["bucket"]
+        if isinstance(bucket, str):  # SQLite stores datetimes as ISO text
+            bucket = datetime.fromisoformat(bucket)
+        return {
+            "bucket": bucket.replace(tzinfo=timezone.utc).isoformat(),
+            "count": count,
+            "score_avg": round(rollup["score_sum"] / count, 1),
+            "score_min": rollup["score_min"],
+            "score_max": rollup["score_max"],
+            "sources": {
+                source: {field: round(total / count, 2) for field, total in fields.items()}
+                for source, fields in rollup.get("components", {}).items()
+            },
+        }
+
+    async def history(self, domain: str, start: datetime, end: datetime, resolution: Optional[str] = None) -> Dict:
+        """Rolled-up pulse for [start, end) (naive UTC), at `resolution` or the one picked for the span."""
+        if resolution is None:
+            resolution = self.pick_resolution(start, end)
+        elif resolution not in db.SENTIMENT_ROLLUPS:
+            raise ValueError(f"resolution must be one of {', '.join(db.SENTIMENT_ROLLUPS)}")
+        buckets = (end - start).total_seconds() / db.SENTIMENT_ROLLUPS[resolution][0]
+        if buckets > db.MAX_ROLLUP_POINTS:
+            # Rather than silently returning only the oldest MAX_ROLLUP_POINTS buckets
+            raise ValueError(
+                f"{resolution} resolution over this span is {buckets:.0f} buckets, more than the "
+                f"{db.MAX_ROLLUP_POINTS} allowed; use a coarser resolution or a shorter span"
+            )
+        rollups = await db.get_sentiment_rollups(domain, resolution, start, end)
+        return {
+            "domain": domain,
+            "resolution": resolution,
+            "start": start.replace(tzinfo=timezone.utc).isoformat(),
+            "end": end.replace(tzinfo=timezone.utc).isoformat(),
+            "points": [self._point(r) for r in rollups],
+        }
+
+    def stats(self) -> Dict:
+        return {"refreshing": len(self._refreshes), **self.counters}
+
+
+pulse_service = PulseService()
@@ -3,6 +3,11 @@ import os
 from typing import List, Dict
 from dotenv import load_dotenv
 
+from app.core.cache import source_cache
+from app.core.circuit_breaker import circuit_breakers
+from app.core.executor import run_blocking
+from app.core.rate_governor import rate_governor
+
 load_dotenv()
 
 class RedditService:
@@ -28,25 +33,39 @@ class RedditService:
         """
         if not self.reddit:
             return []
-
-        results = []
         try:
-            # We can search specific subreddits or all
-            for submission in self.reddit.subreddit("all").search(query, limit=limit, sort="relevance"):
-                # Basic check to filter for more technical/relevant subreddits if needed
-                # For now, we take all but prioritize score/relevance
-                results.append({
-                    "id": submission.id,
-                    "title": submission.title,
-                    "text": submission.selftext[:1000] if submission.selftext else "", # Limit text size
-                    "url": f"https://www.reddit.com{submission.permalink}",
-                    "score": submission.score,
-                    "subreddit": submission.subreddit.display_name,
-                    "created_utc": submission.created_utc
-                })
+            return circuit_breakers.call_blocking("reddit", self._search_discussions, query, limit)
         except Exception as e:
+            # prawcore errors carry the HTTP response (429 with Retry-After when throttled)
+            response = getattr(e, "response", None)
+            if response is not None:
+                rate_governor.observe("reddit", getattr(response, "status_code", 0), getattr(response, "headers", None))
             print(f"Error searching Reddit: {e}")
-        
+            return []
+
+    def _search_discussions(self, query: str, limit: int) -> List[Dict]:
+        rate_governor.acquire_blocking("reddit")
+        results = []
+        # We can search specific subreddits or all
+        for submission in self.reddit.subreddit("all").search(query, limit=limit, sort="relevance"):
+            # Basic check to filter for more technical/relevant subreddits if needed
+            # For now, we take all but prioritize score/relevance
+            results.append({
+                "id": submission.id,
+                "title": submission.title,
+                "text": submission.selftext[:1000] if submission.selftext else "", # Limit text size
+                "url": f"https://www.reddit.com{submission.permalink}",
+                "score": submission.score,
+                "subreddit": submission.subreddit.display_name,
+                "created_utc": submission.created_utc
+            })
         return results
 
+    @source_cache.cached("reddit")
+    async def asearch_discussions(self, query: str, limit: int = 10) -> List[Dict]:
+        """Async wrapper that runs the blocking PRAW search on the shared executor."""
+        if not self.reddit:
+            return []
+        return await run_blocking(self.search_discussions, query, limit=limit)
+
 reddit_service = RedditService()
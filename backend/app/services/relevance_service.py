@@ -0,0 +1,126 @@
+import os
+import re
+from typing import Dict, List
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "for", "from", "has", "have",
+    "how", "in", "into", "is", "it", "its", "of", "on", "or", "that", "the", "their", "this",
+    "to", "using", "via", "was", "we", "what", "when", "which", "with", "without",
+}
+
+
+def _stem(token: str) -> str:
+    """Very light plural folding so 'attacks' matches 'attack' but 'attack' never matches 'attacker'."""
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens with stopwords removed and plurals folded."""
+    return [
+        _stem(t) for t in TOKEN_RE.findall((text or "").lower())
+        if len(t) >= 2 and t not in STOPWORDS
+    ]
+
+
+def bm25_term_scores(tf: np.ndarray, doc_len: np.ndarray, avg_len: float, df: int, n_docs: int,
+                     k1: float = 1.5, b: float = 0.75) -> np.ndarray:
+    """BM25 contribution of one term for every document, given its term frequencies."""
+    idf = np.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+    norm = k1 * (1.0 - b + b * doc_len / max(avg_len, 1e-9))
+    return idf * tf * (k1 + 1.0) / (tf + norm)
+
+
+class BM25Index:
+    """
+    In-memory BM25 over a small candidate pool.
+    Documents are tokenized once into a postings map; scoring a query touches only the
+    postings of its terms and accumulates all documents at once with NumPy.
+    """
+
+    def __init__(self, documents: List[List[str]], k1: float = 1.5, b: float = 0.75):
+        self.n_docs = len(documents)
+        self.k1 = k1
+        self.b = b
+        self.doc_len = np.array([len(d) for d in documents], dtype=np.float64)
+        self.avg_len = float(self.doc_len.mean()) if self.n_docs else 0.0
+
+        postings: Dict[str, Dict[int, int]] = {}
+        for doc_id, tokens in enumerate(documents):
+            for token in tokens:
+                counts = postings.setdefault(token, {})
+                counts[doc_id] = counts.get(doc_id, 0) + 1
+        self.postings = {
+            term: (np.fromiter(counts.keys(), dtype=np.int64), np.fromiter(counts.values(), dtype=np.float64))
+            for term, counts in postings.items()
+        }
+
+    def score(self, query_terms: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Returns `scores` (BM25 per document) and `coverage` (fraction of distinct
+        query terms each document contains).
+        """
+        terms = list(dict.fromkeys(query_terms))
+        scores = np.zeros(self.n_docs)
+        matched = np.zeros(self.n_docs)
+        for term in terms:
+            if term not in self.postings:
+                continue
+            doc_ids, tf = self.postings[term]
+            scores[doc_ids] += bm25_term_scores(
+                tf, self.doc_len[doc_ids], self.avg_len, len(doc_ids), self.n_docs, self.k1, self.b
+            )
+            matched[doc_ids] += 1
+        coverage = matched / len(terms) if terms else matched
+        return {"scores": scores, "coverage": coverage}
+
+
+class RelevanceService:
+    """Ranks candidate sources against a domain query and drops the ones that don't match."""
+
+    # Titles say more about a source's topic than its body, so they count twice
+    TITLE_WEIGHT = 2
+
+    def __init__(self):
+        self.min_coverage = float(os.getenv("RELEVANCE_MIN_COVERAGE", "0.6"))
+        self.min_score_ratio = float(os.getenv("RELEVANCE_MIN_SCORE_RATIO", "0.2"))
+
+    @staticmethod
+    def _content(source: Dict) -> str:
+        return source.get("summary") or source.get("text") or source.get("body_snippet") or ""
+
+    def _document(self, source: Dict) -> List[str]:
+        return tokenize(source.get("title") or "") * self.TITLE_WEIGHT + tokenize(self._content(source))
+
+    def score(self, domain: str, sources: List[Dict]) -> Dict[str, np.ndarray]:
+        """BM25 scores and query-term coverage for every source, in input order."""
+        index = BM25Index([self._document(s) for s in sources])
+        return index.score(tokenize(domain))
+
+    def rank(self, domain: str, sources: List[Dict]) -> List[Dict]:
+        """
+        Sources ordered by BM25 score (ties keep input order), keeping only those that contain
+        enough of the query terms and score within reach of the best match.
+        """
+        if not sources or not tokenize(domain):
+            return list(sources)
+
+        result = self.score(domain, sources)
+        scores, coverage = result["scores"], result["coverage"]
+        best = scores.max()
+        if best <= 0:
+            return []
+
+        keep = (coverage >= self.min_coverage) & (scores >= self.min_score_ratio * best)
+        order = np.lexsort((np.arange(len(sources)), -scores))
+        return [sources[i] for i in order if keep[i]]
+
+
+relevance_service = RelevanceService()
@@ -0,0 +1,142 @@
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+
+BUCKETS = ("week", "month", "quarter")
+
+# numpy's day 0 (1970-01-01) is a Thursday; shifting by 3 makes weeks start on Monday
+_WEEK_SHIFT = 3
+
+
+def publication_times(papers: List[Dict]) -> np.ndarray:
+    """Publication timestamps as datetime64[s] (NaT where missing or unparseable)."""
+    times = []
+    for paper in papers:
+        try:
+            published = datetime.fromisoformat(paper["published"].replace("Z", "+00:00"))
+            times.append(np.datetime64(published.replace(tzinfo=None), "s"))
+        except (ValueError, KeyError, AttributeError):
+            times.append(np.datetime64("NaT"))
+    return np.array(times, dtype="datetime64[s]")
+
+
+def bucket_index(times: np.ndarray, bucket: str) -> np.ndarray:
+    """Integer bucket number per timestamp: weeks/months/quarters since the epoch."""
+    if bucket == "week":
+        days = times.astype("datetime64[D]").astype(np.int64)
+        return (days + _WEEK_SHIFT) // 7
+    months = times.astype("datetime64[M]").astype(np.int64)
+    return months // 3 if bucket == "quarter" else months
+
+
+def bucket_label(index: int, bucket: str) -> str:
+    if bucket == "week":
+        start = np.datetime64(int(index) * 7 - _WEEK_SHIFT, "D").astype(datetime)
+        return start.strftime("WK %d %b %Y").upper()
+    if bucket == "quarter":
+        return f"Q{int(index) % 4 + 1} {1970 + int(index) // 4}"
+    return np.datetime64(int(index), "M").astype(datetime).strftime("%b %Y").upper()
+
+
+def moving_average(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing mean over `window` buckets; NaN until a full window is available."""
+    result = np.full(len(values), np.nan)
+    if window < 1 or len(values) < window:
+        return result
+    sums = np.cumsum(np.insert(values.astype(np.float64), 0, 0.0))
+    result[window - 1:] = (sums[window:] - sums[:-window]) / window
+    return result
+
+
+def linear_trend(values: np.ndarray) -> Dict:
+    """
+    Least-squares line through the bucket counts.
+    growth_rate is the fitted slope as a percentage of the mean count per bucket.
+    """
+    n = len(values)
+    if n < 2 or not values.any():
+        return {"slope": 0.0, "intercept": float(values.mean()) if n else 0.0, "r2": 0.0, "growth_rate": 0.0}
+    x = np.arange(n, dtype=np.float64)
+    y = values.astype(np.float64)
+    slope, intercept = np.polyfit(x, y, 1)
+    residual = y - (slope * x + intercept)
+    total = ((y - y.mean()) ** 2).sum()
+    r2 = 1.0 - (residual ** 2).sum() / total if total > 0 else 0.0
+    return {
+        "slope": round(float(slope), 3),
+        "intercept": round(float(intercept), 3),
+        "r2": round(float(r2), 3),
+        "growth_rate": round(float(slope / y.mean() * 100), 1),
+    }
+
+
+def _breakdown(groups: List[List[str]], paper_buckets: np.ndarray, n_buckets: int, top: int) -> List[Dict]:
+    """Top values of a multi-valued field, with a per-bucket series from one 2-D bincount."""
+    lengths = np.fromiter((len(g) for g in groups), dtype=np.int64, count=len(groups))
+    if not lengths.sum():
+        return []
+    values = np.array([v for g in groups for v in g])
+    owner_bucket = np.repeat(paper_buckets, lengths)
+
+    names, codes, counts = np.unique(values, return_inverse=True, return_counts=True)
+    in_window = owner_bucket >= 0
+    grid = np.bincount(
+        codes[in_window] * n_buckets + owner_bucket[in_window], minlength=len(names) * n_buckets
+    ).reshape(len(names), n_buckets)
+
+    best = np.lexsort((names, -counts))[:top]
+    papers = len(groups)
+    return [
+        {
+            "name": str(names[i]),
+            "count": int(counts[i]),
+            "share": round(float(counts[i]) / papers, 3),
+            "series": grid[i].tolist(),
+        }
+        for i in best
+    ]
+
+
+def analyze_velocity(papers: List[Dict], bucket: str = "month", periods: int = 6, window: int = 3,
+                     top: int = 10) -> Dict:
+    """
+    Publication velocity over the last `periods` buckets ending at the newest paper, including
+    empty buckets, with a trailing moving average, a least-squares trend, and category/author
+    breakdowns whose series share the same buckets. Papers outside the window still count
+    towards the breakdown totals.
+    """
+    if bucket not in BUCKETS:
+        raise ValueError(f"bucket must be one of {', '.join(BUCKETS)}")
+    periods = max(1, periods)
+
+    times = publication_times(papers)
+    valid = ~np.isnat(times)
+    index = np.full(len(papers), -1, dtype=np.int64)
+    if valid.any():
+        index[valid] = bucket_index(times[valid], bucket)
+        last = index[valid].max()
+        first = last - periods + 1
+        counts = np.bincount(index[valid & (index >= first)] - first, minlength=periods)
+        paper_buckets = np.where(valid & (index >= first), index - first, -1)
+    else:
+        first, counts, paper_buckets = 0, np.zeros(0, dtype=np.int64), index
+
+    averages = moving_average(counts, window)
+    series = [
+        {
+            "name": bucket_label(first + i, bucket),
+            "value": int(count),
+            "moving_avg": None if np.isnan(avg) else round(float(avg), 2),
+        }
+        for i, (count, avg) in enumerate(zip(counts, averages))
+    ]
+    return {
+        "bucket": bucket,
+        "papers_analyzed": len(papers),
+        "papers_dated": int(valid.sum()),
+        "series": series,
+        "trend": linear_trend(counts),
+        "categories": _breakdown([p.get("categories", []) for p in papers], paper_buckets, len(counts), top),
+        "authors": _breakdown([p.get("authors", []) for p in papers], paper_buckets, len(counts), top),
+    }
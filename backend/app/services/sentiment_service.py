@@ -1,4 +1,5 @@
-from typing import Dict
+import asyncio
+from typing import Dict, List
 from app.services.hackernews_service import hackernews_service
 from app.services.stackexchange_service import stackexchange_service
 from app.services.reddit_service import reddit_service
@@ -35,18 +36,24 @@ class SentimentService:
     async def compute_pulse(self, domain: str) -> Dict:
         """
         Compute a composite sentiment/pulse score for a domain.
-        
+        Fetches the HN, SE and Reddit signals concurrently, then scores them.
+        """
+        hn_signals, se_signals, reddit_discussions = await asyncio.gather(
+            hackernews_service.get_sentiment_signals(domain),
+            stackexchange_service.get_sentiment_signals(domain),
+            reddit_service.asearch_discussions(domain, limit=15),
+        )
+        return self.score_pulse(domain, hn_signals, se_signals, reddit_discussions)
+
+    def score_pulse(self, domain: str, hn_signals: Dict, se_signals: Dict, reddit_discussions: List[Dict]) -> Dict:
+        """
+        Score already-fetched signals into a composite pulse.
+
         Weights:
         - HackerNews: 40% (tech community engagement)
         - Reddit: 30% (broader community discussion)
         - StackExchange: 30% (technical depth / Q&A activity)
         """
-        # Gather signals in parallel-ish (sequential for simplicity)
-        hn_signals = await hackernews_service.get_sentiment_signals(domain)
-        se_signals = await stackexchange_service.get_sentiment_signals(domain)
-
-        # Reddit signals (sync call, run in thread)
-        reddit_discussions = reddit_service.search_discussions(domain, limit=15)
         reddit_scores = [d.get("score", 0) for d in reddit_discussions]
         reddit_avg = sum(reddit_scores) / len(reddit_scores) if reddit_scores else 0
 
@@ -0,0 +1,94 @@
+import asyncio
+import os
+from typing import Dict, List
+
+from app.services.arxiv_service import arxiv_service
+from app.services.reddit_service import reddit_service
+from app.services.hackernews_service import hackernews_service
+from app.services.stackexchange_service import stackexchange_service
+
+
+class SourceFanout:
+    """
+    Fetches every upstream source concurrently, each under its own deadline.
+    Sources that miss their deadline are reported back instead of stalling the request.
+    """
+
+    SOURCES = ["arxiv", "reddit", "hackernews", "stackexchange"]
+
+    DEFAULT_DEADLINES = {
+        "arxiv": 8.0,
+        "reddit": 6.0,
+        "hackernews": 5.0,
+        "stackexchange": 5.0,
+    }
+
+    def __init__(self):
+        # e.g. ARXIV_DEADLINE_SECONDS=12
+        self.deadlines = {
+            name: float(os.getenv(f"{name.upper()}_DEADLINE_SECONDS", default))
+            for name, default in self.DEFAULT_DEADLINES.items()
+        }
+
+    def _calls(self, domain: str, arxiv_limit: int, reddit_limit: int, hn_limit: int, se_limit: int) -> Dict:
+        return {
+            "arxiv": lambda: arxiv_service.asearch_papers(domain, max_results=arxiv_limit),
+            "reddit": lambda: reddit_service.asearch_discussions(domain, limit=reddit_limit),
+            "hackernews": lambda: hackernews_service.search_stories(domain, limit=hn_limit),
+            "stackexchange": lambda: stackexchange_service.search_questions(domain, limit=se_limit),
+        }
+
+    async def _fetch_with_deadline(self, name: str, call) -> tuple:
+        """Returns (name, results, status) where status is ok, timeout or error."""
+        try:
+            results = await asyncio.wait_for(call(), timeout=self.deadlines[name])
+            return name, results or [], "ok"
+        except asyncio.TimeoutError:
+            print(f"Source '{name}' exceeded its {self.deadlines[name]}s deadline")
+            return name, [], "timeout"
+        except Exception as e:
+            print(f"Source '{name}' failed: {e}")
+            return name, [], "error"
+
+    async def iter_completed(
+        self,
+        domain: str,
+        arxiv_limit: int = 10,
+        reddit_limit: int = 10,
+        hn_limit: int = 10,
+        se_limit: int = 10,
+    ):
+        """Fan out to all sources at once, yielding (name, items, status) as each one settles."""
+        calls = self._calls(domain, arxiv_limit, reddit_limit, hn_limit, se_limit)
+        pending = [self._fetch_with_deadline(name, calls[name]) for name in self.SOURCES]
+        for next_done in asyncio.as_completed(pending):
+            yield await next_done
+
+    async def fetch_all(
+        self,
+        domain: str,
+        arxiv_limit: int = 10,
+        reddit_limit: int = 10,
+        hn_limit: int = 10,
+        se_limit: int = 10,
+    ) -> Dict:
+        """
+        Fan out to all sources at once and return whatever arrived in time.
+        The result maps each source name to its items, plus `timed_out` and `failed` lists.
+        """
+        result: Dict[str, List] = {"timed_out": [], "failed": []}
+        async for name, items, status in self.iter_completed(domain, arxiv_limit, reddit_limit, hn_limit, se_limit):
+            self.collect(result, name, items, status)
+        return result
+
+    @staticmethod
+    def collect(result: Dict, name: str, items: List, status: str):
+        """Record one settled source into a fetch_all-shaped result."""
+        result[name] = items
+        if status == "timeout":
+            result["timed_out"].append(name)
+        elif status == "error":
+            result["failed"].append(name)
+
+
+source_fanout = SourceFanout()
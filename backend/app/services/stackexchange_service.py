@@ -1,55 +1,69 @@
 import aiohttp
+import re
 from typing import List, Dict
 
+from app.core.cache import source_cache
+from app.core.circuit_breaker import UpstreamError, circuit_breakers
+from app.core.http_client import http_client
+from app.core.rate_governor import rate_governor
+
 
 class StackExchangeService:
     """Client for Stack Exchange API v2.3 (no key needed for low-rate usage)."""
 
     BASE_URL = "https://api.stackexchange.com/2.3"
 
+    @source_cache.cached("stackexchange")
     async def search_questions(self, query: str, site: str = "", limit: int = 15) -> List[Dict]:
+        """Search for relevant questions on Stack Exchange."""
         if not site:
             site = self._pick_site(query)
-
-        """Search for relevant questions on Stack Exchange."""
         try:
-            url = f"{self.BASE_URL}/search/advanced"
-            params = {
-                "q": query,
-                "site": site,
-                "pagesize": min(limit, 30),
-                "order": "desc",
-                "sort": "relevance",
-                "filter": "withbody",
-            }
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=10)) as resp:
-                    if resp.status != 200:
-                        return []
-                    data = await resp.json()
-
-            results = []
-            for item in data.get("items", []):
-                body = item.get("body", "")
-                # Strip HTML tags for a text snippet
-                import re
-                text_snippet = re.sub(r'<[^>]+>', '', body)[:500]
-                results.append({
-                    "id": item.get("question_id", 0),
-                    "title": item.get("title", ""),
-                    "link": item.get("link", ""),
-                    "score": item.get("score", 0),
-                    "answer_count": item.get("answer_count", 0),
-                    "tags": item.get("tags", []),
-                    "body_snippet": text_snippet,
-                    "is_answered": item.get("is_answered", False),
-                    "view_count": item.get("view_count", 0),
-                })
-            return results
+            return await circuit_breakers.call("stackexchange", self._search_questions, query, site, limit)
         except Exception as e:
             print(f"StackExchange search error: {e}")
             return []
 
+    async def _search_questions(self, query: str, site: str, limit: int) -> List[Dict]:
+        url = f"{self.BASE_URL}/search/advanced"
+        params = {
+            "q": query,
+            "site": site,
+            "pagesize": min(limit, 30),
+            "order": "desc",
+            "sort": "relevance",
+            "filter": "withbody",
+        }
+        await rate_governor.acquire("stackexchange")
+        session = await http_client.get_session()
+        async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=10)) as resp:
+            rate_governor.observe("stackexchange", resp.status, resp.headers)
+            if resp.status == 429 or resp.status >= 500:
+                raise UpstreamError(f"StackExchange returned HTTP {resp.status}")
+            # Throttling details (backoff, quota, throttle_violation) come in the body, errors included
+            data = await resp.json(content_type=None)
+            rate_governor.observe_stackexchange(data)
+            if resp.status != 200:
+                return []
+
+        results = []
+        for item in data.get("items", []):
+            body = item.get("body", "")
+            # Strip HTML tags for a text snippet
+            text_snippet = re.sub(r'<[^>]+>', '', body)[:500]
+            results.append({
+                "id": item.get("question_id", 0),
+                "title": item.get("title", ""),
+                "link": item.get("link", ""),
+                "score": item.get("score", 0),
+                "answer_count": item.get("answer_count", 0),
+                "tags": item.get("tags", []),
+                "body_snippet": text_snippet,
+                "is_answered": item.get("is_answered", False),
+                "view_count": item.get("view_count", 0),
+            })
+        return results
+
     def _pick_site(self, query: str) -> str:
         """Choose the most appropriate StackExchange site for the query."""
         q = query.lower()
@@ -0,0 +1,205 @@
+import json
+import os
+import threading
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+from pydantic import BaseModel
+
+
+class VectorMatch(BaseModel):
+    """Same shape as the Pinecone matches callers already read (id, score, metadata)."""
+    id: str
+    score: float
+    metadata: Dict = {}
+
+
+class _IndexView(NamedTuple):
+    """Everything a query reads, published by upsert in one assignment."""
+    ids: List[str]
+    metadata: List[Dict]
+    rows: Dict[str, int]
+    matrix: np.ndarray
+    signatures: np.ndarray
+
+
+class LocalVectorIndex:
+    """
+    In-process cosine index backed by a memory-mapped float32 matrix.
+
+    On disk (under `path`):
+      index.json  — header with the embedding dimension
+      vectors.f32 — raw row-major float32 matrix, one L2-normalized row per document
+      meta.jsonl  — append-only log of {"id", "row", "metadata"}; later lines win
+
+    Loading maps the matrix instead of reading it, so startup takes milliseconds.
+    `exact` mode scores every row; `approx` mode pre-selects candidates by random-hyperplane
+    LSH signatures and re-ranks only those exactly.
+
+    Upserts are serialized by a lock and build a new view (ids, metadata, matrix, signatures)
+    that replaces the old one at once, so queries need no lock and never see half an upsert.
+    """
+
+    LSH_BITS = 32
+    LSH_SEED = 1234
+
+    def __init__(self, path: str, dimension: int, mode: str = "exact", approx_candidates: int = 512):
+        self.path = path
+        self.dimension = dimension
+        self.mode = mode
+        self.approx_candidates = approx_candidates
+        self._lock = threading.Lock()
+        planes = np.random.default_rng(self.LSH_SEED).standard_normal((self.LSH_BITS, dimension))
+        self._planes = planes.astype(np.float32)
+        self._view = _IndexView(
+            [], [], {}, np.zeros((0, dimension), dtype=np.float32), np.zeros((0, self.LSH_BITS), dtype=bool)
+        )
+        self._header_written = False
+        self._load()
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.path, "vectors.f32")
+
+    @property
+    def _meta_path(self) -> str:
+        return os.path.join(self.path, "meta.jsonl")
+
+    @property
+    def _header_path(self) -> str:
+        return os.path.join(self.path, "index.json")
+
+    def _set_aside(self, reason: str):
+        """Move unusable index files out of the way (kept as *.stale) and start empty."""
+        print(f"Warning: local vector index at {self.path} {reason}; starting a fresh index.")
+        for file_path in (self._vectors_path, self._meta_path):
+            if os.path.exists(file_path):
+                os.replace(file_path, file_path + ".stale")
+
+    def __len__(self) -> int:
+        return len(self._view.ids)
+
+    def _load(self):
+        header = {}
+        if os.path.exists(self._header_path):
+            with open(self._header_path, "r", encoding="utf-8") as f:
+                header = json.load(f)
+        if header.get("dimension", self.dimension) != self.dimension:
+            self._set_aside(f"was built for dimension {header['dimension']}, not {self.dimension}")
+
+        if not os.path.exists(self._meta_path) or not os.path.exists(self._vectors_path):
+            return
+        rows: Dict[int, Dict] = {}
+        with open(self._meta_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    rows[entry["row"]] = entry
+        n_rows = os.path.getsize(self._vectors_path) // (4 * self.dimension)
+        if n_rows != len(rows):
+            self._set_aside(f"is inconsistent ({n_rows} vectors, {len(rows)} entries)")
+            return
+        if n_rows == 0:
+            return
+        matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(n_rows, self.dimension))
+        ids = [rows[i]["id"] for i in range(n_rows)]
+        self._view = _IndexView(
+            ids,
+            [rows[i].get("metadata", {}) for i in range(n_rows)],
+            {doc_id: i for i, doc_id in enumerate(ids)},
+            matrix,
+            self._signature(matrix),
+        )
+
+    def _signature(self, vectors: np.ndarray) -> np.ndarray:
+        return (np.asarray(vectors) @ self._planes.T) > 0
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def get_metadata(self, doc_id: str) -> Optional[Dict]:
+        view = self._view
+        row = view.rows.get(doc_id)
+        return None if row is None else view.metadata[row]
+
+    def upsert(self, vectors: List[Dict]):
+        """Insert or overwrite rows given Pinecone-style {"id", "values", "metadata"} dicts."""
+        if not vectors:
+            return
+        with self._lock:
+            if not self._header_written:
+                os.makedirs(self.path, exist_ok=True)
+                with open(self._header_path, "w", encoding="utf-8") as f:
+                    json.dump({"dimension": self.dimension}, f)
+                self._header_written = True
+
+            # Copies: the current view stays intact for queries running meanwhile
+            view = self._view
+            ids, metadata, rows = list(view.ids), list(view.metadata), dict(view.rows)
+            values = self._normalize(np.array([v["values"] for v in vectors], dtype=np.float32))
+            updates, appends = [], []
+            for vector, row_values in zip(vectors, values):
+                if vector["id"] in rows:
+                    updates.append((rows[vector["id"]], vector, row_values))
+                else:
+                    rows[vector["id"]] = len(ids) + len(appends)
+                    appends.append((vector, row_values))
+
+            with open(self._vectors_path, "r+b" if os.path.exists(self._vectors_path) else "w+b") as f:
+                for row, _, row_values in updates:
+                    f.seek(row * self.dimension * 4)
+                    f.write(row_values.tobytes())
+                f.seek(0, os.SEEK_END)
+                for _, row_values in appends:
+                    f.write(row_values.tobytes())
+
+            with open(self._meta_path, "a", encoding="utf-8") as f:
+                for row, vector, _ in updates:
+                    metadata[row] = vector.get("metadata", {})
+                    f.write(json.dumps({"id": vector["id"], "row": row, "metadata": metadata[row]}) + "\n")
+                for vector, _ in appends:
+                    ids.append(vector["id"])
+                    metadata.append(vector.get("metadata", {}))
+                    row = len(ids) - 1
+                    f.write(json.dumps({"id": vector["id"], "row": row, "metadata": metadata[row]}) + "\n")
+
+            matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(len(ids), self.dimension))
+            # Only the touched rows need new LSH signatures
+            signatures = view.signatures.copy()
+            for row, _, row_values in updates:
+                signatures[row] = self._signature(row_values)
+            if appends:
+                new_rows = np.array([row_values for _, row_values in appends])
+                signatures = np.vstack([signatures, self._signature(new_rows)])
+            self._view = _IndexView(ids, metadata, rows, matrix, signatures)
+
+    def query(self, vector: List[float], top_k: int = 5) -> List[VectorMatch]:
+        """Top-k rows by cosine similarity."""
+        view = self._view  # read once: a concurrent upsert publishes a new view
+        if not view.ids:
+            return []
+        query = self._normalize(np.asarray(vector, dtype=np.float32))
+
+        if self.mode == "approx" and len(view.ids) > self.approx_candidates:
+            # Hamming distance between LSH signatures approximates angular distance
+            hamming = (view.signatures != self._signature(query)).sum(axis=1)
+            n_candidates = min(len(view.ids), max(top_k * 20, self.approx_candidates))
+            candidates = np.argpartition(hamming, n_candidates - 1)[:n_candidates]
+        else:
+            candidates = np.arange(len(view.ids))
+
+        scores = np.asarray(view.matrix[candidates]) @ query
+        k = min(top_k, len(candidates))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [
+            VectorMatch(
+                id=view.ids[candidates[i]],
+                score=float(scores[i]),
+                metadata=view.metadata[candidates[i]],
+            )
+            for i in best
+        ]
@@ -1,94 +1,281 @@
+import asyncio
+import hashlib
+import logging
 import os
-from pinecone import Pinecone, ServerlessSpec
+from collections import OrderedDict
 from typing import List, Dict, Any
 from dotenv import load_dotenv
 
+from app.core.executor import run_blocking
+from app.core.paths import data_path
+from app.core.tokens import count_tokens
+from app.services.embeddings import get_embedder
+from app.services.vector_index import LocalVectorIndex
+
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingDimensionMismatch(RuntimeError):
+    """The configured embedder doesn't produce vectors of the existing index's dimension."""
+
+
+class PineconeBackend:
+    """Pinecone serverless index (requires PINECONE_API_KEY and network access)."""
+
+    name = "pinecone"
+
+    def __init__(self, api_key: str, index_name: str, dimension: int):
+        from pinecone import Pinecone, ServerlessSpec
+        self.pc = Pinecone(api_key=api_key)
+        # Create index if it doesn't exist
+        if index_name not in self.pc.list_indexes().names():
+            self.pc.create_index(
+                name=index_name,
+                dimension=dimension,
+                metric='cosine',
+                spec=ServerlessSpec(
+                    cloud='aws',
+                    region='us-east-1'
+                )
+            )
+        else:
+            existing = self.pc.describe_index(index_name).dimension
+            if existing != dimension:
+                raise EmbeddingDimensionMismatch(
+                    f"Pinecone index '{index_name}' holds {existing}-dimensional vectors but the configured "
+                    f"embedder produces {dimension}; set EMBEDDING_PROVIDER to the model the index was built "
+                    f"with, or delete the index so it is recreated"
+                )
+        self.index = self.pc.Index(index_name)
+
+    async def upsert(self, vectors: List[Dict]):
+        await run_blocking(self.index.upsert, vectors=vectors)
+
+    async def query(self, vector: List[float], top_k: int = 5):
+        results = await run_blocking(self.index.query, vector=vector, top_k=top_k, include_metadata=True)
+        return results.matches
+
+    async def content_hashes(self, ids: List[str]) -> Dict[str, str]:
+        """content_hash metadata of the ids already stored."""
+        response = await run_blocking(self.index.fetch, ids=ids)
+        return {
+            vector_id: (vector.metadata or {}).get("content_hash", "")
+            for vector_id, vector in response.vectors.items()
+        }
+
+
+class LocalBackend:
+    """Offline backend: the memory-mapped LocalVectorIndex, no network involved."""
+
+    name = "local"
+
+    def __init__(self, path: str, dimension: int, mode: str):
+        self.index = LocalVectorIndex(path, dimension, mode=mode)
+
+    async def upsert(self, vectors: List[Dict]):
+        await run_blocking(self.index.upsert, vectors)
+
+    async def query(self, vector: List[float], top_k: int = 5):
+        return await run_blocking(self.index.query, vector, top_k=top_k)
+
+    async def content_hashes(self, ids: List[str]) -> Dict[str, str]:
+        return await run_blocking(self._content_hashes, ids)
+
+    def _content_hashes(self, ids: List[str]) -> Dict[str, str]:
+        hashes = {}
+        for vector_id in ids:
+            metadata = self.index.get_metadata(vector_id)
+            if metadata is not None:
+                hashes[vector_id] = metadata.get("content_hash", "")
+        return hashes
+
+
 class VectorService:
     def __init__(self):
-        self.pc = None
+        self.backend = None
         self.index_name = "frontier-map-index"
+        self.embedder = get_embedder()
+
+        # Upsert pipeline tuning
+        self.embed_batch_size = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+        self.embed_semaphore = asyncio.Semaphore(int(os.getenv("EMBED_CONCURRENCY", "4")))
+        self.upsert_chunk_size = int(os.getenv("VECTOR_UPSERT_CHUNK", "100"))
+        # id -> content hash of what this worker knows is already indexed
+        self._indexed: "OrderedDict[str, str]" = OrderedDict()
+        self._indexed_max = int(os.getenv("VECTOR_KNOWN_IDS_MAX", "50000"))
+        self.counters = {
+            "documents_seen": 0,
+            "skipped_unchanged": 0,
+            "embedded": 0,
+            "embedding_calls": 0,
+            "embedding_calls_saved": 0,
+            "tokens_embedded": 0,
+            "tokens_saved": 0,
+            "upsert_calls": 0,
+        }
+
+        # VECTOR_BACKEND: pinecone, local or auto (Pinecone when a key is set, else none).
+        # The local index writes to disk, so it is only used when asked for.
+        backend = os.getenv("VECTOR_BACKEND", "auto").lower()
         api_key = os.getenv("PINECONE_API_KEY")
-        
-        if api_key and "your_" not in api_key:
+        has_pinecone_key = bool(api_key and "your_" not in api_key)
+
+        if backend == "pinecone" or (backend == "auto" and has_pinecone_key):
+            try:
+                self.backend = PineconeBackend(api_key, self.index_name, self.embedder.dimension)
+            except EmbeddingDimensionMismatch as e:
+                # Only an explicit VECTOR_BACKEND=pinecone makes this fatal; auto degrades like any other failure
+                if backend == "pinecone":
+                    raise
+                logger.error("Vector search disabled: %s", e)
+            except Exception as e:
+                print(f"Info: Pinecone inactive. (Error: {e})")
+
+        if backend == "local":
             try:
-                self.pc = Pinecone(api_key=api_key)
-                # Create index if it doesn't exist
-                if self.index_name not in self.pc.list_indexes().names():
-                    self.pc.create_index(
-                        name=self.index_name,
-                        dimension=1536, 
-                        metric='cosine',
-                        spec=ServerlessSpec(
-                            cloud='aws',
-                            region='us-east-1' 
-                        )
-                    )
-                self.index = self.pc.Index(self.index_name)
+                self.backend = LocalBackend(
+                    data_path(os.getenv("VECTOR_INDEX_PATH", "vector_index")),
+                    self.embedder.dimension,
+                    os.getenv("VECTOR_INDEX_MODE", "exact"),
+                )
             except Exception as e:
                 print(f"Info: Vector search inactive. (Error: {e})")
 
+    @staticmethod
+    def _document_text(doc: Dict[str, Any]) -> str:
+        return f"{doc.get('title', '')} {doc.get('summary', '') or doc.get('text', '')}"
+
+    @staticmethod
+    def _content_hash(text: str) -> str:
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def _remember(self, doc_id: str, content_hash: str):
+        self._indexed[doc_id] = content_hash
+        self._indexed.move_to_end(doc_id)
+        while len(self._indexed) > self._indexed_max:
+            self._indexed.popitem(last=False)
 
-    async def upsert_documents(self, documents: List[Dict[str, Any]]):
+    async def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        async with self.embed_semaphore:
+            return await self.embedder.embed_documents(texts)
+
+    async def upsert_documents(self, documents: List[Dict[str, Any]]) -> Dict:
         """
-        Convert text to embeddings and upsert to Pinecone.
+        Embed and upsert documents to the vector backend.
+        Documents whose id is already indexed with the same content hash are skipped; the rest
+        are embedded in batches with bounded concurrency and upserted in chunks.
+        Returns this call's accounting (embedded, skipped, calls and tokens saved).
         """
-        if not self.pc or not documents:
-            return
+        report = {"embedded": 0, "skipped": 0, "embedding_calls": 0, "tokens_saved": 0}
+        if not self.backend or not documents:
+            return report
 
-        from langchain_openai import OpenAIEmbeddings
-        embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-        
-        vectors = []
+        # One entry per id (last wins), hashed on the exact text we would embed
+        pending: Dict[str, Dict] = {}
         for doc in documents:
-            text = f"{doc.get('title', '')} {doc.get('summary', '') or doc.get('text', '')}"
-            vector = await embeddings.aembed_query(text)
-            
-            vectors.append({
-                "id": doc.get("id"),
-                "values": vector,
-                "metadata": {
-                    "title": doc.get("title"),
-                    "url": doc.get("url"),
-                    "source": "arxiv" if "arxiv" in doc.get("url", "") else "reddit"
-                }
-            })
-        
-        self.index.upsert(vectors=vectors)
+            if not doc.get("id"):
+                continue
+            text = self._document_text(doc)
+            pending[str(doc["id"])] = {"doc": doc, "text": text, "hash": self._content_hash(text)}
+        self.counters["documents_seen"] += len(pending)
+
+        # Ask the backend only about ids this worker hasn't seen yet
+        unknown = [doc_id for doc_id in pending if doc_id not in self._indexed]
+        if unknown:
+            try:
+                for doc_id, content_hash in (await self.backend.content_hashes(unknown)).items():
+                    self._remember(doc_id, content_hash)
+            except Exception as e:
+                print(f"Vector dedupe lookup error: {e}")
+
+        to_embed = []
+        for doc_id, item in pending.items():
+            if self._indexed.get(doc_id) == item["hash"]:
+                report["skipped"] += 1
+                report["tokens_saved"] += count_tokens(item["text"])
+            else:
+                to_embed.append((doc_id, item))
+
+        if to_embed:
+            # Identical content under different ids is embedded once
+            unique_texts = list(dict.fromkeys(item["text"] for _, item in to_embed))
+            batches = [
+                unique_texts[i:i + self.embed_batch_size]
+                for i in range(0, len(unique_texts), self.embed_batch_size)
+            ]
+            embedded_batches = await asyncio.gather(*(self._embed_batch(batch) for batch in batches))
+            embeddings = {
+                text: vector
+                for batch, vectors in zip(batches, embedded_batches)
+                for text, vector in zip(batch, vectors)
+            }
+            report["embedding_calls"] = len(batches)
+            report["embedded"] = len(to_embed)
+
+            vectors = []
+            for doc_id, item in to_embed:
+                doc = item["doc"]
+                vectors.append({
+                    "id": doc_id,
+                    "values": embeddings[item["text"]],
+                    "metadata": {
+                        "title": doc.get("title"),
+                        "url": doc.get("url"),
+                        "source": "arxiv" if "arxiv" in doc.get("url", "") else "reddit",
+                        "content_hash": item["hash"],
+                    }
+                })
+            for i in range(0, len(vectors), self.upsert_chunk_size):
+                await self.backend.upsert(vectors[i:i + self.upsert_chunk_size])
+                self.counters["upsert_calls"] += 1
+            for doc_id, item in to_embed:
+                self._remember(doc_id, item["hash"])
+
+            self.counters["tokens_embedded"] += sum(count_tokens(t) for t in unique_texts)
+
+        # Versus the old path: one aembed_query per document, every time
+        self.counters["skipped_unchanged"] += report["skipped"]
+        self.counters["embedded"] += report["embedded"]
+        self.counters["embedding_calls"] += report["embedding_calls"]
+        self.counters["embedding_calls_saved"] += len(pending) - report["embedding_calls"]
+        self.counters["tokens_saved"] += report["tokens_saved"]
+        return report
 
     async def query_similar(self, query_text: str, top_k: int = 5):
         """
         Search for semantically similar gaps or papers.
         """
-        if not self.pc:
+        if not self.backend:
             return []
-        
-        from langchain_openai import OpenAIEmbeddings
-        embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-        query_vector = await embeddings.aembed_query(query_text)
-        
-        results = self.index.query(vector=query_vector, top_k=top_k, include_metadata=True)
-        return results.matches
+
+        query_vector = await self.embedder.embed_query(query_text)
+        return await self.backend.query(query_vector, top_k=top_k)
+
+    def stats(self) -> Dict:
+        return {
+            "backend": self.backend.name if self.backend else None,
+            "embedder": self.embedder.name,
+            **self.counters,
+        }
 
     async def compute_novelty_score(self, idea_text: str) -> float:
         """
-        Compute novelty score by comparing against existing documents in Pinecone.
+        Compute novelty score by comparing against existing indexed documents.
         Returns 1-10 (10 = most novel, 1 = very similar to existing work).
         """
-        if not self.pc:
+        if not self.backend:
             return 5.0  # Default score when vector search is unavailable
 
         try:
-            from langchain_openai import OpenAIEmbeddings
-            embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-            query_vector = await embeddings.aembed_query(idea_text)
+            query_vector = await self.embedder.embed_query(idea_text)
 
-            results = self.index.query(vector=query_vector, top_k=5, include_metadata=True)
-            if not results.matches:
+            matches = await self.backend.query(query_vector, top_k=5)
+            if not matches:
                 return 9.0  # No similar documents found = very novel
 
-            max_similarity = max(m.score for m in results.matches)
+            max_similarity = max(m.score for m in matches)
             # Convert cosine similarity (0-1) to novelty (1-10)
             novelty = 10 * (1 - max_similarity)
             return max(1.0, min(10.0, round(novelty, 1)))
@@ -0,0 +1,17 @@
+from collections import OrderedDict
+
+import pytest_asyncio
+
+from app.core.database import Database
+from app.core.storage import SQLiteStorage
+
+
+@pytest_asyncio.fixture
+async def sqlite_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(Database, "storage", SQLiteStorage(str(tmp_path / "test.db")))
+    monkeypatch.setattr(Database, "_no_feedback", OrderedDict())
+    await Database.ensure_indexes()
+    await Database.ensure_cache_indexes()
+    yield Database
+    await Database.writer.stop()
+    await Database.storage.close()
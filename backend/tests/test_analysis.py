@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+from app.core.llm_cache import llm_cache
+from app.services.analysis_service import ProblemCard, analysis_service
+from app.services.card_stream_parser import CardStreamParser
+
+
+def test_stream_parser_emits_cards_as_objects_close():
+    card = {
+        "gap": "Sparse {labels} in \"rare\" events",
+        "context": "c",
+        "source_citation": "t",
+        "proposed_solution": "p",
+        "novelty_score": 7,
+    }
+    completion = "```json\n" + json.dumps({"cards": [card, {**card, "gap": "second"}]}) + "\n```"
+    first_close = completion.index('"novelty_score": 7}') + len('"novelty_score": 7}')
+
+    parser = CardStreamParser(ProblemCard)
+    emitted = []
+    for i in range(0, len(completion), 5):
+        emitted.extend(parser.feed(completion[i:i + 5]))
+        if i + 5 >= first_close:
+            assert len(emitted) >= 1
+
+    assert [c.gap for c in emitted] == [card["gap"], "second"]
+    assert parser.feed("{}") == []
+
+
+@pytest.mark.asyncio
+async def test_partial_extraction_is_not_cached(monkeypatch):
+    cached = []
+    shards = [[{"title": "a"}], [{"title": "b"}]]
+    card = ProblemCard(gap="g", context="c", source_citation="a", proposed_solution="p", novelty_score=5)
+
+    async def extract_shard(shard, domain, feedback_section):
+        if shard[0]["title"] == "b":
+            raise ValueError("unparseable completion")
+        return [card]
+
+    async def cache_miss(request):
+        return None
+
+    async def cache_set(request, value):
+        cached.append(value)
+
+    monkeypatch.setattr(llm_cache, "get", cache_miss)
+    monkeypatch.setattr(llm_cache, "set", cache_set)
+    monkeypatch.setattr(analysis_service, "_shards", lambda content_list, domain: shards)
+    monkeypatch.setattr(analysis_service, "_extract_shard", extract_shard)
+
+    assert await analysis_service.extract_gaps([{"title": "a"}], "nlp") == [card]
+    assert cached == []
+
+
+@pytest.mark.asyncio
+async def test_partial_stream_is_not_cached(monkeypatch):
+    cached = []
+    card = ProblemCard(gap="g", context="c", source_citation="a", proposed_solution="p", novelty_score=5)
+
+    async def stream_shard(shard, domain, feedback_section):
+        if shard[0]["title"] == "b":
+            raise ConnectionError("stream reset")
+        yield card
+
+    async def cache_miss(request):
+        return None
+
+    async def cache_set(request, value):
+        cached.append(value)
+
+    monkeypatch.setattr(llm_cache, "get", cache_miss)
+    monkeypatch.setattr(llm_cache, "set", cache_set)
+    monkeypatch.setattr(analysis_service, "_shards", lambda content_list, domain: [[{"title": "a"}], [{"title": "b"}]])
+    monkeypatch.setattr(analysis_service, "_stream_shard", stream_shard)
+
+    assert [c async for c in analysis_service.stream_gaps([{"title": "a"}], "nlp")] == [card]
+    assert cached == []
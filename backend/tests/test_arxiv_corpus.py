@@ -0,0 +1,52 @@
+import json
+
+from app.services.arxiv_corpus import ArxivCorpus
+from app.services.arxiv_service import ArxivService
+
+
+def _dump(path, records):
+    with open(path, "w", encoding="utf-8") as f:
+        for r in records:
+            f.write(json.dumps(r) + "\n")
+
+
+def _paper(paper_id, title, abstract, categories, created="Mon, 2 Jan 2023 10:00:00 GMT", version="v1"):
+    return {
+        "id": paper_id, "title": title, "abstract": abstract, "categories": categories,
+        "authors": "A. Author and B. Author", "authors_parsed": [["Author", "A.", ""], ["Author", "B.", ""]],
+        "versions": [{"version": "v1", "created": created}, {"version": version, "created": created}],
+    }
+
+
+def test_corpus_build_and_search(tmp_path):
+    dump = tmp_path / "arxiv.json"
+    _dump(dump, [
+        _paper("2301.00001", "Graph neural networks for molecules", "We study message passing.", "cs.LG q-bio.BM"),
+        _paper("2301.00002", "Attention is enough", "Graph attention over large networks.", "cs.CL"),
+        _paper("2301.00003", "Robot grasping", "Reinforcement learning for grasping.", "cs.RO",
+               created="Tue, 3 Jan 2023 10:00:00 GMT"),
+        _paper("2301.00001", "Graph neural networks for molecules", "Revised abstract.", "cs.LG", version="v2"),
+    ])
+    corpus = ArxivCorpus.build([str(dump)], str(tmp_path / "corpus"))
+    assert len(corpus) == 3
+    assert corpus.latest_published.day == 3
+
+    reopened = ArxivCorpus(str(tmp_path / "corpus"))
+    results = reopened.search("graph neural networks", max_results=5)
+    assert [r["id"] for r in results] == ["http://arxiv.org/abs/2301.00001v2", "http://arxiv.org/abs/2301.00002v1"]
+    assert results[0]["authors"] == ["A. Author", "B. Author"]
+    assert results[0]["summary"] == "Revised abstract."
+    assert [r["title"] for r in reopened.search("cs.RO")] == ["Robot grasping"]
+    assert reopened.search("quantum chromodynamics") == []
+
+
+def test_corpus_search_makes_no_live_call_by_default(tmp_path, monkeypatch):
+    dump = tmp_path / "arxiv.json"
+    _dump(dump, [_paper("2301.00001", "Graph neural networks", "Message passing.", "cs.LG")])
+    ArxivCorpus.build([str(dump)], str(tmp_path / "corpus"))
+    monkeypatch.setenv("ARXIV_CORPUS_PATH", str(tmp_path / "corpus"))
+    monkeypatch.delenv("ARXIV_CORPUS_LIVE_FALLBACK", raising=False)
+
+    service = ArxivService()
+    monkeypatch.setattr(service, "_search_live", lambda *a, **kw: (_ for _ in ()).throw(AssertionError("live call")))
+    assert [r["title"] for r in service.search_papers("graph")] == ["Graph neural networks"]
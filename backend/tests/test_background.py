@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+from app.core.background import BackgroundQueue
+from app.core.bulk_writer import BulkWriter
+
+
+@pytest.mark.asyncio
+async def test_background_queue_rejects_when_full_and_drains_on_stop():
+    queue = BackgroundQueue()
+    queue.max_size, queue.n_workers = 2, 1
+    done = []
+
+    async def job(n):
+        await asyncio.sleep(0.01)
+        done.append(n)
+
+    await queue.start()
+    results = [await queue.submit("job", job, n) for n in range(4)]
+    assert results.count(False) >= 1
+    assert queue.counters["rejected"] == results.count(False)
+
+    await queue.stop()
+    assert len(done) == results.count(True)
+    assert queue.stats()["workers"] == 0
+
+
+@pytest.mark.asyncio
+async def test_bulk_writer_flushes_on_size_and_stop():
+    written = []
+
+    async def sink(collection, docs):
+        written.append((collection, len(docs)))
+
+    writer = BulkWriter(sink)
+    writer.batch_size, writer.flush_interval = 3, 60
+    for n in range(4):
+        await writer.add("searches", {"n": n})
+    assert written == [("searches", 3)]
+
+    await writer.stop()
+    assert written == [("searches", 3), ("searches", 1)]
+    assert writer.stats()["avg_batch"] == 2.0
+
+
+@pytest.mark.asyncio
+async def test_bulk_writer_retries_failed_batches_then_drops_them():
+    outcomes, written = ["fail", "fail", "ok"], []
+
+    async def flaky_sink(collection, docs):
+        if outcomes.pop(0) == "fail":
+            raise ConnectionError("primary stepped down")
+        written.extend(doc["n"] for doc in docs)
+
+    writer = BulkWriter(flaky_sink)
+    writer.flush_interval, writer.max_retries = 60, 2
+    await writer.add("feedback", {"n": 0})
+    await writer.flush()
+    await writer.add("feedback", {"n": 1})
+    await writer.flush()
+    assert writer.stats()["pending"] == {"feedback": 2}
+    await writer.flush()
+    assert written == [0, 1]
+    assert (writer.counters["failed_batches"], writer.counters["dropped_documents"]) == (2, 0)
+
+    outcomes.extend(["fail"] * 3)
+    await writer.add("feedback", {"n": 2})
+    await writer.stop()
+    assert writer.stats()["pending"] == {}
+    assert writer.counters["dropped_documents"] == 1
+
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+from app.core.cache import TieredCache, normalize_domain
+from app.core.singleflight import SingleFlight
+
+
+class FakeService:
+    def __init__(self, cache):
+        self.calls = 0
+
+        @cache.cached("fake")
+        async def search(service, query: str, limit: int = 10):
+            self.calls += 1
+            return [query] * limit if query != "empty" else []
+
+        self.search = search
+
+
+def test_normalize_domain():
+    assert normalize_domain("  Machine   LEARNING ") == "machine learning"
+
+
+@pytest.mark.asyncio
+async def test_cached_hits_and_eviction():
+    cache = TieredCache(collection="test_cache", ttls={"fake": 60}, max_entries=2)
+    service = FakeService(cache)
+
+    await service.search(service, "Graph Neural Networks", limit=2)
+    await service.search(service, "graph  neural networks", limit=2)
+    assert service.calls == 1
+    assert cache.counters["l1_hits"] == 1
+
+    await service.search(service, "a", limit=1)
+    await service.search(service, "b", limit=1)
+    assert cache.counters["evictions"] == 1
+
+    await service.search(service, "empty")
+    await service.search(service, "empty")
+    assert service.calls == 5
+
+
+@pytest.mark.asyncio
+async def test_single_flight_collapses_concurrent_calls():
+    flight = SingleFlight()
+    calls = 0
+
+    async def work(value):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        if value == "boom":
+            raise ValueError(value)
+        return value
+
+    key = flight.make_key("gaps", "Quantum Computing", limit=5)
+    results = await asyncio.gather(*(flight.do(key, work, "ok") for _ in range(5)))
+    assert results == ["ok"] * 5
+    assert calls == 1
+    assert flight.counters["collapsed"] == 4
+
+    bad_key = flight.make_key("gaps", "boom")
+    outcomes = await asyncio.gather(*(flight.do(bad_key, work, "boom") for _ in range(3)), return_exceptions=True)
+    assert all(isinstance(o, ValueError) for o in outcomes)
+    assert flight.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_llm_cache_exact_and_overlap_reuse():
+    from app.core.llm_cache import LLMResultCache
+
+    cache = LLMResultCache()
+    sources = [{"id": f"p{i}", "title": f"Paper {i}", "summary": "text"} for i in range(10)]
+    request = cache.describe("v1", "Robotics", sources, "")
+    await cache.set(request, [{"gap": "g"}])
+
+    assert await cache.get(cache.describe("v1", "robotics ", list(reversed(sources)), "")) == [{"gap": "g"}]
+
+    overlapping = cache.describe("v1", "robotics", sources[:9], "")
+    assert await cache.get(overlapping) is None
+    cache.jaccard_threshold = 0.85
+    assert await cache.get(overlapping) == [{"gap": "g"}]
+    assert cache.counters["jaccard_hits"] == 1
@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+from httpx import AsyncClient
+
+from app.core.circuit_breaker import CircuitBreaker, CircuitBreakers, CircuitOpen, UpstreamError, circuit_breakers
+from app.main import app
+from app.services.arxiv_service import arxiv_service
+from app.services.hackernews_service import hackernews_service
+from app.services.reddit_service import reddit_service
+from app.services.stackexchange_service import stackexchange_service
+
+
+def test_breaker_opens_half_opens_and_closes(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr("app.core.circuit_breaker.time.monotonic", lambda: clock[0])
+    breaker = CircuitBreaker("hn", window=4, min_calls=4, failure_rate=0.5, open_seconds=30)
+
+    for failed in (False, True, False, True):
+        breaker.allow()
+        breaker.record(failed, 0.1)
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpen):
+        breaker.allow()
+
+    clock[0] += 31
+    breaker.allow()  # the single half-open trial
+    with pytest.raises(CircuitOpen):
+        breaker.allow()
+    breaker.record(False, 0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_slow_calls_open_the_breaker():
+    breaker = CircuitBreaker("se", window=5, min_calls=5, slow_call_seconds=1.0, slow_rate=0.6)
+    for latency in (2.0, 0.1, 3.0, 2.5, 0.2):
+        breaker.allow()
+        breaker.record(False, latency)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+@pytest.mark.asyncio
+async def test_call_records_failures_and_hedges(monkeypatch):
+    monkeypatch.setenv("HEDGE_UPSTREAMS", "hackernews")
+    monkeypatch.setenv("HEDGE_MIN_SAMPLES", "3")
+    monkeypatch.setenv("HEDGE_MIN_DELAY_MS", "10")
+    breakers = CircuitBreakers()
+
+    async def failing():
+        raise UpstreamError("HTTP 503")
+
+    with pytest.raises(UpstreamError):
+        await breakers.call("stackexchange", failing)
+    assert breakers.get("stackexchange").counters["failures"] == 1
+
+    async def fast():
+        return "fast"
+
+    for _ in range(3):
+        assert await breakers.call("hackernews", fast) == "fast"
+
+    attempts = []
+
+    async def first_attempt_hangs():
+        attempts.append(len(attempts))
+        if len(attempts) == 1:
+            await asyncio.sleep(10)
+        return f"attempt {len(attempts)}"
+
+    assert await asyncio.wait_for(breakers.call("hackernews", first_attempt_hangs), 1) == "attempt 2"
+    stats = breakers.stats()["upstreams"]["hackernews"]
+    assert (stats["hedges"], stats["hedge_wins"], stats["state"]) == (1, 1, "closed")
+
+
+@pytest.mark.asyncio
+async def test_hedge_success_wins_when_both_attempts_finish_together(monkeypatch):
+    monkeypatch.setenv("HEDGE_UPSTREAMS", "hackernews")
+    monkeypatch.setenv("HEDGE_MIN_SAMPLES", "3")
+    monkeypatch.setenv("HEDGE_MIN_DELAY_MS", "10")
+    breakers = CircuitBreakers()
+    for _ in range(3):
+        breakers.get("hackernews").record(False, 0.001)
+
+    release, attempts = asyncio.Event(), []
+
+    async def primary_fails_hedge_succeeds():
+        attempts.append(len(attempts))
+        attempt = len(attempts)
+        await release.wait()
+        if attempt == 1:
+            raise UpstreamError("HTTP 503")
+        return "hedge"
+
+    call = asyncio.ensure_future(breakers.call("hackernews", primary_fails_hedge_succeeds))
+    while len(attempts) < 2:
+        await asyncio.sleep(0.005)
+    release.set()  # both attempts complete in the same loop iteration
+    assert await call == "hedge"
+    assert breakers.stats()["upstreams"]["hackernews"]["hedge_wins"] == 1
+
+
+@pytest.mark.asyncio
+async def test_metrics_degrade_while_arxiv_breaker_is_open(monkeypatch):
+    async def no_signals(query):
+        return {}
+
+    async def no_discussions(query, limit=10):
+        return []
+
+    monkeypatch.setattr(arxiv_service, "corpus", None)
+    monkeypatch.setattr(circuit_breakers, "breakers", {})
+    monkeypatch.setattr(hackernews_service, "get_sentiment_signals", no_signals)
+    monkeypatch.setattr(stackexchange_service, "get_sentiment_signals", no_signals)
+    monkeypatch.setattr(reddit_service, "asearch_discussions", no_discussions)
+    circuit_breakers.get("arxiv")._open()
+
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.get("/discovery/metrics", params={"domain": "breaker open domain"})
+    assert response.status_code == 200
+    assert response.json()["total_papers_indexed"] == 0
+    assert circuit_breakers.get("arxiv").counters["rejected"] == 1
@@ -1,5 +1,7 @@
 import pytest
 from httpx import AsyncClient
+from app.api import discovery
+from app.core.http_client import HttpClient
 from app.main import app
 
 
@@ -9,3 +11,55 @@ async def test_read_main():
         response = await ac.get("/health")
     assert response.status_code == 200
     assert response.json() == {"status": "healthy"}
+
+
+@pytest.mark.asyncio
+async def test_cards_rejects_malformed_cursor():
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.get("/discovery/cards", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_metrics_clamps_moving_average_window(monkeypatch):
+    seen = {}
+
+    async def fake_metrics(domain, graph, bucket, periods, window):
+        seen.update(periods=periods, window=window)
+        return {}
+
+    monkeypatch.setattr(discovery, "_build_research_metrics", fake_metrics)
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        await ac.get("/discovery/metrics", params={"periods": 4, "window": 50})
+        assert seen == {"periods": 4, "window": 4}
+        await ac.get("/discovery/metrics", params={"window": -3})
+    assert seen["window"] == 1
+
+
+@pytest.mark.asyncio
+async def test_metrics_allows_large_paper_sets_only_from_the_corpus(monkeypatch):
+    limits = []
+
+    async def fake_metrics(domain, graph, bucket, periods, window):
+        return {}
+
+    monkeypatch.setattr(discovery, "_build_research_metrics", fake_metrics)
+    monkeypatch.setattr(discovery, "build_domain_graph", lambda domain, paper_limit: limits.append(paper_limit))
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        monkeypatch.setattr(discovery.arxiv_service, "corpus", None)
+        await ac.get("/discovery/metrics", params={"papers": 2000})
+        monkeypatch.setattr(discovery.arxiv_service, "corpus", object())
+        await ac.get("/discovery/metrics", params={"papers": 2000})
+    assert limits == [discovery.arxiv_service.max_live_results, 2000]
+
+
+@pytest.mark.asyncio
+async def test_http_pool_stats_use_public_connector_figures(monkeypatch):
+    monkeypatch.setenv("HTTP_POOL_LIMIT", "50")
+    monkeypatch.setenv("HTTP_POOL_LIMIT_PER_HOST", "5")
+    client = HttpClient()
+    assert client.stats()["limit"] is None
+    await client.start()
+    stats = client.stats()
+    await client.close()
+    assert (stats["limit"], stats["limit_per_host"], stats["in_flight"]) == (50, 5, 0)
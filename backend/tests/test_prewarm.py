@@ -0,0 +1,34 @@
+import pytest
+
+from app.core.cache import source_cache
+from app.services.prewarm_service import PrewarmScheduler
+
+
+@pytest.mark.asyncio
+async def test_prewarm_cycle_warms_hot_domains_within_budget(sqlite_db):
+    for domain in ["NLP", "nlp", "nlp", "robotics", "robotics", "cv"]:
+        await sqlite_db.save_search(domain, 5)
+
+    scheduler = PrewarmScheduler()
+    scheduler.top_n, scheduler.interval, scheduler.llm_budget = 2, 0, 1
+    assert await scheduler.hot_domains() == ["nlp", "robotics"]
+
+    calls = []
+
+    async def fetch(domain):
+        calls.append(("fetch", domain))
+        source_cache.counters["fills"] += 1
+
+    async def extract(domain):
+        calls.append(("llm", domain))
+
+    scheduler.register("fetch", fetch)
+    scheduler.register("gaps", extract, uses_llm=True)
+    await scheduler.run_cycle()
+    assert calls == [("fetch", "nlp"), ("llm", "nlp"), ("fetch", "robotics")]
+    assert scheduler.counters["skipped_llm_budget"] == 1
+
+    scheduler.upstream_budget = 1
+    calls.clear()
+    await scheduler.run_cycle()
+    assert calls == [("fetch", "nlp")]
@@ -0,0 +1,37 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services import pulse_service as module
+
+
+@pytest.mark.asyncio
+async def test_pulse_served_from_snapshots(sqlite_db, monkeypatch):
+    computed = []
+
+    class FakeGraph:
+        def __init__(self, domain):
+            self.domain = domain
+
+        async def get(self, name):
+            computed.append(name)
+            return {"score": 70.0, "label": "GROWING", "domain": self.domain, "sources": {}}
+
+    monkeypatch.setattr(module, "build_domain_graph", FakeGraph)
+    service = module.PulseService()
+
+    first = await service.get_pulse("nlp")
+    assert first["stale"] is False and first["snapshot_age_seconds"] == 0.0
+    await sqlite_db.save_sentiment({"score": 70.0, "domain": "nlp"})
+    assert (await service.get_pulse("nlp"))["stale"] is False
+    assert (await service.get_pulse(" NLP "))["stale"] is False  # same snapshot, however it is spelled
+    assert len(computed) == 1
+
+    old = (datetime.utcnow() - timedelta(hours=1)).isoformat()
+    await sqlite_db.storage.update("sentiment", "stale", set_values={"domain": "cv", "score": 10.0, "timestamp": old}, upsert=True)
+    stale = await service.get_pulse("cv")
+    assert stale["stale"] is True and stale["score"] == 10.0 and stale["snapshot_age_seconds"] >= 3600
+    await asyncio.gather(*service._refreshes)
+    assert (await service.get_pulse("cv"))["stale"] is False
+    assert service.counters == {**service.counters, "computed": 1, "stale_hits": 1, "refreshes_started": 1}
@@ -0,0 +1,34 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services.pulse_service import PulseService
+
+
+@pytest.mark.asyncio
+async def test_sentiment_rollups_and_history(sqlite_db):
+    def snapshot(score, stories, at):
+        return {"domain": "NLP", "score": score, "timestamp": at,
+                "sources": {"hackernews": {"total_stories": stories, "top_stories": []}}}
+
+    await sqlite_db._rollup_sentiment(snapshot(40.0, 10, "2024-05-01T10:15:05"))
+    await sqlite_db._rollup_sentiment(snapshot(60.0, 20, "2024-05-01T10:15:50"))
+    await sqlite_db._rollup_sentiment(snapshot(80.0, 30, "2024-05-01T11:02:00"))
+
+    service = PulseService()
+    start, end = datetime(2024, 5, 1), datetime(2024, 5, 2)
+    hourly = await service.history("nlp", start, end, resolution="hour")
+    assert [(p["bucket"], p["count"], p["score_avg"], p["score_min"], p["score_max"]) for p in hourly["points"]] == [
+        ("2024-05-01T10:00:00+00:00", 2, 50.0, 40.0, 60.0),
+        ("2024-05-01T11:00:00+00:00", 1, 80.0, 80.0, 80.0),
+    ]
+    assert hourly["points"][0]["sources"] == {"hackernews": {"total_stories": 15.0}}
+    daily = await service.history("nlp", start, end, resolution="day")
+    assert daily["points"][0]["count"] == 3
+    with pytest.raises(ValueError):
+        await service.history("nlp", start - timedelta(days=2), end, resolution="minute")  # 4320 buckets
+
+    now = datetime.utcnow()
+    assert service.pick_resolution(now - timedelta(hours=2), now) == "minute"
+    assert service.pick_resolution(now - timedelta(days=7), now) == "hour"
+    assert service.pick_resolution(now - timedelta(days=365), now) == "day"
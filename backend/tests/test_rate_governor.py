@@ -0,0 +1,111 @@
+import asyncio
+import fcntl
+
+import pytest
+
+from app.core.rate_governor import FileTokenBucket, RateGovernor, RateLimited, rate_governor
+from app.services.arxiv_service import arxiv_service
+from app.services.domain_graph import build_domain_graph
+
+
+def test_file_buckets_are_shared(tmp_path):
+    path = str(tmp_path / "hn.json")
+    worker_a, worker_b = FileTokenBucket(0.5, 2, path), FileTokenBucket(0.5, 2, path)
+    assert worker_a.take() == 0
+    assert worker_b.take() == 0
+    # Both tokens are gone for every worker; the next one refills in ~2s
+    assert 1.5 < worker_a.take() <= 2.0
+
+    worker_b.block(worker_b._state["updated"] + 1e6)
+    assert worker_a.take() > 1000
+
+
+@pytest.mark.asyncio
+async def test_async_acquire_does_not_wait_on_a_held_lock(tmp_path, monkeypatch):
+    monkeypatch.setenv("RATE_LIMIT_DIR", str(tmp_path))
+    monkeypatch.setenv("RATE_LIMIT_MAX_WAIT_SECONDS", "0.2")
+    governor = RateGovernor()
+    bucket = governor.bucket("testapi")
+    assert isinstance(bucket, FileTokenBucket)
+
+    with open(bucket.path, "a+") as other_worker:
+        fcntl.flock(other_worker, fcntl.LOCK_EX)
+        assert bucket.try_take() is None
+        acquire = asyncio.ensure_future(governor.acquire("testapi"))
+        await asyncio.sleep(0.02)  # the loop keeps running while the lock is held
+        assert not acquire.done()
+        fcntl.flock(other_worker, fcntl.LOCK_UN)
+    await acquire
+    assert governor.counters["testapi"]["lock_retries"] > 0
+
+
+@pytest.mark.asyncio
+async def test_backoff_on_the_loop_does_not_wait_on_a_held_lock(tmp_path, monkeypatch):
+    monkeypatch.setenv("RATE_LIMIT_DIR", str(tmp_path))
+    governor = RateGovernor()
+    bucket = governor.bucket("testapi")
+
+    with open(bucket.path, "a+") as other_worker:
+        fcntl.flock(other_worker, fcntl.LOCK_EX)
+        governor.observe("testapi", 429, {"Retry-After": "60"})  # returns while the lock is held
+        assert len(governor._pending_blocks) == 1
+        fcntl.flock(other_worker, fcntl.LOCK_UN)
+    await asyncio.gather(*governor._pending_blocks)
+    assert bucket.take() > 50
+
+
+def test_blocking_acquire_waits_briefly(tmp_path, monkeypatch):
+    monkeypatch.setenv("RATE_LIMIT_DIR", str(tmp_path))
+    monkeypatch.setenv("TESTAPI_RATE_PER_SECOND", "0.5")
+    monkeypatch.setenv("TESTAPI_RATE_BURST", "1")
+    governor = RateGovernor()
+    governor.blocking_max_wait = 0.1
+
+    governor.acquire_blocking("testapi")
+    with pytest.raises(RateLimited):
+        governor.acquire_blocking("testapi")  # the next token is ~2s away
+
+
+@pytest.mark.asyncio
+async def test_acquire_waits_then_rejects(tmp_path, monkeypatch):
+    monkeypatch.setenv("RATE_LIMIT_DIR", str(tmp_path))
+    monkeypatch.setenv("TESTAPI_RATE_PER_SECOND", "20")
+    monkeypatch.setenv("TESTAPI_RATE_BURST", "1")
+    monkeypatch.setenv("RATE_LIMIT_MAX_WAIT_SECONDS", "0.2")
+    governor = RateGovernor()
+
+    await governor.acquire("testapi")
+    await governor.acquire("testapi")  # queues ~50ms for the next token
+    counts = governor.counters["testapi"]
+    assert (counts["granted"], counts["waited"]) == (2, 1)
+
+    governor.observe("testapi", 429, {"Retry-After": "30"})
+    with pytest.raises(RateLimited):
+        await governor.acquire("testapi")
+    assert governor.stats()["upstreams"]["testapi"]["rejected"] == 1
+
+
+def test_stackexchange_body_signals(tmp_path, monkeypatch):
+    monkeypatch.setenv("RATE_LIMIT_DIR", str(tmp_path))
+    governor = RateGovernor()
+    governor.observe_stackexchange({"items": [], "backoff": 10, "quota_remaining": 42})
+    assert governor.quota_remaining["stackexchange"] == 42
+    assert governor.bucket("stackexchange").take() > 9
+
+    governor.observe_stackexchange({
+        "error_name": "throttle_violation",
+        "error_message": "too many requests from this IP, more requests available in 600 seconds",
+    })
+    assert governor.bucket("stackexchange").take() > 590
+    assert RateGovernor.retry_after_seconds("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_arxiv_search_degrades_to_empty(monkeypatch):
+    def exhausted(upstream):
+        raise RateLimited(upstream, 3.0)
+
+    monkeypatch.setattr(arxiv_service, "corpus", None)
+    monkeypatch.setattr(rate_governor, "acquire_blocking", exhausted)
+    graph = build_domain_graph("rate limited arxiv domain")
+    assert await graph.get("papers") == []
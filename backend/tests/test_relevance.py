@@ -0,0 +1,20 @@
+from app.services.relevance_service import RelevanceService, tokenize
+
+
+def test_tokenize_folds_plurals_but_not_substrings():
+    assert tokenize("Heart Attacks in the ICU") == ["heart", "attack", "icu"]
+    assert "attack" not in tokenize("attackers")
+
+
+def test_rank_orders_by_bm25_and_drops_irrelevant_sources():
+    sources = [
+        {"title": "Mitigating DDoS attacks", "summary": "Network attack traffic filtering."},
+        {"title": "Wearables for heart monitoring", "summary": "Early heart attack warning signs."},
+        {"title": "Heart attack risk after surgery", "summary": "Heart attack outcomes in heart patients."},
+        {"title": "Cooking pasta", "text": "Boil water."},
+    ]
+    ranked = RelevanceService().rank("heart attacks", sources)
+    assert [s["title"] for s in ranked] == [
+        "Heart attack risk after surgery",
+        "Wearables for heart monitoring",
+    ]
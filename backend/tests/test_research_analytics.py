@@ -0,0 +1,44 @@
+from app.services.research_analytics import analyze_velocity
+
+
+def _paper(published, categories=("cs.LG",), authors=("Ada",)):
+    return {"published": published, "categories": list(categories), "authors": list(authors)}
+
+
+def test_monthly_velocity_fills_gaps_and_fits_trend():
+    papers = (
+        [_paper("2024-01-15T00:00:00Z")]
+        + [_paper("2024-03-02T00:00:00Z", categories=("cs.CL",))] * 2
+        + [_paper("2024-04-20T00:00:00+00:00", authors=("Bo",))] * 3
+        + [_paper("2023-06-01T00:00:00Z"), _paper("not a date")]
+    )
+    result = analyze_velocity(papers, bucket="month", periods=4, window=2)
+
+    assert [(b["name"], b["value"]) for b in result["series"]] == [
+        ("JAN 2024", 1), ("FEB 2024", 0), ("MAR 2024", 2), ("APR 2024", 3),
+    ]
+    assert [b["moving_avg"] for b in result["series"]] == [None, 0.5, 1.0, 2.5]
+    assert result["papers_dated"] == 7
+    # Least-squares slope of [1, 0, 2, 3] is 0.8 per month against a mean of 1.5
+    assert result["trend"]["slope"] == 0.8
+    assert result["trend"]["growth_rate"] == 53.3
+
+    categories = {c["name"]: c for c in result["categories"]}
+    assert categories["cs.LG"]["count"] == 6  # undated and out-of-window papers still count
+    assert categories["cs.CL"]["series"] == [0, 0, 2, 0]
+    assert result["authors"][0]["name"] == "Ada"
+
+
+def test_week_and_quarter_buckets():
+    papers = [_paper("2024-01-01T00:00:00Z"), _paper("2024-01-07T23:00:00Z"), _paper("2024-01-08T00:00:00Z")]
+    weekly = analyze_velocity(papers, bucket="week", periods=2)
+    assert [(b["name"], b["value"]) for b in weekly["series"]] == [("WK 01 JAN 2024", 2), ("WK 08 JAN 2024", 1)]
+
+    quarterly = analyze_velocity(papers + [_paper("2023-12-31T00:00:00Z")], bucket="quarter", periods=2)
+    assert [(b["name"], b["value"]) for b in quarterly["series"]] == [("Q4 2023", 1), ("Q1 2024", 3)]
+
+
+def test_no_dated_papers():
+    result = analyze_velocity([_paper("")], periods=3)
+    assert result["series"] == []
+    assert result["trend"]["growth_rate"] == 0.0
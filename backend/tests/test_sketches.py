@@ -0,0 +1,115 @@
+import random
+
+import pytest
+
+from app.core.database import db
+from app.core.sketches import CountMinSketch, HeavyHitters, SpaceSaving
+from app.services.heavy_hitter_service import HeavyHitterService
+
+
+def _stream(seed, n=5000):
+    rng = random.Random(seed)
+    heavy = ["alice", "bob", "carol"]
+    return [rng.choice(heavy) if rng.random() < 0.4 else f"author-{rng.randrange(2000)}" for _ in range(n)]
+
+
+def test_space_saving_finds_heavy_hitters_and_merges():
+    left, right = SpaceSaving(capacity=50), SpaceSaving(capacity=50)
+    stream_a, stream_b = _stream(1), _stream(2)
+    for item in stream_a:
+        left.add(item)
+    for item in stream_b:
+        right.add(item)
+    left.merge(right)
+
+    truth = {name: (stream_a + stream_b).count(name) for name in ("alice", "bob", "carol")}
+    top = {item: (count, error) for item, count, error in left.top(3)}
+    assert set(top) == set(truth)
+    for name, (count, error) in top.items():
+        assert count - error <= truth[name] <= count
+
+
+def test_count_min_never_undercounts_and_round_trips():
+    sketch = CountMinSketch(width=256, depth=4)
+    stream = _stream(3)
+    for item in stream:
+        sketch.add(item)
+    restored = CountMinSketch.from_dict(sketch.to_dict())
+    for name in ("alice", "author-7"):
+        assert restored.estimate(name) == sketch.estimate(name) >= stream.count(name)
+
+
+def test_heavy_hitters_round_trip_merge():
+    a, b = HeavyHitters(capacity=20, width=512), HeavyHitters(capacity=20, width=512)
+    for item in _stream(4, 2000):
+        a.add(item)
+    for item in _stream(5, 2000):
+        b.add(item)
+    merged = HeavyHitters.from_dict(a.to_dict())
+    merged.merge(HeavyHitters.from_dict(b.to_dict()))
+    assert merged.total == 4000
+    assert {row["name"] for row in merged.top(3)} == {"alice", "bob", "carol"}
+
+
+@pytest.mark.asyncio
+async def test_heavy_hitters_merge_across_workers(sqlite_db, monkeypatch):
+    papers = [
+        {"id": f"http://arxiv.org/abs/2401.0000{n}v1", "authors": ["Ada", f"Author {n}"], "categories": ["cs.LG"]}
+        for n in range(4)
+    ]
+    worker_a, worker_b = HeavyHitterService(), HeavyHitterService()
+    monkeypatch.setattr(HeavyHitterService, "worker_id", property(lambda self: self._worker))
+    worker_a._worker, worker_b._worker = "host:1", "host:2"
+
+    worker_a.observe("Machine Learning", papers[:3])
+    worker_a.observe("machine learning", papers[:3])  # same papers again in the window: skipped
+    worker_b.observe("machine learning", papers[2:] + [{"id": "x", "authors": ["Bo"], "categories": []}])
+    await worker_b.flush()
+
+    top = await worker_a.top("machine learning", "authors", windows=1, limit=2)
+    assert top["workers"] == 2
+    assert top["items"][0] == {"name": "Ada", "count": 5, "min_count": 5}
+    assert worker_a.counters["duplicates_skipped"] == 3
+
+
+@pytest.mark.asyncio
+async def test_heavy_hitters_bound_domains_in_memory(sqlite_db):
+    service = HeavyHitterService()
+    service.max_domains = 1
+    paper = {"id": "http://arxiv.org/abs/2401.00001v1", "authors": ["Ada"], "categories": ["cs.LG"]}
+
+    service.observe("nlp", [paper])
+    service.observe("cv", [paper])
+    assert len(service._domains) == 2  # nlp is not saved yet
+    await service.flush()
+    assert list(service._domains) == ["cv"] and service.counters["domains_evicted"] == 1
+
+    top = await service.top("nlp", "authors", windows=1)
+    assert top["items"][0]["count"] == 1  # read back from storage
+
+    service.observe("nlp", [{**paper, "id": "http://arxiv.org/abs/2401.00002v1"}])
+    await service.flush()
+    assert (await service.top("nlp", "authors", windows=1))["items"][0]["count"] == 2  # view refreshed by the flush
+    assert service.counters["view_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_heavy_hitter_views_are_served_from_memory(sqlite_db, monkeypatch):
+    service = HeavyHitterService()
+    service.max_views = 1
+    service.observe("nlp", [{"id": f"p{n}", "authors": ["Ada", f"A{n}"], "categories": []} for n in range(3)])
+    first = await service.top("nlp", "authors", windows=1, limit=1)
+    assert [item["name"] for item in first["items"]] == ["Ada"]
+
+    async def no_storage(*args):
+        raise AssertionError("storage read on a view hit")
+
+    get_sketches = db.get_sketches
+    monkeypatch.setattr(db, "get_sketches", no_storage)
+    assert len((await service.top("NLP", "authors", windows=1, limit=3))["items"]) == 3
+
+    service.observe("nlp", [{"id": "p9", "authors": ["Bo"], "categories": []}])
+    assert (await service.top("nlp", "authors", windows=1, limit=10))["total"] == 6  # until the next flush
+    monkeypatch.setattr(db, "get_sketches", get_sketches)
+    await service.top("cv", "authors", windows=1)
+    assert list(service._views) == [("cv", "authors", 1)]  # least recently queried view dropped
@@ -0,0 +1,69 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from app.core.storage import SQLiteStorage
+
+
+@pytest.mark.asyncio
+async def test_sqlite_keyset_pages(sqlite_db):
+    for n in range(5):
+        await sqlite_db.save_card({"gap": f"gap {n}", "domain": "nlp" if n % 2 else "cv"})
+    await sqlite_db.save_card({"gap": "newest", "domain": "nlp"})
+
+    first = await sqlite_db.get_cards_page(limit=4, fields=["gap"])
+    assert [c["gap"] for c in first["items"]][:2] == ["newest", "gap 4"]
+    assert set(first["items"][0]) == {"_id", "gap", "created_at"}
+    second = await sqlite_db.get_cards_page(limit=4, cursor=first["next_cursor"])
+    assert [c["gap"] for c in second["items"]] == ["gap 1", "gap 0"]
+    assert second["next_cursor"] is None
+
+    nlp = await sqlite_db.get_cards_by_domain("nlp")
+    assert [c["gap"] for c in nlp] == ["newest", "gap 3", "gap 1"]
+
+
+@pytest.mark.asyncio
+async def test_sqlite_feedback_summary_and_cache(sqlite_db, monkeypatch):
+    for n in range(3):
+        await sqlite_db.save_feedback({"card_gap": f"g{n}", "domain": "nlp", "action": "bookmarked"})
+    await sqlite_db.save_feedback({"card_gap": "meh", "domain": "nlp", "action": "dismissed"})
+
+    stats = await sqlite_db.get_feedback_stats("nlp")
+    assert stats["bookmarked"] == ["g2", "g1", "g0"]
+    assert stats["dismissed"] == ["meh"]
+    assert stats["counts"] == {"bookmarked": 3, "dismissed": 1}
+
+    assert (await sqlite_db.get_feedback_stats("unseen"))["counts"] == {}
+    assert await sqlite_db.storage.find_one("feedback_summary", {"_id": "unseen"}) is None
+    scans = []
+    monkeypatch.setattr(sqlite_db, "rebuild_feedback_summary", lambda domain: scans.append(domain))
+    assert (await sqlite_db.get_feedback_stats("unseen"))["counts"] == {}  # remembered as empty
+    assert scans == []
+    with pytest.raises(ValueError):
+        await sqlite_db.save_feedback({"card_gap": "g", "domain": "nlp", "action": "x.y"})
+
+    await sqlite_db.set_cache_entry("llm_cache", "k1", [{"gap": "x"}], 60, domain="nlp")
+    await sqlite_db.set_cache_entry("llm_cache", "k2", ["old"], -1, domain="nlp")
+    entry = await sqlite_db.get_cache_entry("llm_cache", "k1")
+    assert entry["value"] == [{"gap": "x"}]
+    assert await sqlite_db.get_cache_entry("llm_cache", "k2") is None
+    assert [e["_id"] for e in await sqlite_db.find_cache_entries("llm_cache", domain="nlp")] == ["k1"]
+
+
+@pytest.mark.asyncio
+async def test_sqlite_lock_waits_do_not_block_the_event_loop(tmp_path):
+    path = str(tmp_path / "locked.db")
+    storage = SQLiteStorage(path)
+    other_worker = sqlite3.connect(path, isolation_level=None)
+    other_worker.execute("BEGIN IMMEDIATE")
+
+    update = asyncio.ensure_future(storage.update("searches", "1", set_values={"domain": "nlp"}, upsert=True))
+    await asyncio.sleep(0.1)  # the loop keeps running while the update waits for the write lock
+    assert not update.done()
+
+    other_worker.execute("ROLLBACK")
+    assert await update is False
+    assert (await storage.find_one("searches", {"_id": "1"}))["domain"] == "nlp"
+    other_worker.close()
+    await storage.close()
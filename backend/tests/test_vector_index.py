@@ -0,0 +1,99 @@
+import sys
+import threading
+import types
+
+import numpy as np
+import pytest
+
+from app.services.vector_index import LocalVectorIndex
+from app.services.vector_service import EmbeddingDimensionMismatch, LocalBackend, VectorService
+
+
+def test_local_index_persists_and_searches(tmp_path):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((600, 16)).astype(np.float32)
+
+    index = LocalVectorIndex(str(tmp_path), dimension=16)
+    index.upsert([{"id": f"doc{i}", "values": v.tolist(), "metadata": {"n": i}} for i, v in enumerate(vectors)])
+    index.upsert([{"id": "doc3", "values": vectors[7].tolist(), "metadata": {"n": 3}}])
+
+    reloaded = LocalVectorIndex(str(tmp_path), dimension=16)
+    assert len(reloaded) == 600
+    top = reloaded.query(vectors[7].tolist(), top_k=2)
+    assert {m.id for m in top} == {"doc3", "doc7"}
+    assert abs(top[0].score - 1.0) < 1e-5
+
+    approx = LocalVectorIndex(str(tmp_path), dimension=16, mode="approx", approx_candidates=100)
+    assert approx.query(vectors[42].tolist(), top_k=1)[0].id == "doc42"
+
+
+def test_queries_during_upserts_see_whole_views(tmp_path):
+    rng = np.random.default_rng(1)
+    index = LocalVectorIndex(str(tmp_path), dimension=8, mode="approx", approx_candidates=4)
+    index.upsert([{"id": "seed", "values": rng.standard_normal(8).tolist()}])
+    errors, stop = [], threading.Event()
+
+    def query_loop():
+        local_rng = np.random.default_rng()
+        while not stop.is_set():
+            try:
+                index.query(local_rng.standard_normal(8).tolist(), top_k=3)
+            except Exception as e:  # IndexError when ids and matrix were out of step
+                errors.append(e)
+
+    readers = [threading.Thread(target=query_loop) for _ in range(2)]
+    for reader in readers:
+        reader.start()
+    for batch in range(50):
+        index.upsert([{"id": f"d{batch}-{i}", "values": rng.standard_normal(8).tolist()} for i in range(5)])
+    stop.set()
+    for reader in readers:
+        reader.join()
+    assert errors == [] and len(index) == 251
+
+
+@pytest.mark.asyncio
+async def test_upsert_skips_unchanged_documents(tmp_path):
+    service = VectorService()
+    service.backend = LocalBackend(str(tmp_path), service.embedder.dimension, "exact")
+    service.embed_batch_size = 4
+    docs = [{"id": f"p{i}", "title": f"paper {i}", "summary": "graph neural nets", "url": ""} for i in range(10)]
+
+    first = await service.upsert_documents(docs)
+    assert first["embedded"] == 10 and first["embedding_calls"] == 3
+
+    docs[0] = {**docs[0], "summary": "revised abstract"}
+    fresh = VectorService()
+    fresh.backend = LocalBackend(str(tmp_path), fresh.embedder.dimension, "exact")
+    second = await fresh.upsert_documents(docs)
+    assert second["skipped"] == 9 and second["embedded"] == 1
+
+
+def test_auto_backend_without_pinecone_key_writes_nothing(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("VECTOR_BACKEND", "auto")
+    monkeypatch.delenv("PINECONE_API_KEY", raising=False)
+    assert VectorService().backend is None
+    assert not any(tmp_path.iterdir())
+
+
+def test_pinecone_dimension_mismatch_fails_only_when_pinecone_is_required(monkeypatch):
+    class FakePinecone:
+        def __init__(self, api_key):
+            pass
+
+        def list_indexes(self):
+            return types.SimpleNamespace(names=lambda: ["frontier-map-index"])
+
+        def describe_index(self, name):
+            return types.SimpleNamespace(dimension=1536)
+
+    monkeypatch.setitem(sys.modules, "pinecone", types.SimpleNamespace(Pinecone=FakePinecone, ServerlessSpec=None))
+    monkeypatch.setenv("VECTOR_BACKEND", "pinecone")
+    monkeypatch.setenv("PINECONE_API_KEY", "pk-test")
+    monkeypatch.setenv("EMBEDDING_PROVIDER", "hashing")
+    with pytest.raises(EmbeddingDimensionMismatch):
+        VectorService()
+
+    monkeypatch.setenv("VECTOR_BACKEND", "auto")
+    assert VectorService().backend is None